@@ -0,0 +1,131 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+
+class ABSACache:
+
+    def __init__(self, filepath: str, model_version: str, max_entries: int=1000000):
+        """
+        Takes the filepath to the SQLite database in which the mined results of
+        customer reviews are stored (filepath), the version of the ABSA models whose
+        results are being stored (model_version), and the maximum number of customer
+        reviews whose results are kept in the database (max_entries).
+        Results are looked up by a hash of the preprocessed customer review text and
+        the model version, so results mined by an older version of the models are
+        never returned.
+        """
+        self.filepath = filepath
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(filepath)
+        self.create_table()
+    
+    def create_table(self) -> None:
+        """
+        Creates the table in which the mined results are stored, if it does not
+        exist already.
+        """
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS absa_results (key TEXT PRIMARY KEY, result TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS absa_results_last_used ON absa_results (last_used)")
+        self.connection.commit()
+
+    def get_key(self, review: str) -> str:
+        """
+        Takes a preprocessed customer review (review).
+        Returns the key under which the mined result of the customer review is stored:
+        the SHA-256 hash of the model version and the customer review text.
+        """
+        return hashlib.sha256((self.model_version + '\n' + review).encode('utf-8')).hexdigest()
+    
+    def get_batches(self, values: list, batch_size: int=500) -> list:
+        """
+        Takes a list (values). Returns a list of consecutive batches of values, each
+        containing at most batch_size values (SQLite limits how many values can be
+        bound in a single query).
+        """
+        return [values[start:start + batch_size] for start in range(0, len(values), batch_size)]
+
+    def get_many(self, reviews: list) -> dict:
+        """
+        Takes a list of preprocessed customer reviews (reviews).
+        Returns a dictionary mapping each of the customer reviews whose mined result is
+        present in the cache against that result. Updates the hit and miss counters,
+        and marks the results that were found as recently used.
+        """
+        key_reviews = {self.get_key(review): review for review in set(reviews)}
+        found = dict()
+        for batch in self.get_batches(list(key_reviews.keys())):
+            rows = self.connection.execute(
+                "SELECT key, result FROM absa_results WHERE key IN (" + ", ".join("?" for _ in batch) + ")", batch
+            ).fetchall()
+            for key, result in rows:
+                found[key_reviews[key]] = json.loads(result)
+        now = time.time()
+        self.connection.executemany(
+            "UPDATE absa_results SET last_used = ? WHERE key = ?", [(now, self.get_key(review)) for review in found]
+        )
+        self.connection.commit()
+        for review in reviews:
+            if review in found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found
+    
+    def put_many(self, results: dict) -> None:
+        """
+        Takes a dictionary (results) mapping preprocessed customer reviews against their
+        mined results.
+        Stores these results in the cache, and then evicts the least recently used
+        results if the cache holds more than self.max_entries results.
+        """
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO absa_results (key, result, last_used) VALUES (?, ?, ?)",
+            [(self.get_key(review), json.dumps(results[review]), now) for review in results]
+        )
+        self.connection.commit()
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Deletes the least recently used results from the cache until it holds at most
+        self.max_entries results.
+        """
+        excess = self.get_size() - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM absa_results WHERE key IN (SELECT key FROM absa_results ORDER BY last_used ASC LIMIT ?)", (excess,)
+            )
+            self.connection.commit()
+
+    def get_size(self) -> int:
+        """
+        Returns the number of results that are currently stored in the cache.
+        """
+        return self.connection.execute("SELECT COUNT(*) FROM absa_results").fetchone()[0]
+    
+    def get_stats(self) -> dict:
+        """
+        Returns a dictionary with the number of cache hits, the number of cache misses,
+        the hit rate, and the number of results currently stored in the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': (self.hits / lookups) if lookups > 0 else 0.0,
+            'size': self.get_size()
+        }
+
+    def close(self) -> None:
+        """
+        Closes the connection to the SQLite database.
+        """
+        self.connection.close()
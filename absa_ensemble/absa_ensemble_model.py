@@ -1,12 +1,101 @@
-from absa_ensemble.absa_model1 import ABSAModel1
-from absa_ensemble.absa_model2 import ABSAModel2
+from absa_ensemble.absa_model1 import ABSAModel1, parse_reviews
+from absa_ensemble.absa_model2 import ABSAModel2, mine_reviews
+from run_telemetry import track_progress
 
-class ABSAEnsemble:
+# Version of the ABSA models. This has to be changed whenever a change is made that
+# changes the mined results, so that results cached by the Pipeline are not reused
+MODEL_VERSION = "1"
+
+
+def get_model_version(single_pass: bool=False) -> str:
+    """
+    Takes whether ABSAModel2 runs in its single-pass mode (single_pass).
+    Returns the version of the ABSA models that the mined results are recorded
+    under. The single-pass mode mines different results, so they are recorded
+    under a different version.
+    """
+    return MODEL_VERSION + "-single-pass" if single_pass else MODEL_VERSION
+
+
+class ABSAEngine:
+
+    def __init__(self, batch_size: int=64, n_process: int=1, chunk_size: int=256, single_pass: bool=False):
+        """
+        Takes the number of customer reviews that are loaded into spacy's nlp model
+        together in each batch (batch_size), the number of processes used to do so
+        (n_process), and the number of customer reviews whose sentences are sent
+        through the Stanford NLP parser together (chunk_size). If single_pass is True,
+        then ABSAModel2 runs in its single-pass mode (see ABSAModel2).
+        Holds the ABSA models, so that any number of customer reviews can be mined
+        (one at a time through self.mine, or in batches through self.mine_many)
+        without setting the models up again for each customer review.
+        """
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.chunk_size = chunk_size
+        self.single_pass = single_pass
+        self.model1 = ABSAModel1()
+
+    def mine(self, review: str, doc=None, model2_result: list=None) -> list:
+        """
+        Takes a customer review (review). Optionally takes the customer review
+        already loaded into spacy's nlp model (doc), and the result of ABSAModel2
+        for the customer review (model2_result), if it has already been computed.
+        Runs both ABSA models on the customer review and returns their merged result.
+        """
+        res1 = self.model1.mine(review, doc) # Running ABSAModel1 on the customer review
+        if model2_result is None:
+            model2_result = ABSAModel2(review, single_pass=self.single_pass).result # Running ABSAModel2 on the customer review
+        return self.merge_entries(res1 + model2_result) # Merges the results from the two ABSA Models
+
+    def get_chunks(self, reviews: list) -> list:
+        """
+        Takes a list of customer reviews (reviews).
+        Returns a list of consecutive chunks of reviews, each of which contains
+        (at most) self.chunk_size customer reviews.
+        """
+        return [reviews[start:start + self.chunk_size] for start in range(0, len(reviews), self.chunk_size)]
 
-    def __init__(self, review: str):
-        res1 = ABSAModel1(review).result # Running ABSAModel1 on the customer review
-        res2 = ABSAModel2(review).result # Running ABSAModel2 on the customer review
-        self.result = self.merge_entries(res1 + res2) # Merges the results from the two ABSA Models
+    def get_docs(self, reviews: list, docs: list=None):
+        """
+        Takes a list of customer reviews (reviews). Optionally takes a list of the
+        customer reviews already loaded into spacy's nlp model (docs), in the same
+        order as reviews, in which any of the docs may be None.
+        Returns the docs of all of the customer reviews, in the same order as reviews.
+        The customer reviews without a doc (or whose doc is not for that customer
+        review) are loaded into spacy's nlp model together, in batches.
+        """
+        if docs is None:
+            return parse_reviews(reviews, batch_size=self.batch_size, n_process=self.n_process)
+        docs = list(docs)
+        missing = [position for position, (review, doc) in enumerate(zip(reviews, docs)) if doc is None or doc.text != review]
+        if missing:
+            parsed = parse_reviews([reviews[position] for position in missing], batch_size=self.batch_size, n_process=self.n_process)
+            for position, doc in zip(missing, parsed):
+                docs[position] = doc
+        return docs
+
+    def mine_many(self, reviews, docs: list=None) -> list:
+        """
+        Takes an iterable of customer reviews (reviews). Optionally takes a list of
+        the customer reviews already loaded into spacy's nlp model (docs), in the
+        same order as reviews (ex: the docs exported by the DataLoader), any of which
+        may be None.
+        Loads all of the customer reviews without a doc into spacy's nlp model in
+        batches (see self.get_docs). Parses the sentences of every self.chunk_size customer
+        reviews together with the Stanford NLP parser, and then runs both ABSA
+        models on them. Progress is reported as the customer reviews are mined.
+        Returns a list of the merged results, in the same order as reviews.
+        """
+        reviews = [str(review) for review in reviews]
+        progress = track_progress("ABSA mining", len(reviews))
+        docs = iter(self.get_docs(reviews, docs))
+        results = []
+        for chunk in self.get_chunks(reviews):
+            for review, model2 in zip(chunk, mine_reviews(chunk, single_pass=self.single_pass)):
+                results.append(self.mine(review, doc=next(docs), model2_result=model2.result))
+                progress.update()
+        return results
     
     def merge_entries(self, results: list) -> list:
         """
@@ -15,18 +104,43 @@ class ABSAEnsemble:
         ABSA models.
         It merges the mined entries from the two models, combining the net polarity
         scores in instances in which both models picked up the same attribute-description
-        pair.
+        pair. Entries are looked up by their (aspect, description) pair, and keep
+        the order in which each pair was first seen.
         This merged list of dictionaries (merged) is returned.
         """
-        merged = []
+        merged = dict()
         for entry in results:
-            flag = True
             entry['aspect'] = entry['aspect'].replace(' ', '_')
             entry['description'] = entry['description'].replace(' ', '_')
-            for i, processed in enumerate(merged):
-                if processed['aspect'] == entry['aspect'] and processed['description'] == entry['description']:
-                    flag = False
-                    merged[i]['polarity'] = merged[i]['polarity'] + entry['polarity']
-            if flag:
-                merged.append(entry)
-        return merged
\ No newline at end of file
+            key = (entry['aspect'], entry['description'])
+            if key in merged:
+                merged[key]['polarity'] = merged[key]['polarity'] + entry['polarity']
+            else:
+                merged[key] = entry
+        return list(merged.values())
+
+
+engine = None
+
+def get_engine() -> ABSAEngine:
+    """
+    Returns the ABSAEngine shared by everything running in this process,
+    creating it the first time it is needed.
+    """
+    global engine
+    if engine is None:
+        engine = ABSAEngine()
+    return engine
+
+
+class ABSAEnsemble:
+
+    def __init__(self, review: str, doc=None, model2_result: list=None):
+        """
+        Takes a customer review (review). Optionally takes the customer review
+        already loaded into spacy's nlp model (doc), and the result of ABSAModel2
+        for the customer review (model2_result), if it has already been computed.
+        Mines the customer review with the shared ABSAEngine, and stores the
+        merged result in self.result
+        """
+        self.result = get_engine().mine(review, doc, model2_result)
@@ -1,29 +1,67 @@
-import spacy
-nlp = spacy.load("en_core_web_sm")
-from textblob import TextBlob
+from spacy.tokens import DocBin
 
-import nltk
-nltk.download('vader_lexicon')
-from nltk.sentiment import SentimentIntensityAnalyzer
+from model_registry import get_spacy
+from absa_ensemble.polarity_scorer import get_polarity_scorer
+
+
+def parse_reviews(reviews: list, batch_size: int=64, n_process: int=1):
+    """
+    Takes a list of customer reviews (reviews), the number of reviews to be
+    parsed together in each batch (batch_size), and the number of processes
+    to parse them with (n_process).
+    Loads all of the customer reviews into spacy's nlp model in batches (using
+    nlp.pipe), and returns a generator over the resulting docs, in the same
+    order as the customer reviews in reviews.
+    """
+    return get_spacy("parser").pipe(reviews, batch_size=batch_size, n_process=n_process)
+
+
+def load_docs(filepath: str) -> list:
+    """
+    Takes the filepath to a spacy DocBin file of customer reviews that have already
+    been loaded into spacy's nlp model (exported by the DataLoader).
+    Returns a list of these docs, in the order in which they were stored.
+    """
+    return list(DocBin().from_disk(filepath).get_docs(get_spacy("parser").vocab))
 
-class ABSAModel1:
 
-    def __init__(self, review: str):
-        aspects = self.mine_aspects(review)
-        self.sentiment_classifier = SentimentIntensityAnalyzer()
-        self.result = self.find_sentiment(aspects)
-        print("ABSA v1 review complete")
+class DocIndex:
 
+    def __init__(self, doc):
+        """
+        Takes a customer review loaded into spacy's nlp model (doc).
+        Precomputes, in a single pass over doc, the syntactic children of every
+        token and the negation (if any) associated with every token, so that
+        these can be looked up by token index rather than by scanning doc.
+        """
+        self.doc = doc
+        self.children = [[] for _ in range(len(doc))]
+        for token in doc:
+            if token.head.i != token.i:
+                self.children[token.head.i].append(token)
+        self.negations = self.get_negations()
+        self.token_negations = self.get_token_negations()
 
     def get_children(self, token) -> list:
         """
         Takes a token from the spacy nlp document for a customer
         review.
-        Returns a list of all the syntactic children of the token.
+        Returns a list of all the syntactic children of the token
+        (in the same order as token.children).
         """
-        return [child for child in token.children]
-    
-    
+        return self.children[token.i]
+
+    def get_parent(self, token):
+        """
+        Takes a token from the spacy nlp document for a customer
+        review.
+        Returns the syntactic parent of the token, or None if the
+        token is the root of its sentence.
+        """
+        if token.head.i == token.i:
+            return None
+        return token.head
+
     def is_negation(self, token) -> bool:
         """
         Takes a token from the spacy nlp document for a customer
@@ -32,62 +70,82 @@ class ABSAModel1:
         Returns False otherwise.
         """
         return token.dep_ == 'neg'
-    
-    def negation_present(self, doc) -> bool:
-        """
-        Takes a customer review loaded into spacy's nlp model.
-        Returns True if a negation word is present somewhere in
-        the customer review. Returns False otherwise.
-        """
-        for token in doc:
-            if self.is_negation(token):
-                return True
-        return False
-    
-    def get_negations(self, doc) -> dict:
+
+    def get_negations(self) -> dict:
         """
-        Takes a customer review loaded into spacy's nlp model (doc).
-        Returns a dictionary (negations) which maps negation tokens in doc
+        Returns a dictionary (negations) which maps negation tokens in self.doc
         to the tokens with which they are associated (i.e. maps the negation token
         against its syntactic parent and syntactic sibling tokens)
         """
-        if self.negation_present(doc):
-            negations = dict()
-            for token in doc:
-                children = self.get_children(token)
-                for child in children:
-                    if self.is_negation(child):
-                        negations[child] = {token}
-                        for other_child in set(children).difference({child}):
-                            negations[child].add(other_child)
-            return negations
-        else:
-            return dict()
-    
-    def get_token_negation(self, token, negations):
+        negations = dict()
+        for token in self.doc:
+            children = self.get_children(token)
+            for child in children:
+                if self.is_negation(child):
+                    negations[child] = {token}
+                    for other_child in set(children).difference({child}):
+                        negations[child].add(other_child)
+        return negations
+
+    def get_token_negations(self) -> dict:
+        """
+        Inverts self.negations: returns a dictionary mapping the index of each
+        token in self.doc that has been negated to the (first) negation token
+        associated with it.
+        """
+        token_negations = dict()
+        for negation in self.negations:
+            for token in self.negations[negation]:
+                if token.i not in token_negations:
+                    token_negations[token.i] = negation
+        return token_negations
+
+    def get_token_negation(self, token):
         """
         Takes a token from the spacy nlp document for a customer review.
-        Also takes a dictionary (negations) mapping negation tokens to the tokens with
-        which it is related (its syntactic parent and siblings).
         Returns the negation token associated with a given token if it exists.
         Returns None if token is not longuistically related to any negations in doc
         (i.e. returns None if token has not been negated in the customer review)
         """
-        for negation in negations:
-            if token in negations[negation]:
-                return negation
-        return None
-    
+        return self.token_negations.get(token.i)
 
-    def get_token_compound(self, token):
+
+class ABSAModel1:
+
+    def __init__(self, review: str=None, doc=None):
         """
-        Takes a token from the spacy nlp document for a customer review.
+        Optionally takes a customer review (review), and the customer review
+        already loaded into spacy's nlp model (doc). If a customer review is
+        given, then it is mined straight away and the result is stored in
+        self.result. Either way, the object can be reused to mine any number
+        of customer reviews through self.mine
+        """
+        self.polarity_scorer = get_polarity_scorer()
+        self.result = None
+        if review is not None:
+            self.result = self.mine(review, doc)
+
+    def mine(self, review: str, doc=None) -> list:
+        """
+        Takes a customer review (review). Optionally takes the customer review
+        already loaded into spacy's nlp model (doc).
+        Returns a list of dictionaries with the attribute-description pairs
+        in the customer review, along with their sentiment scores.
+        """
+        aspects = self.mine_aspects(review, doc)
+        return self.find_sentiment(aspects)
+
+
+    def get_token_compound(self, token, index):
+        """
+        Takes a token from the spacy nlp document for a customer review,
+        and the DocIndex of that document (index).
         If the token is not a part of a linguistic compound (a phrase that
         consists of more than one word), then returns None.
         If the token is a part of a linguistic compound, then returns the
         second token which forms a part of this compound.
         """
-        for child in self.get_children(token):
+        for child in index.get_children(token):
             if child.dep_ == 'compound':
                 return child
         return None
@@ -116,15 +174,14 @@ class ABSAModel1:
 
     
     def get_children_nouns_verbs(self, children: list, descriptive_token, descriptive_token_text, \
-        negations, negation, verb_token=None) -> tuple:
+        index, negation, verb_token=None) -> tuple:
         """
         Inputs:
         - children: a list of children tokens of the token being considered
         - descriptive_token: the descriptive token currently being considered
         - descriptive_token_text: the text of the descriptive token, after adding
             any negations associated with it to the text
-        - negations: a dictionary mapping negation tokens agianst the tokens with 
-            which they are related
+        - index: the DocIndex of the customer review
         - negation: the negation that is associated with descriptive_token, if any
         - verb_token: the verb token that is part of the description, if any
 
@@ -139,13 +196,13 @@ class ABSAModel1:
         flag = False
         for child in children:
             if child.pos_ == 'NOUN' or child.pos_ == 'VERB':
-                comp = self.get_token_compound(child)
+                comp = self.get_token_compound(child, index)
                 child_text = self.get_text(child, comp)
                 flag = True
                 if negation != None:
                     result.append({'aspect': child_text, 'description': descriptive_token_text})
                 else:
-                    noun_neg = self.get_token_negation(child, negations)
+                    noun_neg = index.get_token_negation(child)
                     if verb_token == None:
                         descriptive_token_text = self.get_text(descriptive_token, noun_neg)
                     else:
@@ -153,59 +210,86 @@ class ABSAModel1:
                     result.append({'aspect': child_text, 'description': descriptive_token_text})
         return result, flag
     
-    def get_token_noun_verb(self, token, doc, descriptive_token, descriptive_token_text, negations, negation, verb_token=None):
+    def get_token_noun_verb(self, token, index, descriptive_token, descriptive_token_text, negation, verb_token=None):
         """
         Inputs:
         - token: a token from the spacy nlp model of a customer review
-        - doc: the customer review loaded into spacy's nlp model
+        - index: the DocIndex of the customer review
         - descriptive_token: the descriptive_token currently being considered
         - descriptive_token_text: the text of descriptive_token, combined with
             any negations that are associatwed with it
-        - negations: a dictionary mapping negation tokens in doc to the tokens they are related to
         - negation: the negation token that is known to be associated with descriptive_token
             beforehand, if any
         - verb_token: the verb token that is part of the description, if any
 
         Returns a list (result) of dictionaries, where the dictionaries contain information
-        on the attributes and corresponding descriptions for the given token.
+        on the attributes and corresponding descriptions for the given token (and its
+        syntactic parent).
         If the given token does not have a relevant attribute->descriptin mapping, then 
         an empty list is returned.
         """
         result = []
         if token.pos_ == 'NOUN' or token.pos_ == 'VERB':
-            comp = self.get_token_compound(token)
+            comp = self.get_token_compound(token, index)
             token_text = self.get_text(token, comp)
             if negation != None:
                 result.append({'aspect': token_text, 'description': descriptive_token_text})
             else:
-                noun_neg = self.get_token_negation(token, negations)
+                noun_neg = index.get_token_negation(token)
                 if verb_token == None:
                     descriptive_token_text = self.get_text(descriptive_token, noun_neg)
                 else:
                     descriptive_token_text = self.get_text(descriptive_token, verb_token, noun_neg)
                 result.append({'aspect': token_text, 'description': descriptive_token_text})
-        for tok in doc:
-            if (tok.pos_ == 'NOUN' or tok.pos_ == 'VERB') and (token in self.get_children(tok)):
-                comp = self.get_token_compound(tok)
-                tok_text = self.get_text(tok, comp)
-                if negation != None:
-                    result.append({'aspect': tok_text, 'description': descriptive_token_text})
+        tok = index.get_parent(token)
+        if tok != None and (tok.pos_ == 'NOUN' or tok.pos_ == 'VERB'):
+            comp = self.get_token_compound(tok, index)
+            tok_text = self.get_text(tok, comp)
+            if negation != None:
+                result.append({'aspect': tok_text, 'description': descriptive_token_text})
+            else:
+                noun_neg = index.get_token_negation(tok)
+                if verb_token == None:
+                    descriptive_tok_text = self.get_text(descriptive_token, noun_neg)
                 else:
-                    noun_neg = self.get_token_negation(tok, negations)
-                    if verb_token == None:
-                        descriptive_tok_text = self.get_text(descriptive_token, noun_neg)
-                    else:
-                        descriptive_tok_text = self.get_text(descriptive_token, verb_token, noun_neg)
-                    result.append({'aspect': tok_text, 'description': descriptive_tok_text})
+                    descriptive_tok_text = self.get_text(descriptive_token, verb_token, noun_neg)
+                result.append({'aspect': tok_text, 'description': descriptive_tok_text})
         return result
 
 
-    def find_adjective_target(self, descriptive_token, doc, negations, negation=None):
+    def get_parent_nouns_verbs(self, descriptive_token, index, descriptive_token_text, negation, verb_token=None) -> list:
+        """
+        Inputs:
+        - descriptive_token: the descriptive token currently being considered
+        - index: the DocIndex of the customer review
+        - descriptive_token_text: the text of descriptive_token, combined with
+            any negations that are associated with it
+        - negation: the negation token that is known to be associated with descriptive_token
+            beforehand, if any
+        - verb_token: the verb token that is part of the description, if any
+
+        Returns a list of dictionaries containing the mappings of attributes and
+        descriptions found through the syntactic parent of descriptive_token (from the
+        parent itself, its own parent, and its children).
+        Returns None if descriptive_token has no syntactic parent.
+        """
+        token = index.get_parent(descriptive_token)
+        if token == None:
+            return None
+        result = []
+        token_noun_verb = self.get_token_noun_verb(token, index, descriptive_token, descriptive_token_text, negation, verb_token)
+        if token_noun_verb != []:
+            result += token_noun_verb
+        nouns_verbs, _ = self.get_children_nouns_verbs(index.get_children(token), descriptive_token, descriptive_token_text, index, negation, verb_token)
+        result += nouns_verbs
+        return result
+
+
+    def find_adjective_target(self, descriptive_token, index, negation=None):
         """
         Inputs:
         - descriptive_token: a descriptive token (i.e. a token whose syntactic dependency is 'ADJ')
-        - doc: the customer review loaded into spacy's nlp model
-        - negations: a dictionary mapping negation tokens in doc to the tokens they are related to
+        - index: the DocIndex of the customer review
         - negation: the negation token that is known to be associated with descriptive_token
             beforehand, if any
         
@@ -214,55 +298,42 @@ class ABSAModel1:
         descriptive token.
         """
         result = []
-        children = self.get_children(descriptive_token)
+        children = index.get_children(descriptive_token)
 
         descriptive_token_text = self.get_text(descriptive_token, negation)
 
         if children != []:
-            child_nouns_verbs, flag = self.get_children_nouns_verbs(children, descriptive_token, descriptive_token_text, negations, negation)
+            child_nouns_verbs, flag = self.get_children_nouns_verbs(children, descriptive_token, descriptive_token_text, index, negation)
             result += child_nouns_verbs
             if not flag:
-                for token in doc:
-                    if descriptive_token in self.get_children(token):
-                        token_noun_verb = self.get_token_noun_verb(token, doc, descriptive_token, descriptive_token_text, negations, negation)
-                        if token_noun_verb != []:
-                            result += token_noun_verb
-                        nouns_verbs, _ = self.get_children_nouns_verbs(self.get_children(token), descriptive_token, descriptive_token_text, negations, negation)
-                        result += nouns_verbs
-                        return result
+                parent_nouns_verbs = self.get_parent_nouns_verbs(descriptive_token, index, descriptive_token_text, negation)
+                if parent_nouns_verbs != None:
+                    result += parent_nouns_verbs
             return result
         else:
-            for token in doc:
-                if descriptive_token in self.get_children(token):
-                    token_noun_verb = self.get_token_noun_verb(token, doc, descriptive_token, descriptive_token_text, negations, negation)
-                    if token_noun_verb != []:
-                        result += token_noun_verb
-                    child_nouns_verbs, _ = self.get_children_nouns_verbs(self.get_children(token), descriptive_token, descriptive_token_text, negations, negation)
-                    result += child_nouns_verbs
-                    return result
+            return self.get_parent_nouns_verbs(descriptive_token, index, descriptive_token_text, negation)
 
     
-    def get_verb_of_adverb(self, adverb_token, doc):
+    def get_verb_of_adverb(self, adverb_token, index):
         """
         Inputs:
         - adverb_token: a token in doc whose syntactic dependency was 'ADV'
-        - doc: the customer review loaded into spacy's nlp model
+        - index: the DocIndex of the customer review
 
         Returns the verb token associated with the adverb_token if it exists.
         Returns None if there is no verb token linguistically related with
         the given adverb token.
         """
-        for token in doc:
-            if token.pos_ == 'VERB' and adverb_token in self.get_children(token):
-                return token
+        token = index.get_parent(adverb_token)
+        if token != None and token.pos_ == 'VERB':
+            return token
         return None
 
-    def find_adverb_target(self, descriptive_token, doc, negations, verb_token=None, negation=None):
+    def find_adverb_target(self, descriptive_token, index, verb_token=None, negation=None):
         """
         Inputs:
         - descriptive_token: a descriptive token (i.e. a token whose syntactic dependency is 'ADJ')
-        - doc: the customer review loaded into spacy's nlp model
-        - negations: a dictionary mapping negation tokens in doc to the tokens they are related to
+        - index: the DocIndex of the customer review
         - verb_token: the verb token that is part of the description, if any
         - negation: the negation token that is known to be associated with descriptive_token
             beforehand, if any
@@ -272,37 +343,27 @@ class ABSAModel1:
         descriptive token.
         """
         result = []
-        children = self.get_children(descriptive_token)
+        children = index.get_children(descriptive_token)
 
         descriptive_token_text = self.get_text(descriptive_token, verb_token, negation)
 
         if children != []:
-            child_nouns_verbs, flag = self.get_children_nouns_verbs(children, descriptive_token, descriptive_token_text, negations, negation, verb_token)
+            child_nouns_verbs, flag = self.get_children_nouns_verbs(children, descriptive_token, descriptive_token_text, index, negation, verb_token)
             result += child_nouns_verbs
             if not flag:
-                for token in doc:
-                    if descriptive_token in self.get_children(token):
-                        token_noun_verb = self.get_token_noun_verb(token, doc, descriptive_token, descriptive_token_text, negations, negation, verb_token)
-                        if token_noun_verb != []:
-                            result += token_noun_verb
-                        nouns_verbs, _ = self.get_children_nouns_verbs(self.get_children(token), descriptive_token, descriptive_token_text, negations, negation, verb_token)
-                        result += nouns_verbs
-                        return result
+                parent_nouns_verbs = self.get_parent_nouns_verbs(descriptive_token, index, descriptive_token_text, negation, verb_token)
+                if parent_nouns_verbs != None:
+                    result += parent_nouns_verbs
             return result
         else:
-            for token in doc:
-                if descriptive_token in self.get_children(token):
-                    token_noun_verb = self.get_token_noun_verb(token, doc, descriptive_token, descriptive_token_text, negations, negation, verb_token)
-                    if token_noun_verb != []:
-                        result += token_noun_verb
-                    child_nouns_verbs, _ = self.get_children_nouns_verbs(self.get_children(token), descriptive_token, descriptive_token_text, negations, negation, verb_token)
-                    result += child_nouns_verbs
-                    return result
+            return self.get_parent_nouns_verbs(descriptive_token, index, descriptive_token_text, negation, verb_token)
     
 
-    def mine_aspects(self, text: str) -> list:
+    def mine_aspects(self, text: str, doc=None) -> list:
         """
-        Takes a customer review (text).
+        Takes a customer review (text). Optionally takes the customer review
+        already loaded into spacy's nlp model (doc), in which case the text is
+        not parsed again.
         Returns a list of dictionaries (aspects), where each dictionary
         has a key 'aspect' which maps to an attribute (product feature),
         and a key 'description' which maps to the description used
@@ -311,34 +372,24 @@ class ABSAModel1:
         of the attribute-description pairs in the customer review.
         """
         aspects = []
-        doc = nlp(text)
-        negations = self.get_negations(doc)
+        if doc is None:
+            doc = get_spacy("parser")(text)
+        index = DocIndex(doc)
         for token in doc:
             if token.pos_ == 'ADJ':
-                token_neg = self.get_token_negation(token, negations)
-                result = self.find_adjective_target(token, doc, negations, token_neg)
+                token_neg = index.get_token_negation(token)
+                result = self.find_adjective_target(token, index, token_neg)
                 if result != None:
                     aspects += result
             elif token.pos_ == 'ADV':
-                verb_token = self.get_verb_of_adverb(token, doc)
-                token_neg = self.get_token_negation(token, negations)
-                result = self.find_adverb_target(token, doc, negations, verb_token, token_neg)
+                verb_token = self.get_verb_of_adverb(token, index)
+                token_neg = index.get_token_negation(token)
+                result = self.find_adverb_target(token, index, verb_token, token_neg)
                 if result != None:
                     aspects += result
         return aspects
     
 
-    def classify_sentiment(self, phrase: str) -> float:
-        """
-        Takes a phrase (string).
-        Uses the VADER SentimentIntensityAnalyzer to get the sentiment
-        polarity score for the phrase (classifies the sentiment of the
-        phrase).
-        Returns the compound polarity score of this sentiment classification
-        """
-        sentiment = self.sentiment_classifier.polarity_scores(phrase)
-        return sentiment['compound']
-
     def find_sentiment(self, aspects):
         """
         Takes a list of dictionaries (aspects) where each dictionary contains
@@ -348,11 +399,13 @@ class ABSAModel1:
         for the phrases contained within each of these attribute -> description
         mappings, and adding both of these values to the corresponding dictionary.
 
+        The polarity score is the average of the TextBlob and VADER polarity scores.
+
         Returns the aspects list after modifying each of the dictionaries within
         aspects after adding these sentiment polarity and subjectivity values
         """
-        for aspect in aspects:
-            sentiment = TextBlob(aspect['description'] + ' ' + aspect['aspect']).sentiment
-            aspect['polarity'] = (sentiment.polarity + self.classify_sentiment(aspect['description'] + ' ' + aspect['aspect'])) / 2
-            aspect['subjectivity'] = sentiment.subjectivity
+        scores = self.polarity_scorer.score_many(aspect['description'] + ' ' + aspect['aspect'] for aspect in aspects)
+        for aspect, score in zip(aspects, scores):
+            aspect['polarity'] = (score.textblob_polarity + score.vader_polarity) / 2
+            aspect['subjectivity'] = score.subjectivity
         return aspects
\ No newline at end of file
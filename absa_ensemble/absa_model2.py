@@ -1,37 +1,108 @@
-import stanza
-stanza.download('en')
-nlp = stanza.Pipeline('en')
-
 import nltk
-nltk.download('stopwords')
-nltk.download('punkt')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('vader_lexicon')
-from nltk.sentiment import SentimentIntensityAnalyzer
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize, sent_tokenize
 
-from textblob import TextBlob
+from model_registry import get_stanza, require_nltk_data
+from absa_ensemble.polarity_scorer import get_polarity_scorer
+
+
+def mine_reviews(reviews: list, single_pass: bool=False) -> list:
+    """
+    Takes a list of customer reviews (reviews).
+    Runs ABSAModel2 on each of the customer reviews, but rather than running the
+    Stanford NLP parser once for every sentence of every customer review, all of
+    the sentences of all of the customer reviews are parsed together in a single
+    call to the parser.
+    If single_pass is True, then the customer reviews are annotated in the
+    single-pass mode of ABSAModel2 (all of the customer reviews are still
+    annotated together in a single call to the parser).
+    Returns a list of the ABSAModel2 objects for the customer reviews, in the same
+    order as reviews.
+    """
+    models = [ABSAModel2(review, parse=False, single_pass=single_pass) for review in reviews]
+    if single_pass:
+        documents = get_stanza(pretokenized=False).bulk_process([model.review for model in models]) if models != [] else []
+        for model, document in zip(models, documents):
+            model.complete_from_annotation(document)
+        return models
+    pretokenized = []
+    for model in models:
+        pretokenized += [sentence for sentence in model.sentence_word_list if sentence != []]
+    parsed = iter(get_stanza()(pretokenized).sentences if pretokenized != [] else [])
+    for model in models:
+        parsed_sentences = [next(parsed) for sentence in model.sentence_word_list if sentence != []]
+        model.complete(model.map_sentence_dependencies(parsed_sentences, model.sentence_word_list))
+    return models
 
 
 class ABSAModel2:
 
-    def __init__(self, review: str):
+    def __init__(self, review: str, parse: bool=True, single_pass: bool=False):
+        """
+        Takes a customer review (review).
+        If parse is False, then the dependency parsing of the customer review is
+        left to the caller, which has to pass the resulting dependencies to
+        self.complete (or, if single_pass is True, the Stanford NLP annotation of
+        the customer review to self.complete_from_annotation) before self.result
+        is populated.
+        If single_pass is True, then the sentences, words, Part of Speech tags
+        and dependencies of the customer review all come from a single annotation
+        of the customer review by the Stanford NLP pipeline, rather than from nltk's
+        tokenizers and tagger followed by the Stanford NLP parser.
+        """
         review = self.fix_review_format(review)
         self.review = review
-        self.sentiment_classifier = SentimentIntensityAnalyzer()
+        self.polarity_scorer = get_polarity_scorer()
         self.word_maps = dict()
+        self.result = None
+        if single_pass:
+            require_nltk_data('stopwords')
+            self.sentence_word_list = None
+            self.tagged_sentences = None
+            if parse:
+                self.complete_from_annotation(get_stanza(pretokenized=False)(review))
+            return
+        require_nltk_data('stopwords', 'punkt', 'averaged_perceptron_tagger')
         sentence_list = self.tokenize_sentences(review)
         pos_tagged_lists = self.tokenizing_and_pos_tagging(sentence_list)
-        sentence_word_list = self.compounds_and_negatives(pos_tagged_lists)
-        final_sentence_list = self.get_sentence_list_from_sentence_word_list(sentence_word_list)
-        tagged_sentences = self.stopword_removal_and_pos_tagging(self.tokenize_sentence_list(final_sentence_list))
-        sentence_dependencies = self.get_sentence_dependencies(final_sentence_list, sentence_word_list)
-        feature_list = self.select_attribute_sublists(tagged_sentences)
+        self.sentence_word_list = self.compounds_and_negatives(pos_tagged_lists)
+        final_sentence_list = self.get_sentence_list_from_sentence_word_list(self.sentence_word_list)
+        self.tagged_sentences = self.stopword_removal_and_pos_tagging(self.tokenize_sentence_list(final_sentence_list))
+        if parse:
+            self.complete(self.get_sentence_dependencies(final_sentence_list, self.sentence_word_list))
+
+    def complete(self, sentence_dependencies) -> None:
+        """
+        Takes the syntactic dependencies of the customer review (sentence_dependencies).
+        Extracts the product features and their descriptions from the customer review,
+        and stores them in self.result
+        """
+        feature_list = self.select_attribute_sublists(self.tagged_sentences)
         feature_clusters = self.identify_descriptive_words(feature_list, sentence_dependencies)
         final_features = self.get_final_features(feature_list, feature_clusters)
         self.result = self.format_features(final_features) # This is the field that would be picked up by the Pipeline
 
+    def complete_from_annotation(self, document) -> None:
+        """
+        Takes the customer review as annotated by the Stanford NLP pipeline
+        (document), which splits the customer review into sentences and words
+        itself.
+        Combines compound phrases and negation phrases into one token, using the
+        Part of Speech tags from the annotation, and takes the dependencies between
+        these tokens from the same annotation. Then extracts the product features
+        and their descriptions from the customer review, and stores them in
+        self.result
+        """
+        pos_tagged_lists = [[(word.text, word.xpos) for word in sentence.words] for sentence in document.sentences]
+        merged_spans = self.get_merged_spans(pos_tagged_lists)
+        self.sentence_word_list = [self.merge_words(sentence, spans) for sentence, spans in zip(pos_tagged_lists, merged_spans)]
+        stop_words = self.get_stop_words()
+        self.tagged_sentences = [[(word, sentence[spans[index][-1]][1]) for index, word in enumerate(words) if word not in stop_words] \
+            for sentence, spans, words in zip(pos_tagged_lists, merged_spans, self.sentence_word_list)]
+        sentence_dependencies = [self.map_annotation_dependencies(sentence, spans, words) \
+            for sentence, spans, words in zip(document.sentences, merged_spans, self.sentence_word_list)]
+        self.complete(sentence_dependencies)
+
     
 
     def fix_review_format(self, review: str) -> str:
@@ -69,31 +140,54 @@ class ABSAModel2:
         """
         return [nltk.pos_tag(word_tokenize(sentence)) for sentence in sentence_list]
     
-    def compounds_and_negatives(self, pos_tagged_lists) -> list:
+    def get_merged_spans(self, pos_tagged_lists) -> list:
         """
         Takes a list of Part of Speech tagged sentences from a customer
         review (pos_tagged_lists).
-        Returns a list of new sentences, in which compound phrases or negation phrases
-        are combined into one token.
+        Returns a list with the tokens of each sentence once compound phrases or
+        negation phrases are combined into one token, where each token is given as
+        the list of the indexes of the words of the sentence that it is made of.
         """
-        new_sentence_list = []
+        merged_spans = []
         flag = False
         for sentence in pos_tagged_lists:
             sentence_length = len(sentence)
-            new_sentence = []
+            spans = []
             for i in range(sentence_length - 1):
                 if sentence[i][0] in {'not', 'non'} or (sentence[i][1] == 'NN' and sentence[i+1][1] == 'NN'):
-                    new_sentence.append(sentence[i][0] + sentence[i+1][0])
-                    self.word_maps[sentence[i][0] + sentence[i+1][0]] = sentence[i][0] + '_' + sentence[i+1][0]
+                    spans.append([i, i+1])
                     flag = True
                 elif flag:
                     flag = False
                 else:
-                    new_sentence.append(sentence[i][0])
+                    spans.append([i])
                     if i == sentence_length - 2:
-                        new_sentence.append(sentence[i+1][0])
-            new_sentence_list.append(new_sentence)
-        return new_sentence_list
+                        spans.append([i+1])
+            merged_spans.append(spans)
+        return merged_spans
+
+    def merge_words(self, sentence, spans) -> list:
+        """
+        Takes a Part of Speech tagged sentence (sentence), and the indexes of the
+        words that make up each of its tokens (spans, see self.get_merged_spans).
+        Returns the list of the tokens of the sentence, in which the words of each
+        compound phrase or negation phrase are joined together.
+        """
+        new_sentence = []
+        for span in spans:
+            new_sentence.append("".join(sentence[i][0] for i in span))
+            if len(span) > 1:
+                self.word_maps[new_sentence[-1]] = "_".join(sentence[i][0] for i in span)
+        return new_sentence
+
+    def compounds_and_negatives(self, pos_tagged_lists) -> list:
+        """
+        Takes a list of Part of Speech tagged sentences from a customer
+        review (pos_tagged_lists).
+        Returns a list of new sentences, in which compound phrases or negation phrases
+        are combined into one token.
+        """
+        return [self.merge_words(sentence, spans) for sentence, spans in zip(pos_tagged_lists, self.get_merged_spans(pos_tagged_lists))]
     
     def get_sentence_list_from_sentence_word_list(self, sentence_word_list) -> list:
         """
@@ -122,10 +216,17 @@ class ABSAModel2:
         where each tuple contains the word and the corresponding Part of
         Speech tag
         """
-        stop_words = set(stopwords.words('english'))
-        stop_words.remove('not')
+        stop_words = self.get_stop_words()
         sentence_list = [[word for word in sentence if word not in stop_words] for sentence in tokenized_sentences]
         return [nltk.pos_tag(sentence) for sentence in sentence_list]
+
+    def get_stop_words(self) -> set:
+        """
+        Returns the set of standard nltk stopwords, excluding the word 'not'
+        """
+        stop_words = set(stopwords.words('english'))
+        stop_words.remove('not')
+        return stop_words
     
     
     def get_sentence_dependencies(self, sentence_list, sentence_word_list) -> list:
@@ -140,16 +241,34 @@ class ABSAModel2:
         text of the customer reviews using the Stanford NLP parser.
         Returns a list containing these dependency relationships
         """
-        sentence_dependencies = []
+        nlp = get_stanza()
+        parsed_sentences = []
         for sentence in sentence_list:
             doc = nlp(sentence)
-            dependency_node = []
             try:
-                for dependency_edge in doc.sentences[0].dependencies:
-                    dependency_node.append([dependency_edge[2].text, dependency_edge[0].id, dependency_edge[1]])
-                sentence_dependencies.append(dependency_node)
+                parsed_sentences.append(doc.sentences[0])
             except:
                 pass
+        return self.map_sentence_dependencies(parsed_sentences, sentence_word_list)
+
+    def map_sentence_dependencies(self, parsed_sentences, sentence_word_list) -> list:
+        """
+        Inputs:
+        - parsed_sentences: a list of the sentences of the customer review, as parsed
+            by the Stanford NLP parser
+        - sentence_word_list: a list of the sentences of the customer review, where
+            each sentence is a list of words
+        
+        Extracts the dependency relationships from each of the parsed sentences, and
+        replaces the index of the head of each relationship with the corresponding word.
+        Returns a list containing these dependency relationships
+        """
+        sentence_dependencies = []
+        for sentence in parsed_sentences:
+            dependency_node = []
+            for dependency_edge in sentence.dependencies:
+                dependency_node.append([dependency_edge[2].text, dependency_edge[0].id, dependency_edge[1]])
+            sentence_dependencies.append(dependency_node)
         
         for index, dependency_node in enumerate(sentence_dependencies):
             for i in range(len(dependency_node)):
@@ -162,6 +281,37 @@ class ABSAModel2:
             sentence_dependencies[index] = dependency_node
         return sentence_dependencies
 
+    def map_annotation_dependencies(self, sentence, spans, words) -> list:
+        """
+        Inputs:
+        - sentence: a sentence of the customer review, as annotated by the Stanford
+            NLP pipeline
+        - spans: the indexes of the words of the sentence that make up each of its
+            tokens (see self.get_merged_spans)
+        - words: the tokens of the sentence, with compounds and negations joined
+        
+        Extracts the dependency relationships between the tokens of the sentence from
+        the annotation, in the same form as self.map_sentence_dependencies (the head of
+        each relationship is replaced with the corresponding token). Each word belongs
+        to the first token that contains it; relationships between the words of the
+        same token, and relationships with words that are not part of any token, are
+        left out.
+        Returns a list containing these dependency relationships
+        """
+        word_tokens = dict() # Maps the index of each word to the index of its token
+        for index, span in enumerate(spans):
+            for i in span:
+                word_tokens.setdefault(i, index)
+        dependency_node = []
+        for i, word in enumerate(sentence.words):
+            if i not in word_tokens:
+                continue
+            if word.head == 0:
+                dependency_node.append([words[word_tokens[i]], 0, word.deprel])
+            elif word.head - 1 in word_tokens and word_tokens[word.head - 1] != word_tokens[i]:
+                dependency_node.append([words[word_tokens[i]], words[word_tokens[word.head - 1]], word.deprel])
+        return dependency_node
+
     def select_attribute_sublists(self, tagged_sentences) -> list:
         """
         Takes a list of Part of Speech (POS) tagged sentences.
@@ -196,25 +346,43 @@ class ABSAModel2:
         For each feature in feature_list, checks if there is a dependency edge which
         lies in this type, for which one of the words in conencted by the dependency
         edge is the feature. If these conditions are satisfied, then the word connected
-        to the feature by the edge is the description.
+        to the feature by the edge is the description. The edges are indexed by the
+        words they connect once per customer review, so each feature is looked up
+        rather than checked against every edge.
         A list containing the feature word and the descriptive word is added to the
         list feature_clusters.
         The list feature_clusters is returned. It essentially contains pairs
         of attributes (product features) and the corresponding descriptions.
         """
         possible_edges = {'nsubj', 'acl:relcl', 'obj', 'dobj', 'agent', 'advmod', 'amod', 'neg', 'prep_of', 'acomp', 'xcomp', 'compound', 'csubj'}
+        related_words_index = self.get_related_words_index(sentence_dependencies, possible_edges)
         feature_clusters = []
         for feature in feature_list:
-            related_words = []
-            for dependency_node in sentence_dependencies:
-                for triplet in dependency_node:
-                    if (triplet[0] == feature[0] or triplet[1] == feature[0]) and triplet[2] in possible_edges:
-                        if triplet[0] == feature[0]:
-                            related_words.append(triplet[1])
-                        else:
-                            related_words.append(triplet[0])
-            feature_clusters.append([feature[0], related_words])
+            feature_clusters.append([feature[0], list(related_words_index.get(feature[0], []))])
         return feature_clusters
+
+    def get_related_words_index(self, sentence_dependencies, possible_edges) -> dict:
+        """
+        Inputs:
+        - sentence_dependencies: a list of the syntactic dependencies in the
+            customer review
+        - possible_edges: the set of dependency edge values that could map a
+            descriptive relationship
+        
+        Returns a dictionary which maps each word to the list of words connected to
+        it by a dependency edge in possible_edges, in the order in which the edges
+        appear in sentence_dependencies (an edge connecting a word to itself is only
+        counted once).
+        """
+        related_words_index = dict()
+        for dependency_node in sentence_dependencies:
+            for triplet in dependency_node:
+                if triplet[2] not in possible_edges:
+                    continue
+                related_words_index.setdefault(triplet[0], []).append(triplet[1])
+                if triplet[1] != triplet[0]:
+                    related_words_index.setdefault(triplet[1], []).append(triplet[0])
+        return related_words_index
     
 
     def get_final_features(self, feature_list, feature_clusters) -> list:
@@ -234,10 +402,7 @@ class ABSAModel2:
         wherein each inner list is a mapping of a product feature and the
         description used for the product with respect to that feature.
         """
-        feature_POS = dict()
-        for feature in feature_list:
-            feature_POS[feature[0]] = feature[1]
-        
+        feature_POS = dict(feature_list) # Maps each feature to the POS tag of its last occurrence
         final_features = []
         for entry in feature_clusters:
             if 'NN' in feature_POS[entry[0]] or 'VB' in feature_POS[entry[0]]:
@@ -245,17 +410,6 @@ class ABSAModel2:
         return final_features
     
 
-    def classify_sentiment(self, phrase: str) -> float:
-        """
-        Takes a phrase (string).
-        Uses the VADER SentimentIntensityAnalyzer to get the sentiment
-        polarity score for the phrase (classifies the sentiment of the
-        phrase).
-        Returns the compound polarity score of this sentiment classification
-        """
-        sentiment = self.sentiment_classifier.polarity_scores(phrase)
-        return sentiment['compound']
-    
     def format_features(self, final_features) -> list:
         """
         Takes final_features, a list of lists, where each inner list is a
@@ -267,16 +421,17 @@ class ABSAModel2:
         dictionaries (features_list), where each dictionary contains
         information on a single feature ('aspect'), its description,
         its sentiment polarity, and its sentiment subjectivity.
+        The polarity is the average of the TextBlob and VADER polarity scores.
 
         This list of dictionaries (freatures_list) is then returned.
         """
         features_list = []
+        phrases = []
         for feature in final_features:
             for description in feature[1]:
                 description = str(description)
                 if description in self.word_maps:
                     description = self.word_maps[description]
-                sentiment = TextBlob(description.replace("_", " ") + ' ' + feature[0]).sentiment
                 if feature[0] in self.word_maps:
                     aspect = self.word_maps[feature[0]]
                 else:
@@ -284,7 +439,9 @@ class ABSAModel2:
                 features_list.append({
                     'aspect': aspect,
                     'description': description,
-                    'polarity': (sentiment.polarity + self.classify_sentiment(description.replace("_", " ") + ' ' + str(feature[0]))) / 2,
-                    'subjectivity': sentiment.subjectivity,
                 })
-        return features_list
+                phrases.append(description.replace("_", " ") + ' ' + str(feature[0]))
+        for entry, score in zip(features_list, self.polarity_scorer.score_many(phrases)):
+            entry['polarity'] = (score.textblob_polarity + score.vader_polarity) / 2
+            entry['subjectivity'] = score.subjectivity
+        return features_list
\ No newline at end of file
@@ -0,0 +1,123 @@
+import os
+import json
+import shutil
+
+import pandas as pd
+
+
+ASPECT_TABLE_DIRECTORY = "templates/static/data-files/mined_aspects"
+MANIFEST_FILENAME = "_manifest.json"
+
+# The columns of the aspect table, in order:
+# - reviewId: the row of the customer review in mined_data.csv
+# - productId: the productID of the customer review
+# - source: whether the entry was mined from the text or the header of the customer review
+# - position: the position of the entry in the mined results of its source
+# - aspect, description, polarity, subjectivity: the mined entry itself
+ASPECT_TABLE_COLUMNS = ['reviewId', 'productId', 'source', 'position', 'aspect', 'description', 'polarity', 'subjectivity']
+SOURCES = ['text', 'header']
+
+
+def build_aspect_table(df):
+    """
+    Takes a pandas DataFrame of mined customer reviews (df), whose minedText (and,
+    if present, minedHeader) columns hold the mined results as lists of entries, and
+    whose index is the row of each customer review in mined_data.csv.
+    Returns a pandas DataFrame with one row per mined entry (see ASPECT_TABLE_COLUMNS),
+    ordered by customer review, then source (text before header), then position.
+    """
+    table = {column: [] for column in ASPECT_TABLE_COLUMNS}
+    product_ids = df['productID'] if 'productID' in df.columns else [None] * len(df)
+    mined_headers = df['minedHeader'] if 'minedHeader' in df.columns else [None] * len(df)
+    for review_id, product_id, mined_text, mined_header in zip(df.index, product_ids, df['minedText'], mined_headers):
+        product_id = int(product_id) if pd.notna(product_id) else -1
+        for source, mined_results in (('text', mined_text), ('header', mined_header)):
+            if not isinstance(mined_results, list):
+                continue
+            for position, entry in enumerate(mined_results):
+                table['reviewId'].append(int(review_id))
+                table['productId'].append(product_id)
+                table['source'].append(source)
+                table['position'].append(position)
+                table['aspect'].append(str(entry['aspect']))
+                table['description'].append(str(entry['description']))
+                table['polarity'].append(float(entry['polarity']))
+                table['subjectivity'].append(float(entry['subjectivity']))
+    aspect_table = pd.DataFrame(table, columns=ASPECT_TABLE_COLUMNS)
+    aspect_table = aspect_table.astype({'reviewId': 'int64', 'productId': 'int64', 'position': 'int32', \
+        'polarity': 'float64', 'subjectivity': 'float64'})
+    aspect_table['source'] = pd.Categorical(aspect_table['source'], categories=SOURCES, ordered=True)
+    return aspect_table
+
+
+def reset_aspect_table(directory: str=ASPECT_TABLE_DIRECTORY) -> None:
+    """
+    Takes the directory of the aspect table (directory).
+    Deletes any aspect table in the directory, and creates it again, empty.
+    """
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def invalidate_aspect_table(directory: str=ASPECT_TABLE_DIRECTORY) -> None:
+    """
+    Takes the directory of the aspect table (directory).
+    Deletes the manifest of the aspect table (if there is one), so that the table is not
+    used until it is completed again.
+    """
+    try:
+        os.remove(os.path.join(directory, MANIFEST_FILENAME))
+    except FileNotFoundError:
+        pass
+
+
+def write_aspect_table_part(aspect_table, part: int=0, directory: str=ASPECT_TABLE_DIRECTORY) -> None:
+    """
+    Takes a pandas DataFrame built by build_aspect_table (aspect_table), and the number
+    of the part of the table that it is (part).
+    Writes it to the directory of the aspect table as a Parquet file. The parts are read
+    back in the order of their numbers.
+    """
+    os.makedirs(directory, exist_ok=True)
+    aspect_table.to_parquet(os.path.join(directory, f"part-{part:05d}.parquet"), index=False)
+
+
+def get_file_signature(filepath: str) -> dict:
+    """
+    Takes a filepath. Returns the size and modification time of the file.
+    """
+    stat = os.stat(filepath)
+    return {'size': stat.st_size, 'mtimeNs': stat.st_mtime_ns}
+
+
+def complete_aspect_table(mined_filepath: str="templates/static/data-files/mined_data.csv", \
+    directory: str=ASPECT_TABLE_DIRECTORY) -> None:
+    """
+    Takes the filepath to the mined customer reviews (mined_filepath).
+    Writes the manifest of the aspect table, which records the mined_data.csv file that
+    the table was built with, once all of its parts have been written.
+    """
+    with open(os.path.join(directory, MANIFEST_FILENAME), 'w') as f:
+        json.dump({'minedData': get_file_signature(mined_filepath)}, f)
+
+
+def load_aspect_table(mined_filepath: str="templates/static/data-files/mined_data.csv", \
+    directory: str=ASPECT_TABLE_DIRECTORY):
+    """
+    Takes the filepath to the mined customer reviews (mined_filepath).
+    Returns the aspect table (a pandas DataFrame) if it was completed for the current
+    mined_data.csv file. Returns None otherwise (ex: if it is missing, if the customer
+    reviews were mined again without it, or if Parquet files cannot be read).
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_FILENAME)) as f:
+            manifest = json.load(f)
+        if manifest['minedData'] != get_file_signature(mined_filepath):
+            return None
+        parts = sorted(filename for filename in os.listdir(directory) if filename.endswith('.parquet'))
+        if parts == []:
+            return build_aspect_table(pd.DataFrame({'minedText': []}))
+        return pd.concat([pd.read_parquet(os.path.join(directory, part), columns=ASPECT_TABLE_COLUMNS) for part in parts], \
+            ignore_index=True)
+    except (OSError, ValueError, KeyError, ImportError):
+        return None
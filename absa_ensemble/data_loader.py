@@ -1,18 +1,44 @@
+import os
 import contractions
 import pandas as pd
 
-import spacy
-nlp = spacy.load('en_core_web_sm')
+from spacy.tokens import DocBin
+
+from model_registry import get_spacy
 
 
 class DataLoader:
 
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, batch_size: int=64, chunk_rows: int=None, export_docs: bool=False):
+        """
+        Takes the filepath to the scraped customer reviews (filepath), and the number
+        of customer reviews loaded into spacy's nlp model together in each batch
+        (batch_size).
+        Lemmatization uses a spacy model with only the components needed for lemmas, so
+        the customer reviews are not dependency parsed while they are preprocessed.
+        If export_docs is True, then besides the preprocessed text of the customer reviews,
+        the preprocessed customer reviews are also exported already loaded into spacy's
+        nlp model (as spacy DocBin files, parsed with the same spacy model that ABSA v1
+        uses), so that the ABSA models do not need to parse them again. This is only worth
+        it when every customer review is going to be mined in this process; otherwise the
+        ABSA models parse only the customer reviews they actually mine (see Pipeline).
+        If chunk_rows is given, then the customer reviews are instead read, preprocessed
+        and appended to preprocessed_dataset.csv chunk_rows rows at a time, so that only
+        one chunk of rows is held in memory. The parsed customer reviews are not exported
+        in this case (the streaming Pipeline parses each chunk as it mines it).
+        """
         self.data = None
         self.filepath = filepath
+        self.batch_size = batch_size
+        self.chunk_rows = chunk_rows
+        self.export_docs = export_docs
+        self.docs = dict() # Maps each preprocessed column to a DocBin of its parsed customer reviews
 
-        self.load_data()
-        self.write_data()
+        if chunk_rows is None:
+            self.load_data()
+            self.write_data()
+        else:
+            self.load_data_in_chunks()
 
 
     def get_csv_data(self) -> None:
@@ -33,9 +59,15 @@ class DataLoader:
         the DataFrame in self.data
         If the filepath is not to a CSV file, then it raises a TypeError.
         """
-        if self.filepath[-3:].lower() == 'csv':
-            self.get_csv_data()
-        else:
+        self.check_filepath()
+        self.get_csv_data()
+
+    def check_filepath(self) -> None:
+        """
+        Raises a TypeError if the filepath stored in self.filepath is not the
+        filepath to a CSV file.
+        """
+        if self.filepath[-3:].lower() != 'csv':
             raise TypeError("The entered data file should either be a .csv file")
     
 
@@ -61,10 +93,43 @@ class DataLoader:
         Takes a customer review (text). Lemmatizes each of the words in the
         customer reviews. Returns the resulting text.
         """
-        doc = nlp(text)
+        doc = get_spacy("lemmatizer")(text)
         return " ".join([token.lemma_ for token in doc])
 
     
+    def get_lemmatized_texts(self, texts: list) -> list:
+        """
+        Takes a list of customer reviews (texts). Lemmatizes each of the words in
+        the customer reviews, loading them into spacy's nlp model in batches. Only the
+        components of the model needed for lemmatization are run (the dependency
+        parser and the named entity recognizer do not affect the lemmas).
+        Returns a list of the resulting texts.
+        """
+        docs = get_spacy("lemmatizer").pipe(texts, batch_size=self.batch_size)
+        return [" ".join([token.lemma_ for token in doc]) for doc in docs]
+
+    def get_parsed_texts(self, texts: list):
+        """
+        Takes a list of preprocessed customer reviews (texts).
+        Loads each of the customer reviews into spacy's nlp model (in batches), and
+        returns a DocBin containing all of the resulting docs, in the same order as
+        texts.
+        """
+        doc_bin = DocBin()
+        for doc in get_spacy("parser").pipe(texts, batch_size=self.batch_size):
+            doc_bin.add(doc)
+        return doc_bin
+
+    def preprocess_column(self, column) -> list:
+        """
+        Takes a column of customer reviews (column).
+        Returns a list with the preprocessed version of each of the customer reviews,
+        applying the same preprocessing steps as self.preprocess_data, but loading the
+        customer reviews into spacy's nlp model in batches.
+        """
+        texts = [self.expand_contractions(self.to_lower_case(str(x))) for x in column]
+        return [self.to_lower_case(text) for text in self.get_lemmatized_texts(texts)]
+
     def preprocess_data(self, text: str) -> str:
         """
         Takes a customer review (text). Returns the preprocessed version of the
@@ -85,18 +150,52 @@ class DataLoader:
         a pandas DataFrame.
         Applies preprocessing on all of the scraped review data.
         Stores this data in self.data
+        Each preprocessed customer review is then loaded into spacy's nlp model
+        once, and the resulting docs are stored in self.docs
         """
         self.get_data()
-        self.data['reviewText'] = self.data['reviewText'].apply(lambda x: self.preprocess_data(str(x)))
+        self.data['reviewText'] = self.preprocess_column(self.data['reviewText'])
+        if self.export_docs:
+            self.docs['reviewText'] = self.get_parsed_texts(self.data['reviewText'].to_list())
         try:
-            self.data['reviewHeader'] = self.data['reviewHeader'].apply(lambda x: self.preprocess_data(str(x)))
+            self.data['reviewHeader'] = self.preprocess_column(self.data['reviewHeader'])
+            if self.export_docs:
+                self.docs['reviewHeader'] = self.get_parsed_texts(self.data['reviewHeader'].to_list())
         except Exception:
             pass
         print("Data has been loaded")
     
+    def load_data_in_chunks(self) -> None:
+        """
+        Reads the data in the CSV file with the scraped customer reviews self.chunk_rows
+        rows at a time. Applies the same preprocessing as self.load_data to each chunk of
+        rows (without loading the preprocessed customer reviews into spacy's nlp model
+        again), and appends it to preprocessed_dataset.csv, so that the file is the same
+        as the one written by self.write_data.
+        """
+        self.check_filepath()
+        with open('templates/static/data-files/preprocessed_dataset.csv', 'w', newline='') as f:
+            for chunk_number, self.data in enumerate(pd.read_csv(self.filepath, chunksize=self.chunk_rows)):
+                self.data['reviewText'] = self.preprocess_column(self.data['reviewText'])
+                if 'reviewHeader' in self.data.columns:
+                    self.data['reviewHeader'] = self.preprocess_column(self.data['reviewHeader'])
+                self.data.to_csv(f, header=(chunk_number == 0))
+                print("Preprocessed chunk", chunk_number + 1)
+        print("Data has been loaded")
+
     def write_data(self) -> None:
         """
         Takes the data in the pandas DataFrame self.data
         Exports this data to a CSV file: preprocessed_dataset.csv
+        Also exports the parsed customer reviews in self.docs to DocBin files:
+        preprocessed_reviewText_docs.spacy and preprocessed_reviewHeader_docs.spacy
+        (and removes the DocBin files of an earlier run that are not exported again, so
+        that they are never mistaken for the parsed versions of this data)
         """
         self.data.to_csv('templates/static/data-files/preprocessed_dataset.csv')
+        for column in ['reviewText', 'reviewHeader']:
+            docs_filepath = f'templates/static/data-files/preprocessed_{column}_docs.spacy'
+            if column in self.docs:
+                self.docs[column].to_disk(docs_filepath)
+            elif os.path.exists(docs_filepath):
+                os.remove(docs_filepath)
@@ -1,31 +1,259 @@
+import os
+import json
+import hashlib
 import pandas as pd
+from multiprocessing import Pool
 
 from absa_ensemble.data_loader import DataLoader
-from absa_ensemble.absa_ensemble_model import ABSAEnsemble
+from absa_ensemble.absa_ensemble_model import ABSAEngine, get_model_version
+from absa_ensemble.absa_model1 import load_docs
+from absa_ensemble.absa_cache import ABSACache
+from absa_ensemble.polarity_scorer import get_polarity_scorer
+from absa_ensemble.aspect_table import build_aspect_table, reset_aspect_table, invalidate_aspect_table, \
+    write_aspect_table_part, complete_aspect_table
+from model_registry import get_spacy, get_stanza, require_nltk_data
+from run_telemetry import track_progress
+
+
+worker_state = dict() # Holds the models loaded by each worker process of the process pool
+
+def init_worker(batch_size: int, chunk_size: int, single_pass: bool=False) -> None:
+    """
+    Runs once in each worker process of the process pool, when the worker starts.
+    Loads the spacy and Stanza models (and the nltk data) used by the ABSA models
+    through the model registry, and creates the worker's ABSAEngine and
+    PolarityScorer (loading the VADER and TextBlob lexicons), so that none of these
+    are loaded again for every customer review.
+    """
+    get_spacy("parser")
+    get_stanza(pretokenized=not single_pass)
+    require_nltk_data('stopwords', 'punkt', 'averaged_perceptron_tagger')
+    worker_state['engine'] = ABSAEngine(batch_size=batch_size, chunk_size=chunk_size, single_pass=single_pass)
+    get_polarity_scorer().score("warm up")
+
+def mine_worker_chunk(reviews: list) -> tuple:
+    """
+    Takes a list of preprocessed customer reviews (reviews).
+    Runs inside a worker process of the process pool: mines the customer reviews
+    using the worker's ABSAEngine.
+    Returns a tuple with the mined results, and a dictionary with the id of the worker
+    process (worker), the number of memoized polarity scorer lookups (hits) and of
+    phrases that had to be scored (misses) while mining them, and the number of phrases
+    memoized by the worker's PolarityScorer afterwards (size).
+    """
+    polarity_scorer = get_polarity_scorer()
+    stats_before = polarity_scorer.get_stats()
+    results = worker_state['engine'].mine_many(reviews)
+    stats_after = polarity_scorer.get_stats()
+    return results, {
+        'worker': os.getpid(),
+        'hits': stats_after['hits'] - stats_before['hits'],
+        'misses': stats_after['misses'] - stats_before['misses'],
+        'size': stats_after['size']
+    }
+
 
 class Pipeline:
     
-    def __init__(self, filepath: str="templates/static/data-files/review_data.csv"):
+    def __init__(self, filepath: str="templates/static/data-files/review_data.csv", batch_size: int=64, n_process: int=1, \
+        chunk_size: int=256, n_workers: int=1, cache_filepath: str="templates/static/data-files/absa_cache.db", \
+        cache_max_entries: int=1000000, streaming: bool=False, stream_chunk_rows: int=1000, single_pass: bool=False, \
+        export_docs: bool=False):
+        """
+        Takes the filepath to the scraped customer reviews (filepath).
+        Also takes the number of customer reviews that are loaded into spacy's nlp
+        model together in each batch (batch_size) and the number of processes used
+        to do so (n_process), as well as the number of customer reviews whose
+        sentences are sent through the Stanford NLP parser together (chunk_size).
+        If batch_size is None, then each customer review is processed separately.
+        If n_workers is greater than 1, then the customer reviews are split into
+        chunks of chunk_size reviews, which are mined across a pool of n_workers
+        processes. The pool is started once per run and reused for every column
+        (and every chunk of rows), so each worker loads the models only once.
+        The mined results are cached in a SQLite database at cache_filepath (which
+        holds at most cache_max_entries results), and only customer reviews whose
+        results are not already cached are mined. If cache_filepath is None, then
+        every customer review is mined.
+        If streaming is True, then the customer reviews are preprocessed, and the
+        preprocessed customer reviews are read and mined, stream_chunk_rows rows at a time, and each mined chunk is appended to
+        mined_data.csv as soon as it is done. A checkpoint is recorded after every
+        chunk, so that an interrupted run resumes from the last completed chunk.
+        If single_pass is True, then ABSAModel2 runs in its single-pass mode, in which
+        each customer review is annotated only once, by the Stanford NLP pipeline.
+        Each customer review that is mined is loaded into spacy's nlp model (parsed) once,
+        by the ABSAEngine, and customer reviews whose results are cached are not parsed at
+        all. If export_docs is True, then the DataLoader parses every preprocessed customer
+        review instead and exports the docs, which are passed on to the ABSA models when
+        the customer reviews are mined in this process (n_workers is 1).
+        """
         self.filepath = filepath
-        self.preprocess_data()
-        self.mine_data()
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.chunk_size = chunk_size
+        self.n_workers = n_workers
+        self.cache_filepath = cache_filepath
+        self.cache_max_entries = cache_max_entries
+        self.cache = None
+        self.streaming = streaming
+        self.stream_chunk_rows = stream_chunk_rows
+        self.single_pass = single_pass
+        self.export_docs = export_docs
+        self.model_version = get_model_version(single_pass)
+        self.preprocessed_filepath = 'templates/static/data-files/preprocessed_dataset.csv'
+        self.mined_filepath = 'templates/static/data-files/mined_data.csv'
+        self.checkpoint_filepath = 'templates/static/data-files/mined_data_checkpoint.json'
+        self.engine = ABSAEngine(batch_size=batch_size, n_process=n_process, chunk_size=chunk_size, single_pass=single_pass)
+        self.pool = None
+        self.worker_stats = {'hits': 0, 'misses': 0, 'sizes': dict()}
+        try:
+            if self.streaming:
+                self.checkpoint = self.load_checkpoint()
+                if self.checkpoint is None:
+                    self.preprocess_data()
+                else:
+                    print("Resuming from chunk", self.checkpoint['completedChunks'])
+                self.mine_data_in_chunks()
+            else:
+                self.preprocess_data()
+                self.mine_data()
+        finally:
+            self.close_pool()
     
     def preprocess_data(self) -> None:
         """
         Runs the code from data_loader.py (i.e. runs the code to preprocess
-        the customer review text)
+        the customer review text). In streaming mode, the customer reviews are
+        preprocessed self.stream_chunk_rows rows at a time as well.
+        """
+        DataLoader(self.filepath, batch_size=self.batch_size, chunk_rows=self.stream_chunk_rows if self.streaming else None, \
+            export_docs=self.export_docs and not self.streaming)
+    
+    def get_pool(self):
+        """
+        Returns the pool of self.n_workers processes that the customer reviews are mined
+        across, starting it the first time it is needed. Each worker process loads the
+        models once, when it starts, and the pool is then reused for the rest of the run.
+        """
+        if self.pool is None:
+            self.pool = Pool(processes=self.n_workers, initializer=init_worker, \
+                initargs=(self.batch_size, self.chunk_size, self.single_pass))
+        return self.pool
+
+    def close_pool(self) -> None:
+        """
+        Stops the worker processes of the pool, if it was started.
+        """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def mine_aspects_in_parallel(self, reviews: list) -> list:
+        """
+        Takes a list of preprocessed customer reviews (reviews).
+        Splits the customer reviews into chunks and mines the chunks across the pool
+        of self.n_workers processes (see self.get_pool).
+        Returns a list of the mined results, in the same order as reviews (regardless
+        of the order in which the worker processes finish).
+        The polarity scorer stats returned by the workers with each chunk are added up
+        in self.worker_stats (see self.get_polarity_scorer_stats).
+        """
+        results = []
+        progress = track_progress("ABSA mining", len(reviews))
+        for chunk_result, chunk_stats in self.get_pool().imap(mine_worker_chunk, self.engine.get_chunks(reviews)):
+            results += chunk_result
+            self.worker_stats['hits'] += chunk_stats['hits']
+            self.worker_stats['misses'] += chunk_stats['misses']
+            self.worker_stats['sizes'][chunk_stats['worker']] = chunk_stats['size']
+            progress.update(len(chunk_result))
+        return results
+
+    def get_polarity_scorer_stats(self) -> dict:
+        """
+        Returns a dictionary with the stats of the PolarityScorer that the customer reviews
+        were mined with (see PolarityScorer.get_stats). If they were mined across the pool
+        of worker processes, then these are the stats of the PolarityScorers of all of the
+        workers added up, along with the number of workers that mined them (workers).
+        """
+        if self.n_workers == 1:
+            return get_polarity_scorer().get_stats()
+        hits, misses = self.worker_stats['hits'], self.worker_stats['misses']
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hitRate': (hits / (hits + misses)) if hits + misses > 0 else 0.0,
+            'size': sum(self.worker_stats['sizes'].values()),
+            'workers': len(self.worker_stats['sizes'])
+        }
+    
+    def mine_reviews(self, reviews: list, docs: list=None) -> list:
+        """
+        Runs the code in absa_ensemble.py on each preprocessed
+        customer review in reviews. Optionally takes a list of the customer
+        reviews already loaded into spacy's nlp model (docs), so that they
+        are not parsed again (these are not used by the process pool).
+        Returns a list with the mined version of this data: i.e. the results
+        of running all of the internal aspect based sentiment analysis 
+        models on each customer review.
+        Unless self.batch_size is None, the customer reviews are mined in
+        batches (see ABSAEngine.mine_many).
+        """
+        if self.n_workers > 1:
+            return self.mine_aspects_in_parallel(reviews)
+        if self.batch_size is None:
+            if docs is None:
+                docs = [None] * len(reviews)
+            results = []
+            progress = track_progress("ABSA mining", len(reviews))
+            for review, doc in zip(reviews, docs):
+                results.append(self.engine.mine(review, doc if doc is not None and doc.text == review else None))
+                progress.update()
+            return results
+        return self.engine.mine_many(reviews, docs)
+    
+    def load_column_docs(self, column: str, num_rows: int):
+        """
+        Takes the name of a column of preprocessed customer reviews (column), and the
+        number of rows of preprocessed data (num_rows).
+        Returns the list of docs exported by the DataLoader for this column (i.e. the
+        customer reviews already loaded into spacy's nlp model), or None if they do not
+        exist or do not match the preprocessed data. The docs are only used if they were
+        exported for this run (self.export_docs) and the customer reviews are mined in this
+        process.
         """
-        DataLoader(self.filepath)
+        if not self.export_docs or self.n_workers > 1:
+            return None
+        try:
+            docs = load_docs(f'templates/static/data-files/preprocessed_{column}_docs.spacy')
+        except (OSError, ValueError):
+            return None
+        if len(docs) != num_rows:
+            return None
+        return docs
     
-    def mine_aspects(self, df_column):
+    def mine_aspects(self, df_column, docs: list=None):
         """
-        Runs the code in absa_ensemble.py on a single preprocessed
-        customer review.
-        Returns the mined version of this data: i.e. the results of
-        running all of the internal aspect based sentiment analysis 
-        models on that customer review.
+        Takes a column of preprocessed customer reviews (df_column). Optionally
+        takes a list of these customer reviews already loaded into spacy's nlp
+        model (docs).
+        Returns a pandas Series with the mined version of each customer review.
+        If the cache is enabled, then the results of customer reviews that were
+        already mined are read from the cache, and only the remaining (unique)
+        customer reviews are mined and then added to the cache.
         """
-        return df_column.apply(lambda x: ABSAEnsemble(str(x)).result)
+        reviews = [str(x) for x in df_column]
+        if self.cache is None:
+            return pd.Series(self.mine_reviews(reviews, docs), index=df_column.index, dtype=object)
+        cached = self.cache.get_many(reviews)
+        missing_docs = dict()
+        for index, review in enumerate(reviews):
+            if review not in cached and review not in missing_docs:
+                missing_docs[review] = docs[index] if docs is not None else None
+        missing = list(missing_docs.keys())
+        mined = dict(zip(missing, self.mine_reviews(missing, list(missing_docs.values()) if docs is not None else None)))
+        self.cache.put_many(mined)
+        cached.update(mined)
+        return pd.Series([cached[review] for review in reviews], index=df_column.index, dtype=object)
     
     def write_data(self, df) -> None:
         """
@@ -36,15 +264,122 @@ class Pipeline:
     
     def mine_data(self) -> None:
         """
-        Reads in the data on the preprocessed customer reviews.
+        Reads in the data on the preprocessed customer reviews, along with the
+        customer reviews already loaded into spacy's nlp model by the DataLoader.
         Runs the code from absa_ensemble to extract the product features
         and descriptions from the customer reviews.
-        Exports the data to mined_data.csv
+        Exports the data to mined_data.csv, along with the aspect table (one row
+        per mined entry, see aspect_table.py).
         """
         df = pd.read_csv('templates/static/data-files/preprocessed_dataset.csv')
-        df['minedText'] = self.mine_aspects(df['reviewText'])
+        if self.cache_filepath is not None:
+            self.cache = ABSACache(self.cache_filepath, self.model_version, self.cache_max_entries)
+        df['minedText'] = self.mine_aspects(df['reviewText'], self.load_column_docs('reviewText', len(df)))
         try:
-            df['minedHeader'] = self.mine_aspects(df['reviewHeader'])
+            df['minedHeader'] = self.mine_aspects(df['reviewHeader'], self.load_column_docs('reviewHeader', len(df)))
         except KeyError:
             print("No reviewHeader column exists")
+        print("Polarity scorer stats:", self.get_polarity_scorer_stats())
+        if self.cache is not None:
+            print("ABSA cache stats:", self.cache.get_stats())
+            self.cache.close()
+        reset_aspect_table()
+        write_aspect_table_part(build_aspect_table(df))
         self.write_data(df)
+        complete_aspect_table(self.mined_filepath)
+    
+    def get_file_hash(self, filepath: str) -> str:
+        """
+        Takes a filepath. Returns the SHA-256 hash of the contents of the file,
+        reading the file a block at a time.
+        """
+        file_hash = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                file_hash.update(block)
+        return file_hash.hexdigest()
+
+    def load_checkpoint(self):
+        """
+        Returns the checkpoint (a dictionary) recorded by an interrupted streaming run,
+        if one exists and it was recorded for the same customer review data, preprocessed
+        data, chunk size and model version as this run. Returns None otherwise (i.e. if
+        the run has to start from the beginning).
+        """
+        try:
+            with open(self.checkpoint_filepath) as f:
+                checkpoint = json.load(f)
+            if checkpoint['reviewDataHash'] == self.get_file_hash(self.filepath) \
+                and checkpoint['preprocessedHash'] == self.get_file_hash(self.preprocessed_filepath) \
+                and checkpoint['chunkRows'] == self.stream_chunk_rows \
+                and checkpoint['modelVersion'] == self.model_version \
+                and os.path.getsize(self.mined_filepath) >= checkpoint['minedBytes']:
+                return checkpoint
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def write_checkpoint(self, checkpoint: dict) -> None:
+        """
+        Takes a checkpoint (a dictionary). Writes it to the checkpoint file, replacing
+        the previous checkpoint in a single step so that a crash never leaves a
+        partially written checkpoint behind.
+        """
+        temporary_filepath = self.checkpoint_filepath + '.tmp'
+        with open(temporary_filepath, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(temporary_filepath, self.checkpoint_filepath)
+
+    def mine_data_in_chunks(self) -> None:
+        """
+        Reads in the data on the preprocessed customer reviews self.stream_chunk_rows
+        rows at a time. Runs the code from absa_ensemble on each chunk of rows, and
+        appends the mined chunk to mined_data.csv, recording a checkpoint after every
+        chunk. Chunks that were already completed by an interrupted run are skipped
+        (and anything written to mined_data.csv after the last checkpoint is discarded).
+        Each mined chunk is also written as a part of the aspect table (see aspect_table.py),
+        which is only marked as complete once all the chunks have been mined.
+        The checkpoint is deleted once all the chunks have been mined.
+        """
+        if self.checkpoint is None:
+            self.checkpoint = {
+                'reviewDataHash': self.get_file_hash(self.filepath),
+                'preprocessedHash': self.get_file_hash(self.preprocessed_filepath),
+                'chunkRows': self.stream_chunk_rows,
+                'modelVersion': self.model_version,
+                'completedChunks': 0,
+                'minedBytes': 0
+            }
+        with open(self.mined_filepath, 'a') as f:
+            f.truncate(self.checkpoint['minedBytes'])
+        if self.checkpoint['completedChunks'] == 0:
+            reset_aspect_table()
+        else:
+            invalidate_aspect_table()
+        if self.cache_filepath is not None:
+            self.cache = ABSACache(self.cache_filepath, self.model_version, self.cache_max_entries)
+
+        reader = pd.read_csv(self.preprocessed_filepath, chunksize=self.stream_chunk_rows)
+        for chunk_number, df in enumerate(reader):
+            if chunk_number < self.checkpoint['completedChunks']:
+                continue
+            df['minedText'] = self.mine_aspects(df['reviewText'])
+            if 'reviewHeader' in df.columns:
+                df['minedHeader'] = self.mine_aspects(df['reviewHeader'])
+            write_aspect_table_part(build_aspect_table(df), chunk_number)
+            with open(self.mined_filepath, 'a', newline='') as f:
+                df.to_csv(f, header=(chunk_number == 0))
+                f.flush()
+                os.fsync(f.fileno())
+            self.checkpoint['completedChunks'] = chunk_number + 1
+            self.checkpoint['minedBytes'] = os.path.getsize(self.mined_filepath)
+            self.write_checkpoint(self.checkpoint)
+            print("Mined chunk", chunk_number + 1)
+
+        print("Polarity scorer stats:", self.get_polarity_scorer_stats())
+        if self.cache is not None:
+            print("ABSA cache stats:", self.cache.get_stats())
+            self.cache.close()
+        complete_aspect_table(self.mined_filepath)
+        if os.path.exists(self.checkpoint_filepath):
+            os.remove(self.checkpoint_filepath)
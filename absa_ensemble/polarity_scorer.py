@@ -0,0 +1,84 @@
+from collections import namedtuple
+from functools import lru_cache
+
+from textblob import TextBlob
+
+from nltk.sentiment import SentimentIntensityAnalyzer
+
+from model_registry import require_nltk_data
+
+
+# textblob_polarity and subjectivity come from TextBlob, vader_polarity is the
+# compound polarity score from VADER
+PhraseScore = namedtuple('PhraseScore', ['textblob_polarity', 'subjectivity', 'vader_polarity'])
+
+
+class PolarityScorer:
+
+    def __init__(self, max_size: int=100000):
+        """
+        Takes the maximum number of phrases whose scores are remembered (max_size).
+        Loads the VADER SentimentIntensityAnalyzer once, and memoizes the TextBlob
+        and VADER scores of the most recently scored phrases, since the same
+        "description aspect" phrases come up again and again across customer
+        reviews and products.
+        """
+        require_nltk_data('vader_lexicon')
+        self.sentiment_classifier = SentimentIntensityAnalyzer()
+        self.get_score = lru_cache(maxsize=max_size)(self.compute_score)
+
+    def compute_score(self, phrase: str) -> PhraseScore:
+        """
+        Takes a phrase (string).
+        Returns a PhraseScore with the TextBlob sentiment polarity and subjectivity,
+        and the VADER compound polarity score, of the phrase.
+        """
+        sentiment = TextBlob(phrase).sentiment
+        vader_polarity = self.sentiment_classifier.polarity_scores(phrase)['compound']
+        return PhraseScore(sentiment.polarity, sentiment.subjectivity, vader_polarity)
+
+    def score(self, phrase: str) -> PhraseScore:
+        """
+        Takes a phrase (string).
+        Returns the PhraseScore of the phrase, computing it only if it is not
+        already memoized.
+        """
+        return self.get_score(phrase)
+
+    def score_many(self, phrases) -> list:
+        """
+        Takes an iterable of phrases (strings).
+        Returns a list of the PhraseScores of the phrases, in the same order.
+        """
+        return [self.get_score(phrase) for phrase in phrases]
+
+    def get_hit_rate(self) -> float:
+        """
+        Returns the fraction of phrases scored so far whose scores were already
+        memoized.
+        """
+        info = self.get_score.cache_info()
+        lookups = info.hits + info.misses
+        return (info.hits / lookups) if lookups > 0 else 0.0
+
+    def get_stats(self) -> dict:
+        """
+        Returns a dictionary with the number of memoized lookups (hits), the number
+        of phrases that had to be scored (misses), the hit rate, and the number of
+        phrases currently memoized.
+        """
+        info = self.get_score.cache_info()
+        return {'hits': info.hits, 'misses': info.misses, 'hitRate': self.get_hit_rate(), 'size': info.currsize}
+
+
+polarity_scorer = None
+
+def get_polarity_scorer() -> PolarityScorer:
+    """
+    Returns the PolarityScorer shared by everything running in this process,
+    creating it the first time it is needed.
+    """
+    global polarity_scorer
+    if polarity_scorer is None:
+        polarity_scorer = PolarityScorer()
+    return polarity_scorer
@@ -0,0 +1,102 @@
+import os
+import hashlib
+import threading
+
+
+class ArtifactCache:
+
+    def __init__(self):
+        """
+        Keeps the artifacts (the CSV files and other data files generated by run_before.py)
+        that have been loaded in this process, each parsed once into a ready-to-use
+        structure, so that they are not read and parsed again on every request.
+        An artifact is only loaded again when its file changes: its size and modification
+        time are checked on every lookup, and if they changed, its contents are hashed to
+        find out whether it was really rewritten with different data.
+        """
+        self.entries = dict() # Maps the name of each artifact to its file signature, hash and value
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get_signature(self, filepath: str) -> tuple:
+        """
+        Takes a filepath. Returns the size and modification time of the file.
+        """
+        stat = os.stat(filepath)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def get_hash(self, filepath: str) -> str:
+        """
+        Takes a filepath. Returns the SHA-256 hash of the contents of the file.
+        """
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get(self, name: str, filepath: str, loader):
+        """
+        Takes the name of an artifact (name), the filepath of the file it is loaded from
+        (filepath), and the function that loads it (loader), which takes the filepath and
+        returns the loaded artifact.
+        Returns the loaded artifact. It is loaded the first time it is requested, and
+        loaded again only when the contents of its file have changed since then.
+        If the file is changed while it is being loaded, then the artifact is returned but
+        not kept, since it may not match the hash and signature taken before loading it.
+        Raises the same errors as the loader if the file cannot be loaded.
+        """
+        with self.lock:
+            signature = self.get_signature(filepath)
+            entry = self.entries.get(name)
+            if entry is not None and entry['filepath'] == filepath:
+                if entry['signature'] == signature:
+                    self.hits += 1
+                    return entry['value']
+                file_hash = self.get_hash(filepath)
+                if entry['hash'] == file_hash: # The file was touched, but its contents did not change
+                    entry['signature'] = signature
+                    self.hits += 1
+                    return entry['value']
+                self.reloads += 1
+            else:
+                file_hash = self.get_hash(filepath)
+                self.misses += 1
+            value = loader(filepath)
+            if self.get_signature(filepath) != signature: # The file was rewritten while it was being loaded
+                self.entries.pop(name, None)
+                return value
+            self.entries[name] = {'filepath': filepath, 'signature': signature, 'hash': file_hash, 'value': value}
+            return value
+
+    def clear(self) -> None:
+        """
+        Forgets all of the loaded artifacts, so that they are loaded again when they are
+        next requested.
+        """
+        with self.lock:
+            self.entries = dict()
+
+    def get_stats(self) -> dict:
+        """
+        Returns a dictionary with the number of lookups answered by an already loaded
+        artifact (hits), the number of artifacts loaded for the first time (misses), the
+        number of artifacts loaded again because their file changed (reloads), and the
+        names of the artifacts currently loaded.
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'reloads': self.reloads, 'loaded': sorted(self.entries)}
+
+
+artifact_cache = ArtifactCache()
+
+
+def get_artifact(name: str, filepath: str, loader):
+    """
+    Takes the name of an artifact (name), the filepath of its file (filepath), and the
+    function that loads it from the file (loader).
+    Returns the process-wide loaded artifact (see ArtifactCache.get).
+    """
+    return artifact_cache.get(name, filepath, loader)
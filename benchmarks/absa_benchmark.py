@@ -0,0 +1,336 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+import pandas as pd
+
+from absa_ensemble.data_loader import DataLoader
+from absa_ensemble.pipeline import Pipeline
+from absa_ensemble.absa_ensemble_model import ABSAEngine
+from absa_ensemble.absa_model1 import ABSAModel1, parse_reviews
+from absa_ensemble.absa_model2 import ABSAModel2, mine_reviews
+from absa_ensemble.polarity_scorer import get_polarity_scorer
+
+
+# Words used to generate the synthetic customer reviews
+ASPECTS = ["battery", "screen", "price", "seat", "pedal", "display", "quality", "design", "motor", "noise", \
+    "delivery", "handle", "frame", "resistance", "assembly", "color", "size", "weight", "warranty", "support"]
+ADJECTIVES = ["great", "poor", "sturdy", "loud", "cheap", "comfortable", "flimsy", "excellent", "bad", "smooth", \
+    "heavy", "quiet", "expensive", "solid", "terrible", "easy", "wobbly", "nice", "small", "amazing"]
+ADVERBS = ["really", "very", "quite", "extremely", "pretty", "super", "fairly", "incredibly"]
+SENTENCE_TEMPLATES = [
+    "the {aspect} is {adverb} {adjective}.",
+    "i love the {adjective} {aspect}.",
+    "the {aspect} is not {adjective} at all.",
+    "the {aspect} is {adjective} but the {other_aspect} is {other_adjective}.",
+    "we bought it for the {aspect} and it is {adverb} {adjective}.",
+    "honestly the {aspect} {other_aspect} feels {adjective}.",
+    "it has a {adjective} {aspect} and a {other_adjective} {other_aspect}.",
+    "after a month the {aspect} still works {adverb} well."
+]
+
+# The stages that are benchmarked, in the order in which they are run
+STAGES = ["data_loader", "absa_model1", "absa_model2", "merge_entries", "absa_engine", "pipeline"]
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+def get_synthetic_reviews(num_reviews: int, num_tokens: int, seed: int=0) -> list:
+    """
+    Takes the number of customer reviews to generate (num_reviews), the number
+    of tokens (words and punctuation separated by spaces) in each customer
+    review (num_tokens), and the seed of the random number generator (seed).
+    Returns a list of synthetic customer reviews, built out of sentences about
+    product attributes. The same arguments always generate the same customer
+    reviews, so no data has to be downloaded or shipped for the benchmark.
+    """
+    generator = random.Random(f"{seed}-{num_tokens}")
+    reviews = []
+    for _ in range(num_reviews):
+        tokens = []
+        while len(tokens) < num_tokens:
+            sentence = generator.choice(SENTENCE_TEMPLATES).format(
+                aspect=generator.choice(ASPECTS),
+                other_aspect=generator.choice(ASPECTS),
+                adjective=generator.choice(ADJECTIVES),
+                other_adjective=generator.choice(ADJECTIVES),
+                adverb=generator.choice(ADVERBS)
+            )
+            tokens += sentence.replace(".", " .").split()
+        tokens = tokens[:num_tokens]
+        tokens[-1] = "."
+        reviews.append(" ".join(tokens).replace(" .", "."))
+    return reviews
+
+
+def get_percentile(sorted_values: list, percentile: float) -> float:
+    """
+    Takes a sorted list of numbers (sorted_values) and a percentile (between 0
+    and 100). Returns the value at that percentile, interpolating linearly
+    between the two closest values, or NaN if there are no values.
+    """
+    if not sorted_values:
+        return float('nan')
+    position = (len(sorted_values) - 1) * percentile / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def format_value(value: float, unit: str="") -> str:
+    """
+    Takes a measured value (value), and its unit (unit).
+    Returns the value with 2 decimal places followed by its unit, or "n/a" if the
+    value could not be measured (it is None or NaN).
+    """
+    if value is None or value != value:
+        return "n/a"
+    return f"{value:.2f}{unit}"
+
+
+def get_commit() -> str:
+    """
+    Returns the hash of the git commit that the benchmark is run on, or None if
+    it cannot be determined.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class ABSABenchmark:
+
+    def __init__(self, lengths: tuple=(10, 100, 1000), num_reviews: int=50, seed: int=0, \
+        output_filepath: str="benchmarks/results/absa_benchmark.json", baseline_filepath: str=None, \
+        regression_threshold: float=None):
+        """
+        Takes the numbers of tokens of the synthetic customer reviews to benchmark with
+        (lengths), the number of customer reviews generated for each length (num_reviews),
+        and the seed used to generate them (seed).
+        For each length, measures the throughput (customer reviews per second) and the
+        latency percentiles of a single customer review for each of the stages in STAGES,
+        and writes the results as JSON to output_filepath.
+        If a baseline_filepath (a results file from an earlier run) and a
+        regression_threshold (ex: 0.1 for 10%) are given, then every stage whose throughput
+        dropped by more than the threshold compared to the baseline is recorded as a
+        regression in self.regressions.
+        The stages that write files (the DataLoader and the Pipeline) are run inside a
+        temporary directory, so the data files of the dashboard are never touched.
+        """
+        self.lengths = lengths
+        self.num_reviews = num_reviews
+        self.seed = seed
+        self.engine = ABSAEngine()
+        self.model1 = ABSAModel1()
+        self.loader = None
+
+        results = dict()
+        original_directory = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, "templates/static/data-files"))
+            os.chdir(directory)
+            try:
+                self.warm_up()
+                for length in lengths:
+                    results[str(length)] = self.run_benchmarks(get_synthetic_reviews(num_reviews, length, seed))
+            finally:
+                os.chdir(original_directory)
+
+        self.result = {
+            'commit': get_commit(),
+            'createdAt': datetime.now().isoformat(timespec='seconds'),
+            'config': {'lengths': list(lengths), 'numReviews': num_reviews, 'seed': seed},
+            'results': results
+        }
+        self.regressions = []
+        if baseline_filepath is not None and regression_threshold is not None:
+            self.regressions = self.find_regressions(baseline_filepath, regression_threshold)
+            self.result['regressions'] = self.regressions
+        self.write_data(output_filepath)
+
+    def write_reviews(self, reviews: list, filepath: str="templates/static/data-files/review_data.csv") -> str:
+        """
+        Takes a list of customer reviews (reviews). Writes them to a CSV file in the
+        same format as the scraped customer reviews, and returns its filepath.
+        """
+        pd.DataFrame({'reviewText': reviews}).to_csv(filepath, index=False)
+        return filepath
+
+    def warm_up(self) -> None:
+        """
+        Runs a short customer review through every stage, so that the time taken to
+        load the models is not counted in the benchmark.
+        """
+        self.loader = DataLoader(self.write_reviews(get_synthetic_reviews(2, 10, self.seed)))
+        review = self.loader.preprocess_data("the battery is really great.")
+        self.engine.mine(review)
+
+    def time_each(self, function, items: list) -> list:
+        """
+        Takes a function and a list of items. Calls the function on each of the items,
+        and returns a list of the time (in seconds) that each call took.
+        """
+        latencies = []
+        for item in items:
+            start = time.perf_counter()
+            function(item)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    def summarize(self, latencies: list, total_seconds: float=None) -> dict:
+        """
+        Takes a list of the time (in seconds) taken to process each customer review
+        (latencies), and optionally the time taken to process all of the customer
+        reviews together (total_seconds, if the stage processes them in batches).
+        Returns a dictionary with the throughput and the latency percentiles (in
+        milliseconds) of the stage. If no customer reviews were processed, then all of
+        these are None.
+        """
+        if not latencies:
+            summary = {'reviewsPerSecond': None}
+            for percentile in PERCENTILES:
+                summary[f'p{percentile}Ms'] = None
+            summary['meanMs'] = None
+            summary['maxMs'] = None
+            return summary
+        if total_seconds is None:
+            total_seconds = sum(latencies)
+        sorted_latencies = sorted(latencies)
+        summary = {'reviewsPerSecond': len(latencies) / total_seconds if total_seconds > 0 else None}
+        for percentile in PERCENTILES:
+            summary[f'p{percentile}Ms'] = get_percentile(sorted_latencies, percentile) * 1000
+        summary['meanMs'] = sum(latencies) / len(latencies) * 1000
+        summary['maxMs'] = sorted_latencies[-1] * 1000
+        return summary
+
+    def run_benchmarks(self, reviews: list) -> dict:
+        """
+        Takes a list of customer reviews (reviews).
+        Benchmarks each of the stages in STAGES on these customer reviews. Stages that
+        process customer reviews in batches have their throughput measured on the
+        batched code path, and their latency measured one customer review at a time,
+        on the same code:
+        - data_loader: the DataLoader's preprocessing, in memory (without reading or
+            writing any files)
+        - absa_engine: mining preprocessed customer reviews with the ABSAEngine
+            (mine_many for the throughput, mine for the latency)
+        - pipeline: the full Pipeline, end to end (reading the customer reviews,
+            preprocessing and mining them, and writing mined_data.csv and the aspect
+            table), run on all of the customer reviews for the throughput and on one
+            customer review at a time for the latency
+        The memoized phrase scores are cleared before each stage, so that no stage
+        benefits from the phrases scored by the stages before it.
+        Returns a dictionary mapping each stage to its results.
+        """
+        results = dict()
+        scorer = get_polarity_scorer()
+
+        start = time.perf_counter()
+        preprocessed = self.loader.preprocess_column(pd.Series(reviews))
+        total_seconds = time.perf_counter() - start
+        results['data_loader'] = self.summarize(self.time_each(self.loader.preprocess_data, reviews), total_seconds)
+        docs = list(parse_reviews(preprocessed))
+
+        scorer.get_score.cache_clear()
+        latencies = self.time_each(lambda pair: self.model1.mine(*pair), list(zip(preprocessed, docs)))
+        results['absa_model1'] = self.summarize(latencies)
+        model1_results = [self.model1.mine(review, doc) for review, doc in zip(preprocessed, docs)]
+
+        scorer.get_score.cache_clear()
+        start = time.perf_counter()
+        model2_results = [model.result for model in mine_reviews(preprocessed)]
+        total_seconds = time.perf_counter() - start
+        scorer.get_score.cache_clear()
+        results['absa_model2'] = self.summarize(self.time_each(lambda review: ABSAModel2(review), preprocessed), total_seconds)
+
+        entries = [[dict(entry) for entry in res1 + res2] for res1, res2 in zip(model1_results, model2_results)]
+        results['merge_entries'] = self.summarize(self.time_each(self.engine.merge_entries, entries))
+
+        scorer.get_score.cache_clear()
+        start = time.perf_counter()
+        self.engine.mine_many(preprocessed)
+        total_seconds = time.perf_counter() - start
+        scorer.get_score.cache_clear()
+        results['absa_engine'] = self.summarize(self.time_each(self.engine.mine, preprocessed), total_seconds)
+
+        scorer.get_score.cache_clear()
+        filepath = self.write_reviews(reviews)
+        start = time.perf_counter()
+        Pipeline(filepath, cache_filepath=None)
+        total_seconds = time.perf_counter() - start
+        latencies = []
+        for review in reviews:
+            scorer.get_score.cache_clear()
+            filepath = self.write_reviews([review])
+            latencies += self.time_each(lambda filepath: Pipeline(filepath, cache_filepath=None), [filepath])
+        results['pipeline'] = self.summarize(latencies, total_seconds)
+        return results
+
+    def find_regressions(self, baseline_filepath: str, regression_threshold: float) -> list:
+        """
+        Takes the filepath to the results of an earlier benchmark run (baseline_filepath),
+        and the largest allowed relative drop in throughput (regression_threshold).
+        Returns a list with an entry for every stage and length whose throughput dropped
+        by more than regression_threshold compared to the baseline.
+        """
+        with open(baseline_filepath) as f:
+            baseline = json.load(f)['results']
+        regressions = []
+        for length, stages in self.result['results'].items():
+            for stage, summary in stages.items():
+                try:
+                    baseline_throughput = baseline[length][stage]['reviewsPerSecond']
+                except KeyError:
+                    continue
+                if not baseline_throughput or summary['reviewsPerSecond'] is None:
+                    continue
+                change = summary['reviewsPerSecond'] / baseline_throughput - 1
+                if change < -regression_threshold:
+                    regressions.append({'length': int(length), 'stage': stage, 'baselineReviewsPerSecond': baseline_throughput, \
+                        'reviewsPerSecond': summary['reviewsPerSecond'], 'change': change})
+        return regressions
+
+    def write_data(self, output_filepath: str) -> None:
+        """
+        Takes a filepath (output_filepath). Writes the results of the benchmark
+        (self.result) to it as JSON.
+        """
+        directory = os.path.dirname(output_filepath)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        with open(output_filepath, 'w') as f:
+            json.dump(self.result, f, indent=2)
+
+
+if __name__ == '__main__':
+    """
+    main method from where the benchmark can be run from the terminal (from the
+    main directory of this project): python -m benchmarks.absa_benchmark
+    Exits with a non-zero status if a regression is found.
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the throughput and latency of the ABSA stages.")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--num-reviews", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmarks/results/absa_benchmark.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--regression-threshold", type=float, default=None)
+    args = parser.parse_args()
+
+    benchmark = ABSABenchmark(lengths=args.lengths, num_reviews=args.num_reviews, seed=args.seed, \
+        output_filepath=os.path.abspath(args.output), baseline_filepath=args.baseline, \
+        regression_threshold=args.regression_threshold)
+    for length, stages in benchmark.result['results'].items():
+        for stage, summary in stages.items():
+            print(f"{length} tokens, {stage}: {format_value(summary['reviewsPerSecond'], ' reviews/sec')}, "
+                f"p50 {format_value(summary['p50Ms'], ' ms')}, p95 {format_value(summary['p95Ms'], ' ms')}")
+    for regression in benchmark.regressions:
+        print(f"Regression: {regression['stage']} ({regression['length']} tokens) changed by {regression['change']:.1%}")
+    sys.exit(1 if benchmark.regressions else 0)
@@ -2,13 +2,34 @@ import pandas as pd
 from ast import literal_eval
 
 from product_ranking.product_ranker import ProductRanker
+from product_ranking.weighted_product_ranker import WeightedProductRanker
+from artifact_cache import artifact_cache, get_artifact
 from topic_modelling.topic_modelling_searching_ensemble import TopicModellingSearchingEnsemble
 from topic_modelling.topic_modelling_searching_ensemble import TopicModellingSearchingBERTopic
 from topic_modelling.topic_modelling_searching_ensemble import TopicModellingSearchingTop2Vec
 
+TOP_TWENTY_ATTRIBUTES_FILEPATH = "templates/static/data-files/top_twenty_attributes.csv"
+AMAZON_SUGGESTED_ATTRIBUTES_FILEPATH = "templates/static/data-files/amazon_suggested_attributes.csv"
+DESCRIPTIONS_REPORT_FILEPATH = "templates/static/data-files/product_attribute_descriptions_report.csv"
+IMPROVEMENT_AREAS_FILEPATH = "templates/static/data-files/improvement_areas.csv"
+
 class DataFetcher:
     def __init__(self):
+        """
+        Fetches the results shown on the dashboard. A new DataFetcher is created for every
+        request, but the files that it reads are parsed once per process (into the
+        structures that are rendered on the dashboard) and kept in the artifact cache (see
+        artifact_cache.py), so they are only read again when they change.
+        """
         pass
+
+    def get_cache_stats(self) -> dict:
+        """
+        Returns the hits, misses and reloads of the artifact cache that the files read by
+        the DataFetcher are kept in, along with the names of the loaded files (see
+        ArtifactCache.get_stats).
+        """
+        return artifact_cache.get_stats()
     
     # Getting the Top 20 Attributes List
     def get_attribute_word_list(self, data_df) -> list:
@@ -21,32 +42,80 @@ class DataFetcher:
         (Note: the list is sorted in decreasing order of relevance scores)
         """
         data_list = []
-        for _, df_row in data_df.iterrows():
-            data_list.append((df_row['Word'], round(float(df_row['TfIdfScore']))))
+        for word, score in zip(data_df['Word'], data_df['TfIdfScore']):
+            data_list.append((word, round(float(score))))
         return data_list
 
+    def load_top_twenty_attributes(self, filepath: str) -> list:
+        """
+        Takes the filepath to top_twenty_attributes.csv
+        Returns the list of tuples of the top 20 attributes and their relevance scores
+        (see self.get_attribute_word_list).
+        """
+        return self.get_attribute_word_list(pd.read_csv(filepath))
+
     def get_top_twenty_attributes(self) -> list:
         """
         Returns a list of tuples of the top 20 attributes (product features)
         that customers care about, and their corresponding relevance
         scores.
-        Fetches this data from top_twenty_attributes.csv
+        Fetches this data from top_twenty_attributes.csv (which is parsed once per
+        process, and parsed again only when it changes)
         """
-        filepath = "templates/static/data-files/top_twenty_attributes.csv"
-        data_df = pd.read_csv(filepath)
-        return self.get_attribute_word_list(data_df)
+        return list(get_artifact("topTwentyAttributes", TOP_TWENTY_ATTRIBUTES_FILEPATH, self.load_top_twenty_attributes))
     
 
     # Getting the top attributes listed by Amazon
+    def load_amazon_suggested_attributes(self, filepath: str) -> list:
+        """
+        Takes the filepath to amazon_suggested_attributes.csv
+        Returns the list of the attributes in the file.
+        """
+        return pd.read_csv(filepath)['attribute'].to_list()
+
     def get_amazon_suggested_attributes(self) -> list:
         """
         Returns a list of the attributes (product features) suggested by Amazon
         as being potentially relevant to customers.
-        Fetches this data from amazon_suggested_attributes.csv
+        Fetches this data from amazon_suggested_attributes.csv (which is parsed once
+        per process, and parsed again only when it changes)
+        """
+        return list(get_artifact("amazonSuggestedAttributes", AMAZON_SUGGESTED_ATTRIBUTES_FILEPATH, self.load_amazon_suggested_attributes))
+    
+
+    # Getting the data from the descriptions report
+    def load_descriptions_report(self, filepath: str) -> dict:
+        """
+        Takes the filepath to product_attribute_descriptions_report.csv
+        Reads the descriptions report once, and returns a dictionary with what the
+        dashboard needs from it:
+        - productsList: the list of products (see self.get_products_list)
+        - featuresSet: the set of the top product features of all of the products
+            (see self.get_features_set)
+        - productInfo: a dictionary mapping each product id to the product attribute
+            description data of that product (see self.get_product_info), so that the
+            data of a product can be looked up without going through the report again
         """
-        filepath = "templates/static/data-files/amazon_suggested_attributes.csv"
         data_df = pd.read_csv(filepath)
-        return data_df['attribute'].to_list()
+        products_list = []
+        features_set = set()
+        product_info = dict()
+        for df_row in data_df.to_dict('records'):
+            product_id = int(df_row['productID'])
+            products_list.append((product_id, self.get_product_name(df_row['productName'])))
+            for feature in literal_eval(df_row['topRelevantAttributes']):
+                features_set.add(feature.replace("_", " "))
+            if product_id not in product_info: # As in self.get_df_row, the first row of a product is used
+                product_info[product_id] = self.get_product_info(df_row)
+        return {'productsList': products_list, 'featuresSet': frozenset(features_set), 'productInfo': product_info}
+
+    def get_descriptions_report(self) -> dict:
+        """
+        Returns the data that the dashboard needs from the descriptions report (see
+        self.load_descriptions_report). It is parsed once per process, and parsed again
+        only when product_attribute_descriptions_report.csv changes.
+        """
+        return get_artifact("descriptionsReport", DESCRIPTIONS_REPORT_FILEPATH, self.load_descriptions_report)
     
 
     # Getting Products List
@@ -59,12 +128,7 @@ class DataFetcher:
         (Note: the product names are truncated for better visual design on the
         dashboard webapp)
         """
-        filepath = "templates/static/data-files/product_attribute_descriptions_report.csv"
-        data_df = pd.read_csv(filepath)
-        products_list = []
-        for _, df_row in data_df.iterrows():
-            products_list.append((int(df_row['productID']), self.get_product_name(df_row['productName'])))
-        return products_list
+        return list(self.get_descriptions_report()['productsList'])
 
 
     # Getting Product-Attribute Descriptions data
@@ -181,7 +245,7 @@ class DataFetcher:
     def get_product_info(self, df_row) -> dict:
         """
         Takes a single row (df_row) of the pandas DataFrame which contains data from
-        product_attribute_descriptions_report.csv
+        product_attribute_descriptions_report.csv (or a dictionary with the same columns)
         This single row contains the information corresponding to a single product.
         Returns a dictionary which contains information on:
         - the product name
@@ -217,11 +281,19 @@ class DataFetcher:
         - the top descriptions for each fo the product features (for this product)
         - the sentiment scores for each of the product features (for this product)
         This dictionary is populated with data from product_attribute_descriptions_report.csv
-        """
-        filepath = "templates/static/data-files/product_attribute_descriptions_report.csv"
-        data_df = pd.read_csv(filepath)
-        df_row = self.get_df_row(data_df, product_id)
-        return self.get_product_info(df_row)
+        (the data of every product is prepared once, when the report is loaded; see
+        self.load_descriptions_report).
+        If there is no product with that product id, then a ValueError is raised.
+        """
+        product_info = self.get_descriptions_report()['productInfo'].get(product_id)
+        if product_info is None:
+            raise ValueError("An incorrect product_id was entered", product_id)
+        return {
+            'productName': product_info['productName'],
+            'topFeatures': product_info['topFeatures'],
+            'featureDescriptions': dict(product_info['featureDescriptions']),
+            'featureScores': dict(product_info['featureScores'])
+        }
     
 
     # Get product ranker info
@@ -232,27 +304,29 @@ class DataFetcher:
         product_attribute_descriptions_report.csv
         Returns this set of product features.
         """
-        filepath = "templates/static/data-files/product_attribute_descriptions_report.csv"
-        data_df = pd.read_csv(filepath)
-        features_set = set()
-        for _, df_row in data_df.iterrows():
-            for feature in literal_eval(df_row['topRelevantAttributes']):
-                features_set.add(feature.replace("_", " "))
-        return features_set
+        return set(self.get_descriptions_report()['featuresSet'])
     
-    def get_product_links_dict(self) -> dict:
+    def load_product_links_dict(self, filepath: str) -> dict:
         """
+        Takes the filepath to product_links.csv
         Prepares a dictionary which maps eahc product id against the Amazon link
         of the product corresponding to that product id.
         Returns this dictionary (product_links)
         """
-        filepath = "product_links.csv"
         data_df = pd.read_csv(filepath)
         product_links = dict() # Dict: product_id -> product_link
-        for idx, df_row in data_df.iterrows():
-            product_links[idx + 1] = df_row['productLinks']
+        for idx, product_link in enumerate(data_df['productLinks']):
+            product_links[idx + 1] = product_link
         return product_links
 
+    def get_product_links_dict(self) -> dict:
+        """
+        Returns the dictionary which maps each product id against the Amazon link of
+        the product (see self.load_product_links_dict). It is loaded once per process,
+        and loaded again only when product_links.csv changes.
+        """
+        return get_artifact("productLinks", "product_links.csv", self.load_product_links_dict)
+
     def get_product_rank_info(self, attribute: str) -> list:
         """
         Takes an attribute (product feature), which is a string.
@@ -296,6 +370,46 @@ class DataFetcher:
             link = product_links_dict[product_id]
             product_ranker_info.append((product_id, product_name, descriptive_words, score, shift, link))
         return product_ranker_info
+
+    def get_weighted_product_rank_info(self, attribute_weights: dict, k: int=10) -> list:
+        """
+        Takes a dictionary mapping attributes (product features) to their weights
+        (attribute_weights), ex: {"comfort": 0.5, "noise": 0.3, "price": 0.2}, and the
+        number of products to return (k).
+        Returns a list of the k products with the highest weighted sentiment scores with
+        respect to these attributes (see WeightedProductRanker), in decreasing order of
+        these scores.
+
+        Each item in the list is a tuple, which consists of:
+        - the product id
+        - the product name
+        - the weighted sentiment score of the product
+        - the fraction of the total weight made up by the attributes that were among
+            the top 10 most relevant product features of the product (coverage)
+        - the shift value, for the triangle pointer in the visualization
+            with the colorbars (so the pointer points to the correct part
+            of the colorbar)
+        - the link to the Amazon page for the product
+        """
+        weights = {attribute.replace(" ", "_"): weight for attribute, weight in attribute_weights.items()}
+        prod_rank_df = WeightedProductRanker(weights, k).result
+        product_links_dict = self.get_product_links_dict()
+        product_ranker_info = []
+        for product_id, product_name, score, coverage in zip(prod_rank_df['productID'], prod_rank_df['productName'], \
+            prod_rank_df['score'], prod_rank_df['coverage']):
+            product_id = int(product_id)
+            score = max(-1.00, min(1.00, round(float(score), 2)))
+            if score == 0.0:
+                score = abs(score)
+                shift = "left: 0.75%;"
+            elif score > 0.0:
+                shift = "left: " + str((33 * score)) + "%;"
+            else:
+                shift = "right: " + str(abs(33 * score)) + "%;"
+            link = product_links_dict[product_id]
+            product_ranker_info.append((product_id, self.get_product_name(str(product_name), 70), score, \
+                round(float(coverage), 2), shift, link))
+        return product_ranker_info
     
     
 
@@ -313,20 +427,30 @@ class DataFetcher:
         """
         return [review for review in reviews if must_contain in review.lower()]
 
-    def get_market_improvement_areas_info(self) -> list:
+    def load_market_improvement_areas_info(self, filepath: str) -> list:
         """
+        Takes the filepath to improvement_areas.csv
         Returns a list of tuples, where the first item in each tuple is an
         improvement area, and the second value in each tuple is a list of
         customer reviews pertaining to that improvement area
         """
-        filepath = "templates/static/data-files/improvement_areas.csv"
         data_df = pd.read_csv(filepath)
         improvement_areas_info = []
-        for _, df_row in data_df.iterrows():
-            improvement_area = df_row['improvementArea']
-            reviews = self.filter_relevant_reviews(improvement_area.lower(), literal_eval(df_row['reviews']))
+        for improvement_area, reviews in zip(data_df['improvementArea'], data_df['reviews']):
+            reviews = self.filter_relevant_reviews(improvement_area.lower(), literal_eval(reviews))
             improvement_areas_info.append((improvement_area, reviews))
         return improvement_areas_info
+
+    def get_market_improvement_areas_info(self) -> list:
+        """
+        Returns a list of tuples, where the first item in each tuple is an
+        improvement area, and the second value in each tuple is a list of
+        customer reviews pertaining to that improvement area
+        Fetches this data from improvement_areas.csv (which is parsed once per
+        process, and parsed again only when it changes)
+        """
+        improvement_areas_info = get_artifact("improvementAreas", IMPROVEMENT_AREAS_FILEPATH, self.load_market_improvement_areas_info)
+        return [(improvement_area, list(reviews)) for improvement_area, reviews in improvement_areas_info]
     
 
     # Get customer review searching data
@@ -1,9 +1,6 @@
 import pandas as pd
 
-import nltk
-from nltk.corpus import wordnet
-nltk.download('wordnet')
-nltk.download('omw-1.4')
+from synonym_store import get_synonym_store
 
 
 class FeatureClassifier:
@@ -18,6 +15,7 @@ class FeatureClassifier:
         top_twenty_features_filepath = "templates/static/data-files/top_twenty_attributes.csv"
 
         feature_class_synonyms = self.get_feature_class_synonyms(base_words)
+        get_synonym_store().save()
         top_features = self.get_top_features(top_twenty_features_filepath)
         classified_features = self.classify_features(top_features, base_words, feature_class_synonyms)
         self.result = (classified_features, top_features)
@@ -26,13 +24,10 @@ class FeatureClassifier:
     def get_synonyms(self, word: str) -> set:
         """
         Takes a word (str).
-        Returns a set of the synonyms of that word, derived from nltk's wordnet.
+        Returns a set of the synonyms of that word, derived from nltk's wordnet (through
+        the shared SynonymStore).
         """
-        synonyms = set()
-        for syn in wordnet.synsets(word):
-            for name in syn.lemma_names():
-                synonyms.add(name.replace("_", " ").lower())
-        return synonyms
+        return {name.replace("_", " ").lower() for name in get_synonym_store().get_lemma_names(word)}
     
     def get_feature_class_synonyms(self, base_words: dict) -> dict:
         """
@@ -0,0 +1,124 @@
+import threading
+
+import nltk
+
+
+# The components of spacy's en_core_web_sm model that each caller does not need,
+# and which are therefore never loaded for it
+SPACY_PROFILES = {
+    "parser": ["ner"], # POS tags and dependency parses (ABSA v1, DataLoader's DocBins)
+    "lemmatizer": ["parser", "ner"], # Lemmas only (DataLoader preprocessing)
+    "tagger": ["parser", "ner", "lemmatizer"] # POS tags only (ImprovementExtractor.tag_pos)
+}
+
+# The location that nltk.data.find looks for each of the nltk data packages at
+NLTK_RESOURCES = {
+    "stopwords": "corpora/stopwords",
+    "punkt": "tokenizers/punkt",
+    "averaged_perceptron_tagger": "taggers/averaged_perceptron_tagger",
+    "wordnet": "corpora/wordnet",
+    "omw-1.4": "corpora/omw-1.4",
+    "vader_lexicon": "sentiment/vader_lexicon.zip"
+}
+
+STANZA_PROCESSORS = "tokenize,pos,lemma,depparse"
+
+
+class ModelRegistry:
+
+    def __init__(self):
+        """
+        Keeps track of the NLP models that have been loaded in this process, so
+        that each model is loaded only once, and only when it is first used
+        (rather than when the module that uses it is imported).
+        Nothing is loaded or downloaded when the registry is created.
+        """
+        self.spacy_models = dict() # Maps each spacy profile to its loaded model
+        self.stanza_pipelines = dict() # Maps whether the input is pretokenized to the stanza pipeline
+        self.nltk_data = set() # The nltk data packages known to be present
+        self.lock = threading.RLock()
+
+    def get_spacy(self, profile: str="parser"):
+        """
+        Takes the name of one of the profiles in SPACY_PROFILES (profile).
+        Returns spacy's en_core_web_sm model, loaded with only the components
+        that the profile needs. The model is loaded the first time the profile
+        is requested, and the same model is returned afterwards.
+        """
+        if profile not in SPACY_PROFILES:
+            raise ValueError(f"Unknown spacy profile: {profile}")
+        with self.lock:
+            if profile not in self.spacy_models:
+                import spacy
+                self.spacy_models[profile] = spacy.load("en_core_web_sm", exclude=SPACY_PROFILES[profile])
+            return self.spacy_models[profile]
+
+    def get_stanza(self, pretokenized: bool=True):
+        """
+        Returns a Stanford NLP (stanza) pipeline used by ABSA v2. Only the
+        processors needed for dependency parsing are loaded. If pretokenized is
+        True, then the pipeline treats its input as pretokenized (the sentences
+        are already tokenized with nltk); otherwise the pipeline splits raw text
+        into sentences and words itself.
+        Each pipeline is created the first time it is requested. The stanza
+        models are only downloaded if they are not already present.
+        """
+        with self.lock:
+            if pretokenized not in self.stanza_pipelines:
+                import stanza
+                from stanza.pipeline.core import DownloadMethod
+                self.stanza_pipelines[pretokenized] = stanza.Pipeline('en', processors=STANZA_PROCESSORS, \
+                    tokenize_pretokenized=pretokenized, download_method=DownloadMethod.REUSE_RESOURCES)
+            return self.stanza_pipelines[pretokenized]
+
+    def require_nltk_data(self, *packages) -> None:
+        """
+        Takes the names of nltk data packages (packages).
+        Makes sure that each of these packages is present, downloading only the
+        ones that cannot be found. Each package is only checked for once.
+        """
+        with self.lock:
+            for package in packages:
+                if package in self.nltk_data:
+                    continue
+                try:
+                    nltk.data.find(NLTK_RESOURCES[package])
+                except LookupError:
+                    nltk.download(package)
+                self.nltk_data.add(package)
+
+    def get_loaded(self) -> list:
+        """
+        Returns a list of the names of the models that have been loaded in this
+        process so far.
+        """
+        loaded = [f"spacy:{profile}" for profile in self.spacy_models]
+        loaded += ["stanza:pretokenized" if pretokenized else "stanza" for pretokenized in self.stanza_pipelines]
+        return loaded + [f"nltk:{package}" for package in sorted(self.nltk_data)]
+
+
+registry = ModelRegistry()
+
+
+def get_spacy(profile: str="parser"):
+    """
+    Takes the name of a spacy profile (profile). Returns the process-wide spacy
+    model for the profile (see ModelRegistry.get_spacy).
+    """
+    return registry.get_spacy(profile)
+
+
+def get_stanza(pretokenized: bool=True):
+    """
+    Takes whether the input of the pipeline is pretokenized (pretokenized).
+    Returns the process-wide stanza pipeline (see ModelRegistry.get_stanza).
+    """
+    return registry.get_stanza(pretokenized)
+
+
+def require_nltk_data(*packages) -> None:
+    """
+    Takes the names of nltk data packages (packages). Makes sure they are present
+    (see ModelRegistry.require_nltk_data).
+    """
+    registry.require_nltk_data(*packages)
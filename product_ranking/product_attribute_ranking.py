@@ -1,6 +1,10 @@
+import numpy as np
 import pandas as pd
 from ast import literal_eval
 
+
+SCORE_MATRIX_FILEPATH = "templates/static/data-files/product_attribute_scores.npz"
+
 class ProductAttributeRankingCSVGenerator:
 
     def __init__(self, filepath: str="templates/static/data-files/product_attribute_descriptions_report.csv"):
@@ -10,6 +14,7 @@ class ProductAttributeRankingCSVGenerator:
         self.attribute_product_mapping = dict()
         self.generate_product_rankings_by_attribute(data_df)
         self.export_data()
+        self.export_score_matrix(data_df)
     
     
     def load_data(self, filepath: str):
@@ -117,3 +122,31 @@ class ProductAttributeRankingCSVGenerator:
         """
         final_df = pd.DataFrame.from_dict(self.get_final_formatted_dict())
         final_df.to_csv('templates/static/data-files/attribute_product_mappings.csv')
+
+    def export_score_matrix(self, data_df) -> None:
+        """
+        Takes a pandas DataFrame (data_df) which contains the information from the file
+        product_attribute_descriptions_report.csv
+        Builds a products x attributes matrix of the sentiment scores of each product with respect
+        to each of the attributes in self.attribute_product_mapping (products in the order of data_df,
+        attributes in the order of self.attribute_product_mapping), along with a presence mask that
+        records which attributes are among the top relevant attributes of each product (the scores
+        of the other attributes are 0).
+        Writes the matrix, the mask, the product ids, the product names and the attributes to a
+        NumPy file: product_attribute_scores.npz (used by WeightedProductRanker).
+        """
+        attributes = list(self.attribute_product_mapping.keys())
+        attribute_positions = {attribute: column for column, attribute in enumerate(attributes)}
+        scores = np.zeros((len(data_df), len(attributes)), dtype='float64')
+        presence = np.zeros((len(data_df), len(attributes)), dtype=bool)
+        for row, (top_attributes, attribute_scores) in enumerate(zip(data_df['topRelevantAttributes'], data_df['attributeScores'])):
+            for attribute in top_attributes:
+                scores[row, attribute_positions[attribute]] = attribute_scores[attribute]
+                presence[row, attribute_positions[attribute]] = True
+        np.savez(SCORE_MATRIX_FILEPATH,
+            productIds=data_df['productID'].to_numpy(dtype='int64'),
+            productNames=np.array(data_df['productName'].fillna('').astype(str).to_list(), dtype=str),
+            attributes=np.array(attributes, dtype=str),
+            scores=scores,
+            presence=presence
+        )
@@ -1,6 +1,11 @@
 import pandas as pd
 from ast import literal_eval
 
+from artifact_cache import get_artifact
+
+
+ATTRIBUTE_PRODUCT_MAPPINGS_FILEPATH = 'templates/static/data-files/attribute_product_mappings.csv'
+
 
 class ProductRanker:
 
@@ -8,9 +13,10 @@ class ProductRanker:
         """
         Takes in the attribute (product feature) for which the user wishes to rank the products.
         Computes and stores the product rankings in a pandas DataFrame in self.result.
+        The product mappings of the attributes are looked up in the ranking index, which is
+        shared by the whole process (see self.get_ranking_index).
         """
-        data_df = self.load_data()
-        self.result = self.get_product_rankings(attribute, data_df)
+        self.result = self.get_product_rankings(attribute)
 
     
     def fix_data_format(self, data_df):
@@ -25,28 +31,44 @@ class ProductRanker:
         data_df['productMapping'] = data_df['productMapping'].apply(lambda x: literal_eval(x))
         return data_df
 
-    def load_data(self):
+    def load_data(self, filepath: str=ATTRIBUTE_PRODUCT_MAPPINGS_FILEPATH):
         """
         Loads the data stored in the attribute_product_mappings.csv file into a pandas DataFrame.
         Then, it reformats some of the data from strings into the corresponding literals.
         Returns the reformatted DataFrame.
         """
-        return self.fix_data_format(pd.read_csv('templates/static/data-files/attribute_product_mappings.csv'))
+        return self.fix_data_format(pd.read_csv(filepath))
 
-    
-    def extract_product_mapping(self, attribute: str, data_df):
+    def build_ranking_index(self, filepath: str=ATTRIBUTE_PRODUCT_MAPPINGS_FILEPATH) -> dict:
+        """
+        Takes the filepath to the attribute_product_mappings.csv file.
+        Returns the ranking index: a dictionary mapping each attribute to its product mapping
+        (if an attribute appears more than once, then its first product mapping is kept).
+        """
+        data_df = self.load_data(filepath)
+        ranking_index = dict()
+        for attribute, product_mapping in zip(data_df['attribute'], data_df['productMapping']):
+            ranking_index.setdefault(attribute, product_mapping)
+        return ranking_index
+
+    def get_ranking_index(self) -> dict:
+        """
+        Returns the ranking index (see self.build_ranking_index). It is built once per
+        process, and built again only when attribute_product_mappings.csv changes.
+        """
+        return get_artifact("rankingIndex", ATTRIBUTE_PRODUCT_MAPPINGS_FILEPATH, self.build_ranking_index)
+
+    def get_product_mapping(self, attribute: str) -> list:
         """
         Takes the attribute (product feature) based on which the products are to be ranked.
-        Also takes a pandas DataFrame (data_df), which contains the information of all the 
-        attribute product mappings.
-        Finds the row of the DataFrame which contains the information for the chosen
-        attribute, and returns the product mapping for that row.
-        If the row for this attribute does not exist, a KeyError is raised.
-        """
-        for _, df_row in data_df.iterrows():
-            if df_row['attribute'] == attribute:
-                return df_row['productMapping']
-        raise KeyError("An issue occurred while fetching the entered attribute\nEntered attribute does not exist!")
+        Returns the product mapping for the attribute, from the ranking index.
+        If there is no product mapping for this attribute, a KeyError is raised.
+        """
+        ranking_index = self.get_ranking_index()
+        if attribute not in ranking_index:
+            raise KeyError("An issue occurred while fetching the entered attribute\nEntered attribute does not exist!")
+        return ranking_index[attribute]
+
     
     def generate_ranking_csv(self, product_mapping):
         """
@@ -65,11 +87,10 @@ class ProductRanker:
         data_df = pd.DataFrame.from_dict(result)
         return data_df
 
-    def get_product_rankings(self, attribute: str, data_df):
+    def get_product_rankings(self, attribute: str):
         """
         Takes the attribute (product feature) based on which the products need to be ranked.
-        Also takes a pandas DataFrame (data_df) which contains all of the attribute product mappings.
         Returns a pandas DataFrame which contains the product rankings based on the chosen attribute.
         """
-        product_mapping = self.extract_product_mapping(attribute, data_df)
+        product_mapping = self.get_product_mapping(attribute)
         return self.generate_ranking_csv(product_mapping)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from artifact_cache import get_artifact
+from product_ranking.product_attribute_ranking import SCORE_MATRIX_FILEPATH
+
+
+def load_score_matrix(filepath: str=SCORE_MATRIX_FILEPATH) -> dict:
+    """
+    Takes the filepath to product_attribute_scores.npz
+    Returns a dictionary with the products x attributes sentiment score matrix (scores),
+    its presence mask (presence), the product ids (productIds) and names (productNames)
+    of its rows, the attributes of its columns (attributes), and a dictionary mapping each
+    attribute to its column (attributePositions).
+    """
+    with np.load(filepath, allow_pickle=False) as data:
+        score_matrix = {name: data[name] for name in data.files}
+    score_matrix['attributePositions'] = {attribute: column for column, attribute in enumerate(score_matrix['attributes'].tolist())}
+    return score_matrix
+
+
+class WeightedProductRanker:
+
+    def __init__(self, weights: dict, k: int=10):
+        """
+        Takes a dictionary mapping each of the attributes (product features) that the products
+        are ranked on to the weight of that attribute (weights), ex: {"comfort": 0.5, "noise": 0.3,
+        "price": 0.2}. Also takes the number of products to return (k).
+        Computes and stores the k highest ranked products in a pandas DataFrame in self.result.
+        """
+        self.result = self.get_top_products(weights, k)
+
+    def get_score_matrix(self) -> dict:
+        """
+        Returns the products x attributes score matrix (see load_score_matrix). It is loaded
+        once per process, and loaded again only when product_attribute_scores.npz changes.
+        """
+        return get_artifact("scoreMatrix", SCORE_MATRIX_FILEPATH, load_score_matrix)
+
+    def get_columns(self, score_matrix: dict, weights: dict) -> tuple:
+        """
+        Takes the score matrix (score_matrix) and the weights of the attributes (weights).
+        Returns a tuple with the columns of the attributes in the score matrix, and an array
+        of their weights (in the same order).
+        If an attribute is not in the score matrix, a KeyError is raised. If a weight is not
+        positive, a ValueError is raised.
+        """
+        columns = []
+        for attribute in weights:
+            if attribute not in score_matrix['attributePositions']:
+                raise KeyError("An issue occurred while fetching the entered attribute\nEntered attribute does not exist!", attribute)
+            if not weights[attribute] > 0:
+                raise ValueError("The weight of every attribute must be positive", attribute)
+            columns.append(score_matrix['attributePositions'][attribute])
+        return columns, np.array([float(weight) for weight in weights.values()])
+
+    def get_top_products(self, weights: dict, k: int):
+        """
+        Takes the weights of the attributes (weights) and the number of products to return (k).
+        The score of a product is the weighted average of its sentiment scores with respect to
+        the attributes that are among its top relevant attributes (so an attribute that was not
+        relevant for a product neither adds to nor takes away from its score), and its coverage is
+        the fraction of the total weight that these attributes make up. Products for which none of
+        the attributes are relevant are not ranked.
+        Returns a pandas DataFrame with the productID, productName, score and coverage of the (up
+        to) k products with the highest scores, in descending order of scores (products with the
+        same score keep the order of the descriptions report).
+        """
+        score_matrix = self.get_score_matrix()
+        columns, weight_values = self.get_columns(score_matrix, weights)
+        covered_weights = score_matrix['presence'][:, columns] @ weight_values
+        weighted_scores = score_matrix['scores'][:, columns] @ weight_values
+
+        candidates = np.flatnonzero(covered_weights > 0)
+        candidate_scores = weighted_scores[candidates] / covered_weights[candidates]
+        k = min(k, len(candidates))
+        if k > 0:
+            # The k-th highest score, found without sorting all of the scores. Products tied
+            # with it are taken in the order of the descriptions report, so the result
+            # does not depend on how the partition breaks ties.
+            threshold = candidate_scores[np.argpartition(-candidate_scores, k - 1)[k - 1]]
+            above = np.flatnonzero(candidate_scores > threshold)
+            tied = np.flatnonzero(candidate_scores == threshold)[:k - len(above)]
+            top = np.concatenate([above, tied])
+            top = top[np.lexsort((top, -candidate_scores[top]))]
+        else:
+            top = np.array([], dtype='int64')
+
+        rows = candidates[top]
+        return pd.DataFrame.from_dict({
+            'productID': score_matrix['productIds'][rows],
+            'productName': score_matrix['productNames'][rows],
+            'score': candidate_scores[top],
+            'coverage': covered_weights[rows] / weight_values.sum()
+        })
@@ -1,38 +1,47 @@
+import numpy as np
 import pandas as pd
 
 class AttributeNegativeCountMapper:
 
     def __init__(self):
-        self.attribute_score_by_product = dict()
         self.attribute_scores = {'attribute': [], 'score': []}
-    
-    def map_entry(self, word: str, entry: dict, row) -> None:
+        self.product_counts = None
+
+    def get_product_counts(self, aspect_words):
         """
-        Takes 3 inputs:
-        - word: a string, the current attribute being considered
-        - entry: a dict, a specific entry of mined text, containing an attribute,
-            a description, and a polarity (sentiment) score.
-        - row: an entire row of data from the 'mined_data.csv' file
+        Takes a pandas DataFrame (aspect_words) with one row for every time an attribute
+        is mentioned in a customer review, in the order in which they are mentioned, with
+        the columns:
+        - attribute: the attribute (word) being mentioned
+        - productName: the name of the product that the customer review is for
+        - polarity: the polarity (sentiment) score of the mined entry that the attribute
+            was mentioned in
+        - count (optional): the number of mentions that the row stands for (1 if there is
+            no count column). Rows with a larger count carry the net polarity of those
+            mentions, which lets earlier counts be continued with new mentions.
 
-        Updates the count of how many times the attribute held in 'word' has been
-        mentioned, and also the net polarity associated with that attribute.
-        These scores are updated with respect to the specific product for which
-        this row of data is based.
-        These scores are updated in the dictionary self.attribute_score_by_product.
+        Groups the mentions by (attribute, product) in a single pass, adding up the net
+        polarity and the number of mentions of each group. The polarities of a group are
+        added in the order in which they were mentioned. Mentions in customer reviews
+        without a product name are not counted towards any product.
+        Returns a pandas DataFrame with the attribute, productName, net polarity (polarity)
+        and number of mentions (count) of each group, in order of their first mention.
         """
-        product_name = row['productName']
-        polarity = float(entry['polarity'])
-        if word in self.attribute_score_by_product:
-            if product_name in self.attribute_score_by_product[word]:
-                curr_polarity = self.attribute_score_by_product[word][product_name][0]
-                curr_count = self.attribute_score_by_product[word][product_name][1]
-                self.attribute_score_by_product[word][product_name] = (curr_polarity + polarity, curr_count + 1)
-            else:
-                self.attribute_score_by_product[word][product_name] = (polarity, 1)
+        aspect_words = aspect_words.dropna(subset=['productName'])
+        attribute_codes, _ = pd.factorize(aspect_words['attribute'])
+        product_codes, products = pd.factorize(aspect_words['productName'])
+        group_codes, groups = pd.factorize(attribute_codes.astype('int64') * len(products) + product_codes)
+        first_rows = np.unique(group_codes, return_index=True)[1]
+        if 'count' in aspect_words.columns:
+            mentions = aspect_words['count'].to_numpy(dtype='float64')
         else:
-            self.attribute_score_by_product[word] = dict()
-            self.attribute_score_by_product[word][product_name] = (polarity, 1)
-    
+            mentions = np.ones(len(aspect_words))
+        return pd.DataFrame({
+            'attribute': aspect_words['attribute'].to_numpy()[first_rows],
+            'productName': aspect_words['productName'].to_numpy()[first_rows],
+            'polarity': np.bincount(group_codes, weights=aspect_words['polarity'].to_numpy(dtype='float64'), minlength=len(groups)),
+            'count': np.bincount(group_codes, weights=mentions, minlength=len(groups)).astype('int64')
+        })
 
     def export_data(self) -> None:
         """
@@ -41,39 +50,37 @@ class AttributeNegativeCountMapper:
         attribute_negative_counts.csv
         """
         pd.DataFrame.from_dict(self.attribute_scores).to_csv("templates/static/data-files/attribute_negative_counts.csv")
-    
-    def get_score(self, product_polarities: dict) -> int:
+
+    def get_scores(self, product_counts) -> tuple:
         """
-        Takes a dictionary (product_polarities) of polarity scores (sentiment scores)
-        for each product with respect to a certain attribute.
-        Returns the number of products for which the attribute is mentioned at least 5
+        Takes a pandas DataFrame with the net polarity and number of mentions of each
+        (attribute, product) group (product_counts, see self.get_product_counts).
+        Returns a tuple with the attributes (in order of their first mention), and, for each
+        of them, the number of products for which the attribute is mentioned at least 5
         times and where the net sentiment score (polarity score) is negative.
         """
-        neg_count = 0
-        for product_name in product_polarities:
-            polarity, count = product_polarities[product_name]
-            if polarity < 0.0 and count >= 5:
-                neg_count += 1
-        return neg_count
-    
-    def get_attribute_scores(self) -> None:
+        attribute_codes, attributes = pd.factorize(product_counts['attribute'])
+        negative = (product_counts['polarity'].to_numpy() < 0.0) & (product_counts['count'].to_numpy() >= 5)
+        return list(attributes), np.bincount(attribute_codes[negative], minlength=len(attributes))
+
+    def get_attribute_scores(self, aspect_words) -> None:
         """
-        Gets the negative count scores for each of the attributes that are present as keys
-        in the dictionary self.attribute_score_by_product. These scores are sorted in
-        decreasing order and stored in the list attribute_scores.
+        Takes a pandas DataFrame (aspect_words) with one row for every time an attribute is
+        mentioned in a customer review (see self.get_product_counts).
+        Gets the negative count scores for each of the attributes. These scores are sorted in
+        decreasing order (attributes with the same score stay in order of their first mention).
         The set of attributes for which the score is greater than 0 is added to the 
         dictionary self.attribute_scores (in a way that preserves the decreasing order
-        with respect to scores).
+        with respect to scores). The counts of each (attribute, product) group are kept in
+        self.product_counts.
 
         The data in self.attribute_scores is exported as a CSV file: attribute_negative_counts.csv
         """
-        attribute_scores = []
-        for attribute in self.attribute_score_by_product:
-            attribute_scores.append((attribute, self.get_score(self.attribute_score_by_product[attribute])))
-        attribute_scores.sort(key=lambda x: x[1], reverse=True)
+        self.product_counts = self.get_product_counts(aspect_words)
+        attributes, scores = self.get_scores(self.product_counts)
 
-        for attribute, score in attribute_scores:
-            if score > 0:
-                self.attribute_scores['attribute'].append(attribute)
-                self.attribute_scores['score'].append(score)
-        self.export_data()
\ No newline at end of file
+        for position in np.argsort(-scores, kind='stable'):
+            if scores[position] > 0:
+                self.attribute_scores['attribute'].append(attributes[position])
+                self.attribute_scores['score'].append(int(scores[position]))
+        self.export_data()
@@ -0,0 +1,250 @@
+import numpy as np
+import pandas as pd
+
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.feature_extraction.text import TfidfTransformer
+
+from report_results.synonym_mapper import SynonymMapper
+from absa_ensemble.polarity_scorer import get_polarity_scorer
+
+
+def get_tf_idf_scores(word_count, feature_names: list, row_counts: list=None):
+    """
+    Takes 3 inputs:
+    - word_count: a (sparse) matrix of the number of times each attribute is
+        present in each customer review
+    - feature_names: the attribute corresponding to each column of word_count
+    - row_counts (optional): the number of customer reviews that each row of
+        word_count stands for, when customer reviews that mention the same
+        attributes share a single row
+
+    Returns a pandas DataFrame with the total tf-idf score (TfIdfScore) of each
+    attribute (Word) across the customer reviews, sorted in descending order of
+    these scores.
+    """
+    tf_idf_transformer = TfidfTransformer(use_idf=True, smooth_idf=True)
+    if row_counts is None:
+        tf_idf_vectors = tf_idf_transformer.fit_transform(word_count)
+
+        # Summing each column of the sparse tf-idf matrix adds up the scores of an
+        # attribute across all the customer reviews, without densifying any vectors
+        total_scores = tf_idf_vectors.sum(axis=0).A1
+    else:
+        # The smoothed idf calculated by the TfidfTransformer, with each row counted
+        # as row_counts customer reviews
+        row_counts = np.asarray(row_counts, dtype='float64')
+        document_counts = (word_count > 0).T @ row_counts
+        tf_idf_transformer.fit(word_count)
+        tf_idf_transformer.idf_ = np.log((row_counts.sum() + 1) / (document_counts + 1)) + 1
+        total_scores = tf_idf_transformer.transform(word_count).T @ row_counts
+
+    df_tf_idf_scores = pd.DataFrame.from_dict({
+        'Word': list(feature_names),
+        'TfIdfScore': total_scores
+    })
+    df_tf_idf_scores = df_tf_idf_scores.sort_values(by=['TfIdfScore'], ascending=False)
+    return df_tf_idf_scores
+
+
+class ProductDescriptions:
+
+    def __init__(self, stopwords: set, product_words: set):
+        """
+        Takes the words that are never considered as attributes or descriptions (stopwords),
+        and the words of the name of the type of products (and their synonyms) that are
+        skipped as well (product_words).
+        Generates the rows of the descriptions report (product_attribute_descriptions_report.csv)
+        for products, from the entries mined from their customer reviews. The row of a product
+        only depends on the product's own customer reviews, so products can be described
+        separately (ex: in different processes).
+        """
+        self.stopwords = stopwords
+        self.product_words = product_words
+
+    def get_descriptions_report(self, id, product_name: str, descriptions) -> dict:
+        """
+        Takes 3 inputs: the product id, the product name, and the descriptions used
+        to describe that product with respect to different attributes (product
+        features). descriptions contains the attributes and corresponding descriptive
+        words used for every attribute with respect to a single product.
+
+        Generates a dictionary (descriptions_dict) which contains the product id,
+        the corresponding product name, the top relevant attributes for the product,
+        the top descriptive words used for those attributes for the product, and the
+        sentiment (polarity) scores associated with each of those attributes for the
+        product.
+
+        This dictionary (a single row of the descriptions report) is returned.
+        """
+        attribute_scores = dict()
+        polarity_scorer = get_polarity_scorer()
+        for attribute in descriptions:
+            attribute_score = 0
+            for score in polarity_scorer.score_many(descriptions[attribute]):
+                attribute_score += (score.textblob_polarity * (1 - score.subjectivity))
+            attribute_scores[attribute] = attribute_score
+
+        return {
+            'productID': int(id),
+            'productName': product_name,
+            'topRelevantAttributes': list(descriptions.keys()),
+            'topAttributeDescriptions': descriptions,
+            'attributeScores': attribute_scores
+        }
+
+
+    def add_entry_words(self, entries: list, sm, attribs_distrib: list, descriptions_distrib: list) -> None:
+        """
+        Takes a list of mined entries (entries) from a customer review, the SynonymMapper
+        of the product that the customer review is for (sm), and the lists that the
+        attribute words (attribs_distrib) and descriptive words (descriptions_distrib)
+        of the customer review are added to.
+        Adds the words of the attributes and descriptions of the entries to these lists,
+        skipping stopwords, words in the product's name and entries without any sentiment,
+        and mapping each word to its synonym (as in ReportResults.get_attribute_set).
+        """
+        for entry in entries:
+            if float(entry['polarity']) == 0.0:
+                continue
+            for word in entry['aspect'].split():
+                if word not in self.stopwords and word not in self.product_words:
+                    attribs_distrib.append(sm.map_synonyms(word=word))
+            for word in entry['description'].split():
+                if word not in self.stopwords and word not in self.product_words:
+                    descriptions_distrib.append(sm.map_synonyms(word))
+
+    def get_product_group(self, reviews: list) -> dict:
+        """
+        Takes the entries mined from each of the customer reviews of a product, in order
+        (reviews, a list of tuples with the entries mined from the text and the header of
+        each customer review).
+        Returns a dictionary with what is needed for the product's row of the descriptions
+        report:
+        - attributeTexts: the attribute words of each of its customer reviews (as in the
+            attribute_text_distribution of ReportResults.get_attribute_set)
+        - descriptionTexts: the descriptive words of each of its customer reviews (as in
+            the description_text_distribution of ReportResults.get_attribute_set)
+        - aspectDescriptions: the set of descriptions mined for each aspect
+        Every product has its own SynonymMapper, so the synonyms of a product's attributes
+        are mapped in the same way as when the product is considered on its own.
+        """
+        sm = SynonymMapper()
+        group = {'attributeTexts': [], 'descriptionTexts': [], 'aspectDescriptions': dict()}
+        for entries, header_entries in reviews:
+            attribs_distrib = []
+            descriptions_distrib = []
+            self.add_entry_words(entries, sm, attribs_distrib, descriptions_distrib)
+            self.add_entry_words(header_entries, sm, attribs_distrib, descriptions_distrib)
+            group['attributeTexts'].append("".join(word + ' ' for word in attribs_distrib))
+            group['descriptionTexts'].append("".join(word + ' ' for word in descriptions_distrib))
+            for entry in entries + header_entries:
+                group['aspectDescriptions'].setdefault(entry['aspect'], set()).add(entry['description'])
+        return group
+
+    def get_term_matrix(self, texts: list) -> tuple:
+        """
+        Takes a list of texts (texts).
+        Returns a tuple with the matrix of the number of times each word is present in
+        each text (built by a single CountVectorizer over all of the texts), and the
+        words corresponding to its columns. If none of the texts contain any words, then
+        the matrix is None.
+        """
+        cv = CountVectorizer()
+        try:
+            return cv.fit_transform(texts), cv.get_feature_names()
+        except ValueError: # None of the texts contain any words
+            return None, []
+
+    def get_group_tf_idf_scores(self, word_count, feature_names: list, start: int, end: int):
+        """
+        Takes a term matrix (word_count) and the words corresponding to its columns
+        (feature_names), along with the range of rows [start, end) that belong to a
+        single product.
+        Returns a pandas DataFrame with the total tf-idf score of each word across
+        the rows of the product, sorted in descending order of these scores. Only the
+        words present in the rows of the product are considered, so the scores are the
+        same as if the product's rows had been vectorized on their own.
+        """
+        if word_count is None:
+            return pd.DataFrame.from_dict({'Word': [], 'TfIdfScore': []})
+        group_word_count = word_count[start:end]
+        columns = (group_word_count.sum(axis=0).A1 > 0).nonzero()[0]
+        if len(columns) == 0:
+            return pd.DataFrame.from_dict({'Word': [], 'TfIdfScore': []})
+        return get_tf_idf_scores(group_word_count[:, columns], [feature_names[column] for column in columns])
+
+    def get_product_descriptions_from_scores(self, attribute_scores, description_scores, aspect_descriptions: dict, \
+        num_attributes: int=10, num_descriptions: int=10) -> dict:
+        """
+        Takes the tf-idf scores of the attributes (attribute_scores) and of the descriptive
+        words (description_scores) of a product, along with the set of descriptions mined
+        for each aspect of the product (aspect_descriptions).
+        Returns a dictionary mapping each of the num_attributes most relevant attributes
+        of the product (in order of relevance) to the (up to num_descriptions) most
+        relevant descriptive words used for that attribute.
+        """
+        top_attributes = attribute_scores.head(num_attributes)['Word'].to_list()
+        description_words = description_scores['Word'].to_list()
+        top_descriptions = dict()
+        for attribute in top_attributes:
+            descriptions = aspect_descriptions.get(attribute, set())
+            top_descriptions[attribute] = [word for word in description_words if word in descriptions][:num_descriptions]
+        return top_descriptions
+
+    def get_rows(self, products: list, progress=None) -> list:
+        """
+        Takes a list of products (products), each a tuple with the product id, the product
+        name, and the entries mined from each of its customer reviews (see
+        self.get_product_group). Optionally takes a ProgressReporter (progress, see
+        run_telemetry.py), which is updated as each product is described.
+        Returns the rows of the descriptions report for these products, in the same order.
+        The attribute and description term matrices of all of these products are built
+        in a single pass, and the tf-idf scores of each product are calculated from its
+        rows of these matrices.
+        """
+        product_groups = []
+        attribute_texts = []
+        description_texts = []
+        row_ranges = [] # The range of the rows of each product in the term matrices
+        for _, _, reviews in products:
+            group = self.get_product_group(reviews)
+            start = len(attribute_texts)
+            attribute_texts += group['attributeTexts']
+            description_texts += group['descriptionTexts']
+            row_ranges.append((start, len(attribute_texts)))
+            product_groups.append(group)
+        attribute_word_count, attribute_names = self.get_term_matrix(attribute_texts)
+        description_word_count, description_names = self.get_term_matrix(description_texts)
+
+        rows = []
+        for (product_id, product_name, _), group, (start, end) in zip(products, product_groups, row_ranges):
+            descriptions = self.get_product_descriptions_from_scores(
+                self.get_group_tf_idf_scores(attribute_word_count, attribute_names, start, end),
+                self.get_group_tf_idf_scores(description_word_count, description_names, start, end),
+                group['aspectDescriptions']
+            )
+            rows.append(self.get_descriptions_report(product_id, product_name, descriptions))
+            if progress is not None:
+                progress.update()
+        return rows
+
+
+worker_state = dict() # Holds the ProductDescriptions of each worker process of the process pool
+
+def init_worker(stopwords: set, product_words: set) -> None:
+    """
+    Runs once in each worker process of the process pool, when the worker starts.
+    Creates the worker's ProductDescriptions, and loads the PolarityScorer and the
+    SynonymStore, so that they are not loaded again for every product.
+    """
+    worker_state['descriptions'] = ProductDescriptions(stopwords, product_words)
+    get_polarity_scorer().score("warm up")
+    SynonymMapper()
+
+def describe_worker_products(products: list) -> list:
+    """
+    Takes a list of products (products, see ProductDescriptions.get_rows).
+    Runs inside a worker process of the process pool: returns the rows of the
+    descriptions report for these products, in the same order.
+    """
+    return worker_state['descriptions'].get_rows(products)
@@ -1,39 +1,71 @@
 import pandas as pd
 from ast import literal_eval
-
-from textblob import TextBlob
+from multiprocessing import Pool
 
 from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.feature_extraction.text import TfidfTransformer
 from sklearn.feature_extraction.text import TfidfVectorizer
 
-import spacy
-nlp = spacy.load("en_core_web_sm")
-
-import nltk
-nltk.download('wordnet')
-nltk.download('omw-1.4')
-from nltk.corpus import wordnet
+from spacy.lang.en.stop_words import STOP_WORDS
 
 from report_results.synonym_mapper import SynonymMapper
 from report_results.attribute_negative_count_mapper import AttributeNegativeCountMapper
+from report_results.product_descriptions import ProductDescriptions, get_tf_idf_scores, init_worker, describe_worker_products
+from absa_ensemble.polarity_scorer import get_polarity_scorer
+from report_results.report_state import get_reviews_hashes, load_report_state, save_report_state, REPORT_STATE_FILEPATH
+from absa_ensemble.aspect_table import build_aspect_table, load_aspect_table, get_file_signature
+from run_telemetry import track_progress
+from synonym_store import get_synonym_store
+
+
+DESCRIPTIONS_REPORT_FILEPATH = "templates/static/data-files/product_attribute_descriptions_report.csv"
 
 
 class ReportResults:
 
-    def __init__(self, filepath: str="templates/static/data-files/mined_data.csv", product_name: str=""):
+    def __init__(self, filepath: str="templates/static/data-files/mined_data.csv", product_name: str="", \
+        incremental: bool=False, state_filepath: str=REPORT_STATE_FILEPATH, n_workers: int=1, products_per_task: int=8):
+        """
+        Takes the filepath to the mined customer reviews (filepath), and the name of the type
+        of products they are for (product_name).
+        Generates all of the report results. If incremental is True, then the statistics
+        recorded by the last run (in the report state at state_filepath) are reused when
+        the customer reviews it covered are unchanged and still come first in the data:
+        only the customer reviews added since then are processed, and only the descriptions
+        of the products they are for are regenerated. The results are the same as those of
+        a full run.
+        If n_workers is greater than 1, then the descriptions of the products are generated
+        across a pool of n_workers processes, products_per_task products at a time (otherwise
+        all of the products are described together, in a single pass).
+        """
         self.filepath = filepath
         self.product_words = self.get_product_synonyms(product_name.split())
+        self.incremental = incremental
+        self.state_filepath = state_filepath
+        self.n_workers = n_workers
+        self.products_per_task = products_per_task
 
         self.data = None
+        self.state = None
+        self.new_data = None
+        self.product_data = None
+        self.reviews_hash = None
+        self.synonym_mapper = None
+        self.product_counts = None
+        self.attribute_helpful_counts = dict()
+        self.aspect_table = None
+        self.review_entries = dict()
         self.attribute_set = set()
-        self.attribute_text_distribution = []
+        self.attribute_text_counts = dict()
         self.word_count = None
-        nlp.Defaults.stop_words |= {"thing", "things", "got", "gone", "going", "took", "love", "like", "luck", "hate", "go", "good", "bad", "right", "wrong", "thank"}
-        self.stopwords = nlp.Defaults.stop_words
+        self.stopwords = STOP_WORDS | {"thing", "things", "got", "gone", "going", "took", "love", "like", "luck", "hate", "go", "good", "bad", "right", "wrong", "thank"}
 
         self.load_data()
+        self.load_state()
+        self.load_review_entries(self.product_data)
+        self.precompute_synonyms()
         self.generate_report_data()
+        if self.incremental:
+            self.save_state()
         self.get_rating_by_feature_attributes_result()
 
     def get_product_synonyms(self, product_name_words: list) -> set:
@@ -44,11 +76,11 @@ class ReportResults:
         Returns this set.
         """
         avoid_words = set()
+        synonym_store = get_synonym_store()
         for word in product_name_words:
             avoid_words.add(str(word).lower().strip())
-            for syn in wordnet.synsets(word):
-                for name in syn.lemma_names():
-                    avoid_words.add(str(name).lower().strip())
+            for name in synonym_store.get_lemma_names(word):
+                avoid_words.add(str(name).lower().strip())
         return avoid_words
 
     def load_data(self) -> None:
@@ -63,14 +95,177 @@ class ReportResults:
             self.data = self.data.loc[self.data['verifiedPurchase'] == True]
         except:
             pass
+
+    def get_settings(self) -> dict:
+        """
+        Returns the settings that affect the report results (apart from the customer
+        reviews themselves), which the report state is recorded with.
+        """
+        return {'productWords': sorted(self.product_words)}
+
+    def load_state(self) -> None:
+        """
+        Loads the report state recorded by the last run into self.state, if the report
+        results are generated incrementally and the state can be reused: the customer
+        reviews it covers must be unchanged and come first in self.data, and the
+        descriptions report must be the one written by that run.
+        Sets self.new_data to the customer reviews that are not covered by the state
+        (all of them, if there is no state), and self.product_data to the customer reviews
+        of the products whose descriptions need to be generated (the products of the
+        customer reviews in self.new_data).
+        """
+        state = load_report_state(self.get_settings(), self.state_filepath) if self.incremental else None
+        num_reviews = state['numReviews'] if state is not None else 0
+        prefix_hash, self.reviews_hash = get_reviews_hashes(self.data, num_reviews)
+        if state is not None:
+            try:
+                descriptions_report_signature = get_file_signature(DESCRIPTIONS_REPORT_FILEPATH)
+            except OSError:
+                descriptions_report_signature = None
+            if prefix_hash != state['reviewsHash'] or descriptions_report_signature != state['descriptionsReport']:
+                print("Report state is out of date, generating the full report")
+                state = None
+
+        self.state = state
+        if state is None:
+            self.new_data = self.data
+            self.product_data = self.data
+        else:
+            self.new_data = self.data.iloc[num_reviews:]
+            self.product_data = self.data.loc[self.data['productID'].isin(self.new_data['productID'].unique())]
+            print(f"Reusing the report state: {len(self.new_data)} new customer reviews, "
+                f"{self.product_data['productID'].nunique()} products to update")
+
+    def save_state(self) -> None:
+        """
+        Records the statistics needed to update the report results incrementally in the
+        report state at self.state_filepath: the customer reviews covered (their number and
+        hash), the state of the SynonymMapper of the full corpus, the attributes and the
+        number of customer reviews mentioning each distinct set of attributes (from which
+        the document frequencies and tf-idf scores are calculated, see
+        self.get_attribute_text_counts), the helpful count sums of the attributes, the net
+        polarity and mention counts of each (attribute, product), and the signature of the
+        descriptions report.
+        """
+        save_report_state({
+            'settings': self.get_settings(),
+            'numReviews': len(self.data),
+            'reviewsHash': self.reviews_hash,
+            'synonymMapper': self.synonym_mapper.get_state(),
+            'attributeSet': sorted(self.attribute_set),
+            'attributeTextCounts': self.attribute_text_counts,
+            'attributeHelpfulCounts': self.attribute_helpful_counts,
+            'productCounts': {column: self.product_counts[column].tolist() for column in self.product_counts.columns},
+            'descriptionsReport': get_file_signature(DESCRIPTIONS_REPORT_FILEPATH)
+        }, self.state_filepath)
+
+    def parse_mined_header(self, mined_header) -> list:
+        """
+        Takes the minedHeader value of a customer review (mined_header).
+        Returns the list of entries mined from the header, or an empty list if the
+        customer review has no mined header.
+        """
+        try:
+            return literal_eval(mined_header)
+        except (ValueError, SyntaxError):
+            return []
+
+    def load_review_entries(self, data) -> None:
+        """
+        Takes a pandas DataFrame with the customer reviews (from self.data) whose mined
+        entries are needed (data).
+        Loads the aspect table of these customer reviews (one row per mined
+        entry, see absa_ensemble/aspect_table.py) into self.aspect_table, and the entries
+        mined from each customer review into the dictionary self.review_entries, which
+        maps the index of each customer review to a tuple with the list of entries mined
+        from its text and the list of entries mined from its header (each entry being a
+        dictionary with an aspect, a description, a polarity and a subjectivity).
+        The aspect table written by the ABSA pipeline is used if it is up to date. Otherwise
+        the minedText and minedHeader columns are parsed, and the table is built from them.
+        """
+        aspect_table = load_aspect_table(self.filepath)
+        if aspect_table is None:
+            mined_data = pd.DataFrame({
+                'productID': data['productID'],
+                'minedText': data['minedText'].map(literal_eval)
+            }, index=data.index)
+            if 'minedHeader' in data.columns:
+                mined_data['minedHeader'] = data['minedHeader'].map(self.parse_mined_header)
+            self.aspect_table = build_aspect_table(mined_data)
+        else:
+            self.aspect_table = aspect_table.loc[aspect_table['reviewId'].isin(data.index)].reset_index(drop=True)
+
+        self.review_entries = {review_id: ([], []) for review_id in data.index}
+        aspect_table = self.aspect_table
+        for review_id, source, aspect, description, polarity, subjectivity in zip(aspect_table['reviewId'], \
+            aspect_table['source'], aspect_table['aspect'], aspect_table['description'], aspect_table['polarity'], \
+            aspect_table['subjectivity']):
+            entries = self.review_entries[review_id][0 if source == 'text' else 1]
+            entries.append({'aspect': aspect, 'description': description, 'polarity': polarity, 'subjectivity': subjectivity})
     
-    def get_attribute_set(self, data, full_corpus: bool=False) -> tuple:
+    def precompute_synonyms(self) -> None:
         """
-        Takes 2 inputs:
+        Looks up (in the shared SynonymStore) the stems and synonyms of every word that
+        will be mapped by a SynonymMapper while the report is generated, i.e. the words
+        of the attributes and descriptions of the mined entries that have a sentiment,
+        apart from stopwords and words in the product's name.
+        Only the words that are not already in the store are looked up in wordnet, and
+        the store is persisted so that later runs do not look them up again.
+        """
+        words = set()
+        for text_entries, header_entries in self.review_entries.values():
+            for entry in text_entries + header_entries:
+                if float(entry['polarity']) != 0.0:
+                    words.update(entry['aspect'].split())
+                    words.update(entry['description'].split())
+        words = words - self.stopwords - self.product_words
+        get_synonym_store().precompute(sorted(words))
+
+    def get_aspect_words(self, data):
+        """
+        Takes a pandas DataFrame of customer reviews from self.data (data).
+        Returns a pandas DataFrame with one row for every attribute word mentioned in the
+        text of a customer review in data (in the order in which they are mentioned),
+        apart from stopwords, words in the product's name, and words from entries without
+        any sentiment. Each row holds the word (attribute), the name of the product that the
+        customer review is for (productName), and the polarity of the mined entry (polarity).
+        These are the mentions counted by the AttributeNegativeCountMapper.
+        """
+        aspect_table = self.aspect_table
+        aspect_table = aspect_table.loc[aspect_table['reviewId'].isin(data.index) & (aspect_table['source'] == 'text') \
+            & (aspect_table['polarity'] != 0.0)]
+        aspect_words = pd.DataFrame({
+            'reviewId': aspect_table['reviewId'],
+            'attribute': aspect_table['aspect'].str.split(),
+            'polarity': aspect_table['polarity']
+        }).explode('attribute').dropna(subset=['attribute'])
+        aspect_words = aspect_words.loc[~aspect_words['attribute'].isin(self.stopwords | self.product_words)]
+        aspect_words['productName'] = aspect_words['reviewId'].map(self.data['productName'])
+        return aspect_words[['attribute', 'productName', 'polarity']].reset_index(drop=True)
+
+    def get_attribute_negative_counts(self, data) -> None:
+        """
+        Takes a pandas DataFrame of customer reviews from self.data (data).
+        Adds the attributes mentioned in data to the counts of each (attribute, product)
+        kept in self.product_counts (if any), and exports the resulting negative count
+        of each attribute as attribute_negative_counts.csv (see AttributeNegativeCountMapper).
+        """
+        aspect_words = self.get_aspect_words(data)
+        if self.product_counts is not None:
+            aspect_words = pd.concat([self.product_counts, aspect_words.assign(count=1)], ignore_index=True)
+        ancm = AttributeNegativeCountMapper()
+        ancm.get_attribute_scores(aspect_words)
+        self.product_counts = ancm.product_counts
+
+    def get_attribute_set(self, data, full_corpus: bool=False, sm: SynonymMapper=None) -> tuple:
+        """
+        Takes 3 inputs:
         - data: a pandas DataFrame
         - full_corpus: a boolean
+        - sm: the SynonymMapper to map the attributes with (a new one if sm is None)
         When full_corpus is True, then data contains the data from self.data (i.e.
-        the data from mined_data.csv)
+        the data from mined_data.csv), or the customer reviews added to it since the
+        report state was recorded
 
         This function generates a set of all the unique attributes mentioned in data.
         These attributes are mapped against their synonyms and stemmed words so
@@ -89,24 +284,21 @@ class ReportResults:
 
         All four of these generates values are returned in a tuple (in this order)
         """
-        sm = SynonymMapper()
-        if full_corpus:
-            ancm = AttributeNegativeCountMapper()
+        if sm is None:
+            sm = SynonymMapper()
 
         attribute_set = set()
         attribute_helpful_counts = dict()
         attribute_text_distribution = []
         description_text_distribution = []
-        for _, row in data.iterrows():
+        for index, helpful_count in zip(data.index, data['reviewHelpfulCount']):
             current_attribs_distrib = ""
             current_descriptions_distrib = ""
-            mined_text = literal_eval(row['minedText'])
-            helpful_count = int(row['reviewHelpfulCount'])
+            mined_text, mined_header = self.review_entries[index]
+            helpful_count = int(helpful_count)
             for entry in mined_text:
                 for word in entry['aspect'].split():
                     if word not in self.stopwords and word not in self.product_words and float(entry['polarity']) != 0.0:
-                        if full_corpus:
-                            ancm.map_entry(word=word, entry=entry, row=row)
                         word = sm.map_synonyms(word=word)
                         attribute_set.add(word)
                         current_attribs_distrib += (word + ' ')
@@ -118,32 +310,46 @@ class ReportResults:
                     if word not in self.stopwords and word not in self.product_words and float(entry['polarity']) != 0.0:
                         word = sm.map_synonyms(word)
                         current_descriptions_distrib += (word + ' ')
-            try:
-                mined_header = literal_eval(row['minedHeader'])
-                for entry in mined_header:
-                    for word in entry['aspect'].split():
-                        if word not in self.stopwords and word not in self.product_words and float(entry['polarity']) != 0.0:
-                            word = sm.map_synonyms(word)
-                            attribute_set.add(word)
-                            current_attribs_distrib += (word + ' ')
-                            if word in attribute_helpful_counts:
-                                attribute_helpful_counts[word] += helpful_count
-                            else:
-                                attribute_helpful_counts[word] = helpful_count
-                    for word in entry['description'].split():
-                        if word not in self.stopwords and word not in self.product_words and float(entry['polarity']) != 0.0:
-                            word = sm.map_synonyms(word)
-                            current_descriptions_distrib += (word + ' ')
-            except:
-                pass
+            for entry in mined_header:
+                for word in entry['aspect'].split():
+                    if word not in self.stopwords and word not in self.product_words and float(entry['polarity']) != 0.0:
+                        word = sm.map_synonyms(word)
+                        attribute_set.add(word)
+                        current_attribs_distrib += (word + ' ')
+                        if word in attribute_helpful_counts:
+                            attribute_helpful_counts[word] += helpful_count
+                        else:
+                            attribute_helpful_counts[word] = helpful_count
+                for word in entry['description'].split():
+                    if word not in self.stopwords and word not in self.product_words and float(entry['polarity']) != 0.0:
+                        word = sm.map_synonyms(word)
+                        current_descriptions_distrib += (word + ' ')
             attribute_text_distribution.append(current_attribs_distrib)
             description_text_distribution.append(current_descriptions_distrib)
 
         if full_corpus:
-            ancm.get_attribute_scores() # Exporting csv with score of neg counts by attribute
+            # Exporting csv with score of neg counts by attribute
+            self.get_attribute_negative_counts(data)
         return attribute_set, attribute_text_distribution, attribute_helpful_counts, description_text_distribution
     
 
+    def get_attribute_text_counts(self, attribute_text_distribution: list, attribute_text_counts: dict=None) -> dict:
+        """
+        Takes a list (attribute_text_distribution) which maintains the distribution of
+        attributes mentioned across customer reviews (see self.get_attribute_set).
+        Optionally takes the counts of earlier customer reviews (attribute_text_counts),
+        which the customer reviews in attribute_text_distribution are added to.
+        Returns a dictionary mapping each distinct set of attributes mentioned in a customer
+        review (its attribute words, sorted and separated by spaces) to the number of
+        customer reviews that mention it. The tf-idf scores only depend on these counts, so
+        they are all that needs to be kept of the customer reviews, however many there are.
+        """
+        attribute_text_counts = dict(attribute_text_counts or dict())
+        for attribute_text in attribute_text_distribution:
+            attribute_text = " ".join(sorted(attribute_text.split()))
+            attribute_text_counts[attribute_text] = attribute_text_counts.get(attribute_text, 0) + 1
+        return attribute_text_counts
+
     def count_vectorization(self, attribute_text_distribution: list) -> tuple:
         """
         Takes a list (attribute_text_distribution) which maintains the distribution
@@ -158,55 +364,40 @@ class ReportResults:
         word_count = cv.fit_transform(attribute_text_distribution)
         return word_count, cv
     
-    def calculate_tf_idf(self, word_count, cv):
+    def calculate_tf_idf(self, word_count, cv, row_counts: list=None):
         """
-        Takes 2 inputs:
+        Takes 3 inputs:
         - word_count, a list of vectors representing which attributes are present in which
             customer reviews (word_count was formed by the CountVectorizer)
         - cv: a CountVectorizer object
+        - row_counts (optional): the number of customer reviews that each vector in
+            word_count stands for (see self.get_attribute_text_counts)
 
         Uses the TfidfTransformer to generate the tf-idf vectors for the customer reviews.
         Then, for each attribute, it adds the tf-idf scores across all the customer reviews
-        to get the total relevance score for each attribute. These are stored in the
-        dictionary total_scores.
+        to get the total relevance score for each attribute (as the column sums of the
+        sparse tf-idf matrix). These are stored in total_scores.
 
-        These values are then reformatted into a different dictionary (formatted_scores)
-        so they can subsequently be converted to a pandas DataFrame (df_tf_idf_scores).
+        These values are then converted to a pandas DataFrame (df_tf_idf_scores).
         The values in this DataFrame are sorted in descending order of total relevance
         scores (TfIdfScore), and then this sorted DataFrame is returned.
         """
-        total_scores = dict()
-        tf_idf_transformer = TfidfTransformer(use_idf=True, smooth_idf=True)
-        tf_idf_transformer.fit(word_count)
-        print("Transformer done running")
-
-        tf_idf_vectors = tf_idf_transformer.transform(word_count)
-        print("Vector created")
-        feature_names = cv.get_feature_names()
-        print("Feature names obtained")
-
-        for index in range(tf_idf_vectors.shape[0]):
-            doc_vector = tf_idf_vectors[index]
-            df_doc_vector = pd.DataFrame(doc_vector.T.todense(), index=feature_names, columns=['TfIdfScore'])
-            for word, row in df_doc_vector.iterrows():
-                if word in total_scores:
-                    total_scores[word] += row['TfIdfScore']
-                else:
-                    total_scores[word] = row['TfIdfScore']
-            print("Completed outer iteration")
-        print("Loop completed")
-        
-        formatted_scores = {
-            'Word': [],
-            'TfIdfScore': []
-        }
-        for word in total_scores:
-            formatted_scores['Word'].append(word)
-            formatted_scores['TfIdfScore'].append(total_scores[word])
-        
-        df_tf_idf_scores = pd.DataFrame.from_dict(formatted_scores)
-        df_tf_idf_scores = df_tf_idf_scores.sort_values(by=['TfIdfScore'], ascending=False)
-        return df_tf_idf_scores
+        return self.get_tf_idf_scores(word_count, cv.get_feature_names(), row_counts)
+
+    def get_tf_idf_scores(self, word_count, feature_names: list, row_counts: list=None):
+        """
+        Takes 3 inputs:
+        - word_count: a (sparse) matrix of the number of times each attribute is
+            present in each customer review
+        - feature_names: the attribute corresponding to each column of word_count
+        - row_counts (optional): the number of customer reviews that each row of
+            word_count stands for
+
+        Returns a pandas DataFrame with the total tf-idf score (TfIdfScore) of each
+        attribute (Word) across the customer reviews, sorted in descending order of
+        these scores (see self.calculate_tf_idf and product_descriptions.get_tf_idf_scores).
+        """
+        return get_tf_idf_scores(word_count, feature_names, row_counts)
 
     def add_helpful_count(self, df_tf_idf_scores, attribute_helpful_counts: dict):
         """
@@ -219,15 +410,13 @@ class ReportResults:
         For each row in df_tf_idf_scores (corresponding to a particular attribute), the score
         is modified by taking the original score, and adding to it the product of the original
         score and the helpful counts value for the attribute in question divided by 1000).
+        The helpful counts are joined onto the attributes all at once; attributes without a
+        helpful count keep their original score.
 
         The DataFrame df_tf_idf_scores now contains these modified values, and is returned.
         """
-        for index, row in df_tf_idf_scores.iterrows():
-            try:
-                attribute = row['Word']
-                df_tf_idf_scores['TfIdfScore'][index] += (df_tf_idf_scores['TfIdfScore'][index] * attribute_helpful_counts[attribute] / 1000)
-            except:
-                pass
+        helpful_counts = df_tf_idf_scores['Word'].map(attribute_helpful_counts).fillna(0)
+        df_tf_idf_scores['TfIdfScore'] = df_tf_idf_scores['TfIdfScore'] + (df_tf_idf_scores['TfIdfScore'] * helpful_counts / 1000)
         return df_tf_idf_scores
     
 
@@ -272,136 +461,113 @@ class ReportResults:
         rating_by_feature_attributes_df.to_csv('templates/static/data-files/amazon_suggested_attributes.csv')
     
 
-    def get_descriptions_report(self, id, product_name: str, descriptions):
-        """
-        Takes 3 inputs: the product id, the product name, and the descriptions used
-        to describe that product with respect to different attributes (product
-        features). descriptions contains the attributes and corresponding descriptive
-        words used for every attribute with respect to a single product.
-
-        Generates a dictionary (descriptions_dict) which contains keys mapping to
-        lists of product ids, corresponding product names, the top relevant
-        attributes for the corresponding product, the top descriptive words used
-        for those attributes for the corresponding product, and the sentiment
-        (polarity) scores associated with each of those attributes for the
-        corresponding product.
-
-        After populating the values from descriptions into this dictionary,
-        the dictionary is converted into a pandas DataFrame, which is
-        then returned.
-        """
-        descriptions_dict = {
-            'productID': [],
-            'productName': [],
-            'topRelevantAttributes': [],
-            'topAttributeDescriptions': [],
-            'attributeScores': []
-        }
-        descriptions_dict['productID'].append(int(id))
-        descriptions_dict['productName'].append(product_name)
-        descriptions_dict['topRelevantAttributes'].append(list(descriptions.keys()))
-        descriptions_dict['topAttributeDescriptions'].append(descriptions)
-
-        attribute_scores = dict()
-        for attribute in descriptions:
-            attribute_score = 0
-            for description in descriptions[attribute]:
-                sentiment = TextBlob(description).sentiment
-                attribute_score += (sentiment.polarity * (1 - sentiment.subjectivity))
-            attribute_scores[attribute] = attribute_score
-        
-        descriptions_dict['attributeScores'].append(attribute_scores)
-        return pd.DataFrame.from_dict(descriptions_dict)
-
-
-    def get_product_description_set(self, id, num_attributes=10):
-        """
-        Takes a product id, and the number of top features to be found
-        (the default value for this is 10).
-
-        Gets all the customer reviews that are for the product
-        with the given product id. Gets the distribution of attributes
-        and descriptions in the customer reviews for this product.
-        Calculates the relevance of the attributes (using tf-idf scores).
-        The relevance of the descriptions are also calculated using
-        tf-idf scores, and the top descriptions for each attribute for the
-        product in question are ascetained.
-
-        Returns a tuple, where the first value is a dictionary mapping
-        attribtues against the top descriptive words used for that
-        attribute for the product in question, and where the second
-        value is the name of the product.
-        """
-        product_df = self.data.loc[self.data['productID'] == id]
-        _, attribute_text_distribution, _, description_text_distribution = self.get_attribute_set(product_df)
-        word_count, cv = self.count_vectorization(attribute_text_distribution)
-        df_tf_idf_scores = self.calculate_tf_idf(word_count, cv)
-        top_attributes = df_tf_idf_scores.head(num_attributes)
-        top_attributes_set = set(top_attributes['Word'].unique())
-
-        descriptions = dict()
-        top_descriptions = dict()
-        for attribute in top_attributes_set:
-            descriptions[attribute] = set()
-            top_descriptions[attribute] = []
-
-        for _, row in product_df.iterrows():
-            mined_text = literal_eval(row['minedText'])
-            try:
-                mined_text += literal_eval(row['minedHeader'])
-            except:
-                pass
-            for entry in mined_text:
-                for attribute in top_attributes_set:
-                    if attribute == entry['aspect']:
-                        descriptions[attribute].add(entry['description'])
-        
-        descrip_word_count, descrip_cv = self.count_vectorization(description_text_distribution)
-        descrip_df_tf_idf_scores = self.calculate_tf_idf(descrip_word_count, descrip_cv)
-        descrip_df_tf_idf_scores = descrip_df_tf_idf_scores.sort_values(by=['TfIdfScore'], ascending=False)
-        
-        for _, row in descrip_df_tf_idf_scores.iterrows():
-            for attribute in top_attributes_set:
-                if len(top_descriptions[attribute]) < 10 and row['Word'] in descriptions[attribute]:
-                    top_descriptions[attribute].append(row['Word'])
-        return top_descriptions, product_df.iloc[0]['productName']
-
+    def get_product_reviews(self, data) -> list:
+        """
+        Takes a pandas DataFrame of customer reviews from self.data (data).
+        Returns a list with a tuple for each product in data, in order of product id,
+        holding the product id, the name of the product (from its first customer review),
+        and the entries mined from each of its customer reviews (in order).
+        """
+        product_reviews = dict()
+        for review_id, product_id, product_name in zip(data.index, data['productID'], data['productName']):
+            if product_id not in product_reviews:
+                product_reviews[product_id] = (product_id, product_name, [])
+            product_reviews[product_id][2].append(self.review_entries[review_id])
+        return [product_reviews[product_id] for product_id in sorted(product_reviews.keys())]
+
+    def get_product_tasks(self, products: list) -> list:
+        """
+        Takes a list of products (see self.get_product_reviews).
+        Returns a list of consecutive batches of products, each containing at most
+        self.products_per_task products.
+        """
+        return [products[start:start + self.products_per_task] for start in range(0, len(products), self.products_per_task)]
 
-    def get_products_descriptions(self) -> None:
+    def get_products_descriptions(self, data, previous_report=None) -> None:
         """
+        Takes a pandas DataFrame with the customer reviews of the products whose
+        descriptions are generated (data). Optionally takes a pandas DataFrame with the
+        rows of the descriptions report written by the last run (previous_report), whose
+        rows are kept for the products that are not in data.
+
         Generates a pandas DataFrame (complete_descriptions_df), which contains
         information, for each product, on the product id, the product name,
         the top relevant product features for that product, the top
         descriptions used for each of those attributes for the product in question,
         and the sentiment (polarity) score for each of the attributes with respect
-        to the given product.
+        to the given product (see ProductDescriptions).
+
+        The customer reviews are read once and grouped by product, and all of the products
+        are described in a single pass. The description of a product only depends on its
+        own customer reviews, so if self.n_workers is greater than 1, then the products are
+        instead split into batches, which are described across a pool of worker processes.
+        Either way, the rows are in order of product id.
 
         After calculating the required values and populating this DataFrame, it is
         exported as a CSV file: product_attribute_descriptions_report.csv
         """
-        product_ids = set(self.data['productID'].unique())
-        complete_descriptions_df = pd.DataFrame.from_dict({
-            'productID': [],
-            'productName': [],
-            'topRelevantAttributes': [],
-            'topAttributeDescriptions': [],
-            'attributeScores': []
-        })
-        for id in product_ids:
-            descriptions, product_name = self.get_product_description_set(id)
-            descriptions_df = self.get_descriptions_report(id, product_name, descriptions)
-            complete_descriptions_df = pd.concat([complete_descriptions_df, descriptions_df])
-        complete_descriptions_df.to_csv('templates/static/data-files/product_attribute_descriptions_report.csv')
+        products = self.get_product_reviews(data)
+        rows = []
+        progress = track_progress("Product descriptions", len(products))
+        if self.n_workers > 1 and len(products) > self.products_per_task:
+            tasks = self.get_product_tasks(products)
+            with Pool(processes=self.n_workers, initializer=init_worker, initargs=(self.stopwords, self.product_words)) as pool:
+                for task_rows in pool.imap(describe_worker_products, tasks):
+                    rows += task_rows
+                    progress.update(len(task_rows))
+        else:
+            rows = ProductDescriptions(self.stopwords, self.product_words).get_rows(products, progress)
+
+        if previous_report is not None:
+            previous_report = previous_report.loc[~previous_report['productID'].isin([product[0] for product in products])]
+            rows = sorted(rows + previous_report.to_dict('records'), key=lambda row: row['productID'])
+        complete_descriptions_df = pd.DataFrame(rows, columns=['productID', 'productName', 'topRelevantAttributes', \
+            'topAttributeDescriptions', 'attributeScores'])
+        complete_descriptions_df.to_csv(DESCRIPTIONS_REPORT_FILEPATH)
+
+    def load_previous_report(self):
+        """
+        Returns a pandas DataFrame with the rows of the descriptions report written by the
+        last run, keeping each value exactly as it was written (so that the rows can be
+        written again unchanged).
+        """
+        previous_report = pd.read_csv(DESCRIPTIONS_REPORT_FILEPATH, index_col=0, dtype=str, keep_default_na=False)
+        previous_report['productID'] = previous_report['productID'].astype(int)
+        return previous_report
     
 
     def generate_report_data(self) -> None:
         """
         Calls various functions to generate all the results (CSV files) that are required to be generated.
+        When there is a report state (self.state), the customer reviews it covers are not
+        processed again: their attribute text counts, helpful count sums, (attribute,
+        product) counts and SynonymMapper are taken from the state, and only the customer
+        reviews in self.new_data are added to them. The tf-idf scores of the attributes
+        are then calculated for the whole corpus (from the attribute text counts, with one
+        row for each distinct set of attributes), since every customer review's scores
+        depend on the document frequencies of all of the attributes.
         """
-        self.attribute_set, self.attribute_text_distribution, attribute_helpful_counts, _ = self.get_attribute_set(data=self.data, full_corpus=True)
-        self.word_count, cv = self.count_vectorization(self.attribute_text_distribution)
+        if self.state is not None:
+            self.product_counts = pd.DataFrame(self.state['productCounts'])
+            self.synonym_mapper = SynonymMapper(self.state['synonymMapper'])
+        else:
+            self.synonym_mapper = SynonymMapper()
+        attribute_set, attribute_text_distribution, attribute_helpful_counts, _ = self.get_attribute_set(data=self.new_data, \
+            full_corpus=True, sm=self.synonym_mapper)
+        attribute_text_counts = self.get_attribute_text_counts(attribute_text_distribution, \
+            self.state['attributeTextCounts'] if self.state is not None else None)
+        if self.state is not None:
+            attribute_set |= set(self.state['attributeSet'])
+            for word, helpful_count in self.state['attributeHelpfulCounts'].items():
+                attribute_helpful_counts[word] = attribute_helpful_counts.get(word, 0) + helpful_count
+        self.attribute_set, self.attribute_text_counts = attribute_set, attribute_text_counts
+        self.attribute_helpful_counts = attribute_helpful_counts
+
+        attribute_texts = sorted(self.attribute_text_counts)
+        self.word_count, cv = self.count_vectorization(attribute_texts)
         print("Count Vectorization complete")
-        self.df_tf_idf_scores = self.calculate_tf_idf(self.word_count, cv)
+        self.df_tf_idf_scores = self.calculate_tf_idf(self.word_count, cv, \
+            [self.attribute_text_counts[attribute_text] for attribute_text in attribute_texts])
         print("tf-idf calculated")
         self.df_tf_idf_scores = self.add_helpful_count(self.df_tf_idf_scores, attribute_helpful_counts)
         print("Helpful counts added")
@@ -410,4 +576,6 @@ class ReportResults:
 
         self.get_top_n_attributes()
         self.get_complete_attribute_ranklist()
-        self.get_products_descriptions()
+        self.get_products_descriptions(self.product_data, self.load_previous_report() if self.state is not None else None)
+        print("Polarity scorer stats:", get_polarity_scorer().get_stats())
+        print("Synonym store stats:", get_synonym_store().get_stats())
@@ -0,0 +1,59 @@
+import os
+import json
+import hashlib
+
+
+REPORT_STATE_FILEPATH = "templates/static/data-files/report_state.json"
+REPORT_STATE_VERSION = 2 # Increase this whenever the report results are calculated differently
+
+# The columns of mined_data.csv that the report results are calculated from
+REVIEW_COLUMNS = ['productID', 'productName', 'reviewHelpfulCount', 'minedText', 'minedHeader']
+
+
+def get_reviews_hashes(data, num_reviews: int) -> tuple:
+    """
+    Takes a pandas DataFrame of mined customer reviews (data), and a number of customer
+    reviews (num_reviews).
+    Returns a tuple with the hash of the first num_reviews customer reviews in data (or
+    None if there are fewer customer reviews than that), and the hash of all of them.
+    Only the columns that the report results are calculated from are hashed, so the
+    first hash only matches the hash recorded by an earlier run if these customer
+    reviews are unchanged (and still come first).
+    """
+    columns = [column for column in REVIEW_COLUMNS if column in data.columns]
+    digest = hashlib.sha256()
+    prefix_hash = digest.hexdigest() if num_reviews == 0 else None
+    for position, row in enumerate(zip(*(data[column].astype(str) for column in columns)), start=1):
+        digest.update((repr(row) + '\n').encode('utf-8'))
+        if position == num_reviews:
+            prefix_hash = digest.hexdigest()
+    return prefix_hash, digest.hexdigest()
+
+
+def load_report_state(settings: dict, filepath: str=REPORT_STATE_FILEPATH) -> dict:
+    """
+    Takes the settings that the report results are being generated with (settings), and
+    the filepath of the report state (filepath).
+    Returns the report state recorded by the last run (see ReportResults.save_state), or
+    None if there is none, or if it was recorded with a different version or settings.
+    """
+    try:
+        with open(filepath) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('version') != REPORT_STATE_VERSION or state.get('settings') != settings:
+        return None
+    return state
+
+
+def save_report_state(state: dict, filepath: str=REPORT_STATE_FILEPATH) -> None:
+    """
+    Takes a report state (state), and the filepath of the report state (filepath).
+    Writes the report state as JSON, replacing the previous one in a single step.
+    """
+    state = dict(state, version=REPORT_STATE_VERSION)
+    temporary_filepath = filepath + '.tmp'
+    with open(temporary_filepath, 'w') as f:
+        json.dump(state, f)
+    os.replace(temporary_filepath, filepath)
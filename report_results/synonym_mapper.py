@@ -1,30 +1,38 @@
-import nltk
-from nltk.corpus import wordnet
-nltk.download('wordnet')
-nltk.download('omw-1.4')
-
-from nltk.stem import PorterStemmer
-
-import spacy
-nlp = spacy.load('en_core_web_sm')
-
 import string
 
+from synonym_store import get_synonym_store
+
 class SynonymMapper:
 
-    def __init__(self):
+    def __init__(self, state: dict=None):
+        """
+        Maps words to the first word mentioned among their synonyms and stemmed forms.
+        The synonyms and stems of words are looked up in the shared SynonymStore, while
+        the words added so far (and therefore the mappings) belong to this SynonymMapper.
+        Optionally takes the state of an earlier SynonymMapper (state, see self.get_state),
+        in which case words are mapped as if they came after the words it had mapped.
+        """
         self.words_added = set()
         self.synonym_mappings = dict()
-        self.stemmer = PorterStemmer()
+        self.synonym_store = get_synonym_store()
+        if state is not None:
+            self.words_added = set(state['wordsAdded'])
+            self.synonym_mappings = dict(state['synonymMappings'])
+
+    def get_state(self) -> dict:
+        """
+        Returns the words added so far and the mappings of this SynonymMapper, in a
+        form that can be written as JSON and passed to a new SynonymMapper.
+        """
+        return {'wordsAdded': sorted(self.words_added), 'synonymMappings': self.synonym_mappings}
     
     def add_synonym_mappings(self, word: str) -> None:
         """
         Takes a word. Adds a mapping from each of the synonyms of the word to the word itself
         (these mappings are added to the dictionary self.synonym_mappings)
         """
-        for syn in wordnet.synsets(word):
-            for name in syn.lemma_names():
-                self.synonym_mappings[name.replace("_", "")] = word
+        for name in self.synonym_store.get_lemma_names(word):
+            self.synonym_mappings[name.replace("_", "")] = word
     
     def map_synonyms(self, word: str) -> str:
         """
@@ -36,7 +44,7 @@ class SynonymMapper:
         are added from the stemmed form of the word to the word itself, and from each of the
         synonyms of the word to the word itself.
         """
-        stemmed = self.stemmer.stem(word)
+        stemmed = self.synonym_store.get_stem(word)
         if word in string.punctuation:
             return word
         if word in self.words_added:
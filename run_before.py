@@ -1,3 +1,5 @@
+import pandas as pd
+
 from webscraper.webscraper import WebScraper
 
 from absa_ensemble.pipeline import Pipeline
@@ -10,27 +12,72 @@ from topic_modelling.improvement_extractor import ImprovementExtractor
 
 from mindmap_generator.mindmap_generator import MindmapGenerator
 
+from run_telemetry import start_run
+
 
 class RunBefore:
-    def __init__(self, product_name: str):
+    def __init__(self, product_name: str, report_filepath: str="templates/static/data-files/run_report.json", \
+        incremental: bool=False):
         """
         Takes the name of the type of products for which the dashboard
         is going to be generated (ex: exercise bike).
         Runs code from a plethora of other files to generate intermediate
         results that are required to render the dashboard, and serve
         results to the queries users might make through the dashboard
+        Each stage is timed (wall time, CPU time and peak memory) along with
+        the number of items it handled, and these are written to a JSON run
+        report at report_filepath after every stage.
+        If incremental is True, then the report results are only updated with the
+        customer reviews added since the last run (see ReportResults); this should only
+        be used when customer reviews have been added for the same product links and
+        type of products. Otherwise, the report results are generated from scratch.
         """
-        WebScraper() # scraping reviews from product links given by the user
+        telemetry = start_run(report_filepath)
+        review_data_filepath = "templates/static/data-files/review_data.csv"
+
+        # The rows of the files written by the stages are counted after each stage has ended
+        # (and each file is only counted once), so that the counting is not timed as part of
+        # the stages. The counts are written to the run report along with the next stage.
+        with telemetry.stage("WebScraper") as scraper_stage:
+            WebScraper() # scraping reviews from product links given by the user
+        num_reviews = self.count_rows(review_data_filepath)
+        scraper_stage['items']['products'] = self.count_rows("product_links.csv")
+        scraper_stage['items']['reviews'] = num_reviews
 
-        Pipeline() # running ABSA models on reviews to extract attributes and descriptions
-        ReportResults(product_name=product_name) # generating report results (intermediate
-        # results for the dashboard to be generated)
-        ProductAttributeRankingCSVGenerator() # Ranking products based on attributes
+        with telemetry.stage("Pipeline") as pipeline_stage:
+            Pipeline() # running ABSA models on reviews to extract attributes and descriptions
+        pipeline_stage['items']['reviews'] = self.count_rows("templates/static/data-files/mined_data.csv")
+        with telemetry.stage("ReportResults") as report_stage:
+            report_results = ReportResults(product_name=product_name, incremental=incremental) # generating report results
+            # (intermediate results for the dashboard to be generated; if incremental is True, then only the customer
+            # reviews added since the last run are processed)
+            report_stage['items']['attributes'] = len(report_results.attribute_set)
+        report_stage['items']['products'] = self.count_rows("templates/static/data-files/product_attribute_descriptions_report.csv")
+        with telemetry.stage("ProductAttributeRankingCSVGenerator") as stage:
+            product_ranking = ProductAttributeRankingCSVGenerator() # Ranking products based on attributes
+            stage['items']['attributes'] = len(product_ranking.attribute_product_mapping)
 
-        filepath="templates/static/data-files/review_data.csv"
+        filepath=review_data_filepath
         # Creating topic modelling models
-        TopicModellingSearchingBERTopic(filepath=filepath, run_repl=False, model_already_trained=False)
-        TopicModellingSearchingTop2Vec(filepath=filepath, models_already_trained=False, run_repl=False)
+        with telemetry.stage("TopicModellingSearchingBERTopic") as stage:
+            TopicModellingSearchingBERTopic(filepath=filepath, run_repl=False, model_already_trained=False)
+            stage['items']['reviews'] = num_reviews
+        with telemetry.stage("TopicModellingSearchingTop2Vec") as stage:
+            TopicModellingSearchingTop2Vec(filepath=filepath, models_already_trained=False, run_repl=False)
+            stage['items']['reviews'] = num_reviews
 
-        ImprovementExtractor() # Extracting market improvement areas
-        MindmapGenerator(product_name) # Generating mindmap image
\ No newline at end of file
+        with telemetry.stage("ImprovementExtractor") as stage:
+            improvement_extractor = ImprovementExtractor() # Extracting market improvement areas
+            stage['items']['attributes'] = len(improvement_extractor.result)
+        with telemetry.stage("MindmapGenerator"):
+            MindmapGenerator(product_name) # Generating mindmap image
+
+    def count_rows(self, filepath: str) -> int:
+        """
+        Takes the filepath to a CSV file. Returns the number of rows of data in it,
+        or None if the file cannot be read.
+        """
+        try:
+            return len(pd.read_csv(filepath, usecols=[0]))
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,198 @@
+import os
+import sys
+import json
+import time
+from datetime import datetime
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError: # The resource module is not available on Windows
+    resource = None
+
+
+def get_peak_rss_mb(children: bool=False) -> float:
+    """
+    Returns the peak resident set size (the largest amount of memory held in RAM)
+    of this process so far, in megabytes, or None if it cannot be measured on this
+    platform. This is the peak over the whole lifetime of the process, not of any
+    one stage.
+    If children is True, then returns the largest peak resident set size of the
+    worker processes that this process has started and waited for instead.
+    """
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, and in kilobytes on Linux
+    return peak_rss / (1024 * 1024) if sys.platform == 'darwin' else peak_rss / 1024
+
+
+class ProgressReporter:
+
+    def __init__(self, name: str, total: int, interval: float=5.0, on_event=None):
+        """
+        Takes the name of a long-running loop (name), the total number of items it
+        processes (total), and the minimum number of seconds between two progress
+        events (interval). Optionally takes a function that is called with each
+        progress event (on_event).
+        Progress events (items done / total / ETA) are printed at most once every
+        interval seconds, and once more when all of the items are done.
+        """
+        self.name = name
+        self.total = total
+        self.interval = interval
+        self.on_event = on_event
+        self.done = 0
+        self.start = time.perf_counter()
+        self.last_event = self.start
+
+    def update(self, count: int=1) -> None:
+        """
+        Takes the number of items that have just been processed (count).
+        Emits a progress event if self.interval seconds have passed since the last
+        one, or if all of the items are done.
+        """
+        self.done += count
+        now = time.perf_counter()
+        if now - self.last_event >= self.interval or self.done == self.total:
+            self.last_event = now
+            self.emit(now)
+
+    def emit(self, now: float) -> None:
+        """
+        Takes the current time (now, from time.perf_counter).
+        Prints a progress event with the number of items done, the total number of
+        items, and the estimated number of seconds until all the items are done.
+        """
+        elapsed = now - self.start
+        eta = elapsed / self.done * (self.total - self.done) if self.done > 0 else None
+        event = {
+            'name': self.name,
+            'done': self.done,
+            'total': self.total,
+            'elapsedSeconds': round(elapsed, 3),
+            'etaSeconds': round(eta, 3) if eta is not None else None
+        }
+        percent = f" ({self.done / self.total:.0%})" if self.total else ""
+        eta_text = f", ETA {eta:.0f}s" if eta is not None else ""
+        print(f"{self.name}: {self.done}/{self.total}{percent}{eta_text}")
+        if self.on_event is not None:
+            self.on_event(event)
+
+
+class RunTelemetry:
+
+    def __init__(self, report_filepath: str="templates/static/data-files/run_report.json", progress_interval: float=5.0):
+        """
+        Takes the filepath the JSON run report is written to (report_filepath), and the
+        minimum number of seconds between two progress events of a loop (progress_interval).
+        Records the start and end time, wall time, CPU time (of this process, and of the
+        worker processes it waited for), peak resident memory and item counts of each of
+        the stages of a run, along with the progress events emitted while the stage ran.
+        The peak resident memory of a process only ever grows, so each stage records the
+        peak of the process so far (processPeakRssMb), how much the stage raised it
+        (peakRssGrowthMb, 0 if the stage stayed below an earlier peak), and the largest
+        peak of the worker processes waited for so far (childrenPeakRssMb).
+        """
+        self.report_filepath = report_filepath
+        self.progress_interval = progress_interval
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.stages = []
+        self.current_stage = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Takes the name of a stage of the run (name).
+        Used as a context manager around the code of the stage. Yields the record of the
+        stage (a dictionary), to whose 'items' dictionary the item counts of the stage
+        (ex: reviews, products, attributes) can be added.
+        The record is completed (and the run report rewritten) when the stage ends, even
+        if it fails.
+        """
+        record = {
+            'name': name,
+            'startedAt': datetime.now().isoformat(timespec='seconds'),
+            'items': dict(),
+            'progress': [],
+            'status': 'running'
+        }
+        self.stages.append(record)
+        previous_stage = self.current_stage
+        self.current_stage = record
+        start_wall = time.perf_counter()
+        start_times = os.times()
+        start_peak_rss = get_peak_rss_mb()
+        try:
+            yield record
+            record['status'] = 'completed'
+        except BaseException:
+            record['status'] = 'failed'
+            raise
+        finally:
+            end_times = os.times()
+            record['endedAt'] = datetime.now().isoformat(timespec='seconds')
+            record['wallSeconds'] = round(time.perf_counter() - start_wall, 3)
+            record['cpuSeconds'] = round((end_times.user + end_times.system) - (start_times.user + start_times.system), 3)
+            record['childCpuSeconds'] = round((end_times.children_user + end_times.children_system) \
+                - (start_times.children_user + start_times.children_system), 3)
+            record['processPeakRssMb'] = get_peak_rss_mb()
+            record['peakRssGrowthMb'] = record['processPeakRssMb'] - start_peak_rss if start_peak_rss is not None else None
+            record['childrenPeakRssMb'] = get_peak_rss_mb(children=True)
+            self.current_stage = previous_stage
+            print(f"Stage {name} {record['status']} in {record['wallSeconds']}s")
+            self.write_report()
+
+    def record_progress(self, event: dict) -> None:
+        """
+        Takes a progress event (event). Adds it to the record of the stage that is
+        currently running, if any.
+        """
+        if self.current_stage is not None:
+            self.current_stage['progress'].append(event)
+
+    def get_report(self) -> dict:
+        """
+        Returns the run report: a dictionary with the records of all the stages run so far.
+        """
+        return {
+            'startedAt': self.started_at,
+            'totalWallSeconds': round(sum(stage.get('wallSeconds', 0) for stage in self.stages), 3),
+            'stages': self.stages
+        }
+
+    def write_report(self) -> None:
+        """
+        Writes the run report to self.report_filepath as JSON, replacing the previous
+        report in a single step.
+        """
+        temporary_filepath = self.report_filepath + '.tmp'
+        with open(temporary_filepath, 'w') as f:
+            json.dump(self.get_report(), f, indent=2)
+        os.replace(temporary_filepath, self.report_filepath)
+
+
+telemetry = None # The RunTelemetry of the run currently in progress in this process, if any
+
+def start_run(report_filepath: str="templates/static/data-files/run_report.json", progress_interval: float=5.0) -> RunTelemetry:
+    """
+    Takes the filepath the JSON run report is written to (report_filepath), and the
+    minimum number of seconds between two progress events (progress_interval).
+    Starts recording a new run, and returns its RunTelemetry.
+    """
+    global telemetry
+    telemetry = RunTelemetry(report_filepath, progress_interval)
+    return telemetry
+
+
+def track_progress(name: str, total: int) -> ProgressReporter:
+    """
+    Takes the name of a long-running loop (name) and the total number of items it
+    processes (total).
+    Returns a ProgressReporter for the loop. If a run is being recorded, then the
+    progress events are rate-limited with the run's interval and added to the record
+    of its current stage.
+    """
+    if telemetry is None:
+        return ProgressReporter(name, total)
+    return ProgressReporter(name, total, telemetry.progress_interval, telemetry.record_progress)
@@ -0,0 +1,131 @@
+import os
+import json
+import threading
+
+import nltk
+from nltk.corpus import wordnet
+from nltk.stem import PorterStemmer
+
+from model_registry import require_nltk_data
+
+
+SYNONYM_STORE_FILEPATH = "templates/static/data-files/synonym_store.json"
+SYNONYM_STORE_VERSION = 1 # Increase this whenever the way entries are computed changes
+
+
+class SynonymStore:
+
+    def __init__(self, filepath: str=SYNONYM_STORE_FILEPATH):
+        """
+        Takes the filepath that the store is persisted to (filepath).
+        Keeps, for every word that has been looked up, its Porter stem and the lemma
+        names of its wordnet synsets (as returned by wordnet, in order), so that
+        wordnet and the stemmer are only ever consulted once per word, across runs.
+        The store is loaded from filepath if it was written with the same version of
+        the store and of nltk; otherwise it starts out empty.
+        """
+        self.filepath = filepath
+        self.version = f"{SYNONYM_STORE_VERSION}:{nltk.__version__}"
+        self.stems = dict()
+        self.lemma_names = dict()
+        self.stemmer = PorterStemmer()
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.changed = False
+        self.load()
+
+    def load(self) -> None:
+        """
+        Loads the stems and lemma names persisted at self.filepath, if the file exists
+        and was written with the current version.
+        """
+        try:
+            with open(self.filepath) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != self.version:
+            return
+        self.stems = data['stems']
+        self.lemma_names = data['lemmaNames']
+
+    def save(self) -> None:
+        """
+        Writes the store to self.filepath as JSON (replacing the previous file in a
+        single step), if any word has been added to it since it was loaded or saved.
+        """
+        with self.lock:
+            if not self.changed:
+                return
+            temporary_filepath = f"{self.filepath}.{os.getpid()}.tmp"
+            with open(temporary_filepath, 'w') as f:
+                json.dump({'version': self.version, 'stems': self.stems, 'lemmaNames': self.lemma_names}, f)
+            os.replace(temporary_filepath, self.filepath)
+            self.changed = False
+
+    def get_stem(self, word: str) -> str:
+        """
+        Takes a word. Returns the Porter stem of the word.
+        """
+        stem = self.stems.get(word)
+        if stem is None:
+            with self.lock:
+                stem = self.stemmer.stem(word)
+                self.stems[word] = stem
+                self.changed = True
+        return stem
+
+    def get_lemma_names(self, word: str) -> list:
+        """
+        Takes a word.
+        Returns the lemma names of each of the wordnet synsets of the word, in the order
+        in which wordnet returns them (without repeating a lemma name).
+        """
+        lemma_names = self.lemma_names.get(word)
+        if lemma_names is not None:
+            self.hits += 1
+            return lemma_names
+        with self.lock:
+            require_nltk_data('wordnet', 'omw-1.4')
+            lemma_names = []
+            for syn in wordnet.synsets(word):
+                for name in syn.lemma_names():
+                    if name not in lemma_names:
+                        lemma_names.append(name)
+            self.lemma_names[word] = lemma_names
+            self.misses += 1
+            self.changed = True
+        return lemma_names
+
+    def precompute(self, words) -> None:
+        """
+        Takes an iterable of words (words).
+        Looks up the stems and lemma names of all of the words that are not in the store
+        yet, and persists the store.
+        """
+        for word in words:
+            self.get_stem(word)
+            self.get_lemma_names(word)
+        self.save()
+
+    def get_stats(self) -> dict:
+        """
+        Returns a dictionary with the number of lemma name lookups that were answered
+        by the store (hits), the number that had to consult wordnet (misses), and the
+        number of words in the store.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.lemma_names)}
+
+
+synonym_store = None
+
+def get_synonym_store() -> SynonymStore:
+    """
+    Returns the SynonymStore shared by everything running in this process,
+    loading it the first time it is needed.
+    """
+    global synonym_store
+    if synonym_store is None:
+        synonym_store = SynonymStore()
+    return synonym_store
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The tests import the project's modules the same way its own files do (ex: from
+# absa_ensemble.pipeline import Pipeline), so the root of the project has to be
+# importable however pytest is run
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,37 @@
+import math
+
+import pytest
+
+pytest.importorskip("spacy")
+pytest.importorskip("stanza")
+pytest.importorskip("textblob")
+pytest.importorskip("contractions")
+pytest.importorskip("pandas")
+
+from benchmarks.absa_benchmark import ABSABenchmark, PERCENTILES, get_percentile
+
+
+def test_get_percentile_of_no_values_is_nan():
+    assert math.isnan(get_percentile([], 50))
+
+
+def test_get_percentile_interpolates():
+    assert get_percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert get_percentile([5.0], 99) == 5.0
+
+
+def test_summarize_without_latencies():
+    benchmark = ABSABenchmark.__new__(ABSABenchmark)
+    summary = benchmark.summarize([], total_seconds=0.0)
+
+    assert summary['reviewsPerSecond'] is None
+    assert all(summary[f'p{percentile}Ms'] is None for percentile in PERCENTILES)
+    assert summary['meanMs'] is None and summary['maxMs'] is None
+
+
+def test_format_value_of_unmeasured_values():
+    from benchmarks.absa_benchmark import format_value
+
+    assert format_value(None, " ms") == "n/a"
+    assert format_value(float('nan')) == "n/a"
+    assert format_value(1.234, " ms") == "1.23 ms"
@@ -0,0 +1,89 @@
+import os
+
+from artifact_cache import ArtifactCache
+
+
+class CountingLoader:
+
+    def __init__(self, on_load=None):
+        self.calls = 0
+        self.on_load = on_load
+
+    def __call__(self, filepath: str) -> str:
+        self.calls += 1
+        with open(filepath) as f:
+            contents = f.read()
+        if self.on_load is not None:
+            self.on_load(filepath)
+        return contents
+
+
+def write(filepath, contents: str, mtime_ns: int=None) -> None:
+    with open(filepath, 'w') as f:
+        f.write(contents)
+    if mtime_ns is not None:
+        os.utime(filepath, ns=(mtime_ns, mtime_ns))
+
+
+def test_artifact_is_loaded_once(tmp_path):
+    filepath = str(tmp_path / "data.csv")
+    write(filepath, "a,b\n")
+    cache, loader = ArtifactCache(), CountingLoader()
+
+    assert cache.get("data", filepath, loader) == "a,b\n"
+    assert cache.get("data", filepath, loader) == "a,b\n"
+    assert loader.calls == 1
+    assert cache.get_stats() == {'hits': 1, 'misses': 1, 'reloads': 0, 'loaded': ['data']}
+
+
+def test_touched_file_is_not_loaded_again(tmp_path):
+    filepath = str(tmp_path / "data.csv")
+    write(filepath, "a,b\n", mtime_ns=1_000_000_000)
+    cache, loader = ArtifactCache(), CountingLoader()
+    cache.get("data", filepath, loader)
+
+    write(filepath, "a,b\n", mtime_ns=2_000_000_000)
+    assert cache.get("data", filepath, loader) == "a,b\n"
+    assert loader.calls == 1
+    assert cache.get_stats()['reloads'] == 0
+
+
+def test_changed_file_is_loaded_again(tmp_path):
+    filepath = str(tmp_path / "data.csv")
+    write(filepath, "a,b\n", mtime_ns=1_000_000_000)
+    cache, loader = ArtifactCache(), CountingLoader()
+    cache.get("data", filepath, loader)
+
+    write(filepath, "a,b,c\n", mtime_ns=2_000_000_000)
+    assert cache.get("data", filepath, loader) == "a,b,c\n"
+    assert loader.calls == 2
+    assert cache.get_stats()['reloads'] == 1
+
+
+def test_file_rewritten_while_loading_is_not_kept(tmp_path):
+    filepath = str(tmp_path / "data.csv")
+    write(filepath, "a,b\n", mtime_ns=1_000_000_000)
+    rewrites = ["a,b,c\n"]
+
+    def rewrite(filepath: str) -> None:
+        if rewrites:
+            write(filepath, rewrites.pop(), mtime_ns=2_000_000_000)
+
+    cache, loader = ArtifactCache(), CountingLoader(on_load=rewrite)
+    assert cache.get("data", filepath, loader) == "a,b\n"
+    assert cache.get_stats()['loaded'] == []
+
+    assert cache.get("data", filepath, loader) == "a,b,c\n" # The new contents are loaded, not the stale value
+    assert cache.get("data", filepath, loader) == "a,b,c\n"
+    assert loader.calls == 2
+
+
+def test_clear_forgets_the_artifacts(tmp_path):
+    filepath = str(tmp_path / "data.csv")
+    write(filepath, "a,b\n")
+    cache, loader = ArtifactCache(), CountingLoader()
+    cache.get("data", filepath, loader)
+    cache.clear()
+
+    cache.get("data", filepath, loader)
+    assert loader.calls == 2
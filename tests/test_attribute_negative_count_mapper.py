@@ -0,0 +1,64 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from report_results.attribute_negative_count_mapper import AttributeNegativeCountMapper
+
+
+def get_aspect_words(rows: list):
+    """
+    Takes a list of (attribute, productName, polarity) tuples, one for every mention.
+    Returns them as a pandas DataFrame, in the format taken by get_product_counts.
+    """
+    return pd.DataFrame(rows, columns=['attribute', 'productName', 'polarity'])
+
+
+def get_scores_with_loop(aspect_words) -> dict:
+    """
+    The negative count score of each attribute, counted one mention at a time in
+    dictionaries of (net polarity, count) per product (as map_entry and get_score used to do).
+    """
+    attribute_score_by_product = dict()
+    for word, product_name, polarity in zip(aspect_words['attribute'], aspect_words['productName'], aspect_words['polarity']):
+        if pd.isna(product_name):
+            continue
+        product_polarities = attribute_score_by_product.setdefault(word, dict())
+        curr_polarity, curr_count = product_polarities.get(product_name, (0.0, 0))
+        product_polarities[product_name] = (curr_polarity + float(polarity), curr_count + 1)
+    return {word: sum(1 for polarity, count in product_polarities.values() if polarity < 0.0 and count >= 5) \
+        for word, product_polarities in attribute_score_by_product.items()}
+
+
+def test_grouped_scores_match_the_mention_loop():
+    rng = np.random.default_rng(0)
+    aspect_words = get_aspect_words(list(zip(
+        rng.choice(["seat", "pedal", "frame", "screen"], size=400),
+        rng.choice(["Bike A", "Bike B", "Bike C", "Bike D", "Bike E"], size=400),
+        np.round(rng.uniform(-1, 0.6, size=400), 2)
+    )))
+    ancm = AttributeNegativeCountMapper()
+    attributes, scores = ancm.get_scores(ancm.get_product_counts(aspect_words))
+
+    assert dict(zip(attributes, scores.tolist())) == get_scores_with_loop(aspect_words)
+    assert attributes == list(pd.unique(aspect_words['attribute']))
+
+
+def test_continued_counts_match_counting_all_mentions():
+    rows = [("seat", "Bike A", -0.3)] * 3 + [("seat", "Bike B", 0.2)] * 2 + [("seat", "Bike A", -0.1)] * 3
+    ancm = AttributeNegativeCountMapper()
+    earlier_counts = ancm.get_product_counts(get_aspect_words(rows[:5]))
+    continued_counts = ancm.get_product_counts(pd.concat([earlier_counts, get_aspect_words(rows[5:]).assign(count=1)], ignore_index=True))
+
+    pd.testing.assert_frame_equal(continued_counts, ancm.get_product_counts(get_aspect_words(rows)))
+
+
+def test_mentions_without_a_product_name_are_not_counted():
+    rows = [("seat", np.nan, -0.5)] * 6 + [("seat", "Bike A", -0.5)] * 4 + [("pedal", "Bike A", -0.5)] * 5
+    ancm = AttributeNegativeCountMapper()
+    product_counts = ancm.get_product_counts(get_aspect_words(rows))
+    attributes, scores = ancm.get_scores(product_counts)
+
+    assert product_counts['productName'].to_list() == ["Bike A", "Bike A"]
+    assert dict(zip(attributes, scores.tolist())) == {"seat": 0, "pedal": 1}
+    assert dict(zip(attributes, scores.tolist())) == get_scores_with_loop(get_aspect_words(rows))
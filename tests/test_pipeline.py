@@ -0,0 +1,161 @@
+import pytest
+
+pytest.importorskip("spacy")
+pytest.importorskip("stanza")
+pytest.importorskip("textblob")
+pytest.importorskip("contractions")
+pd = pytest.importorskip("pandas")
+
+from absa_ensemble import absa_ensemble_model
+from absa_ensemble.absa_cache import ABSACache
+from absa_ensemble.pipeline import Pipeline
+
+
+class FakeDoc:
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel2:
+
+    def __init__(self):
+        self.result = []
+
+
+@pytest.fixture
+def parse_calls(monkeypatch):
+    """
+    Replaces the spacy and Stanford NLP parsing used by the ABSAEngine, and the
+    ABSA models themselves, with fakes. Returns the list of the customer reviews
+    passed to each call of parse_reviews, along with the docs received by ABSAModel1.
+    """
+    calls = {'parse': [], 'docs': []}
+
+    def parse_reviews(reviews, batch_size=64, n_process=1):
+        calls['parse'].append(list(reviews))
+        return (FakeDoc(review) for review in reviews)
+
+    def mine(self, review, doc=None):
+        calls['docs'].append(doc)
+        return []
+
+    monkeypatch.setattr(absa_ensemble_model, "parse_reviews", parse_reviews)
+    monkeypatch.setattr(absa_ensemble_model, "mine_reviews", lambda reviews, single_pass=False: [FakeModel2() for _ in reviews])
+    monkeypatch.setattr(absa_ensemble_model.ABSAModel1, "mine", mine)
+    return calls
+
+
+def get_pipeline(cache_filepath) -> Pipeline:
+    """
+    Returns a Pipeline that mines in batches with the cache at cache_filepath,
+    without running the preprocessing and mining done by Pipeline.__init__.
+    """
+    pipeline = Pipeline.__new__(Pipeline)
+    pipeline.batch_size = 64
+    pipeline.n_workers = 1
+    pipeline.engine = absa_ensemble_model.ABSAEngine()
+    pipeline.cache = ABSACache(str(cache_filepath), "test")
+    return pipeline
+
+
+def test_mine_aspects_batches_cache_misses_without_docs(tmp_path, parse_calls):
+    pipeline = get_pipeline(tmp_path / "cache.db")
+    pipeline.mine_aspects(pd.Series(["the seat is comfy", "the pedal is loud", "the seat is comfy"]))
+
+    assert parse_calls['parse'] == [["the seat is comfy", "the pedal is loud"]]
+    assert all(doc is not None for doc in parse_calls['docs'])
+    pipeline.cache.close()
+
+
+def test_mine_many_batches_only_the_missing_docs(parse_calls):
+    engine = absa_ensemble_model.ABSAEngine()
+    reviews = ["the seat is comfy", "the pedal is loud", "the frame is solid"]
+    engine.mine_many(reviews, [FakeDoc(reviews[0]), None, FakeDoc("another review")])
+
+    assert parse_calls['parse'] == [["the pedal is loud", "the frame is solid"]]
+    assert [doc.text for doc in parse_calls['docs']] == reviews
+
+
+class FakeToken:
+
+    def __init__(self, text: str):
+        self.lemma_ = text
+
+
+class FakeNlp:
+
+    def __init__(self, profile: str, calls: dict):
+        self.profile = profile
+        self.calls = calls
+
+    def pipe(self, texts, batch_size=64, n_process=1):
+        texts = list(texts)
+        self.calls.setdefault(self.profile, []).append(texts)
+        return ([FakeToken(word) for word in text.split()] for text in texts)
+
+
+def test_data_loader_does_not_parse_the_reviews(tmp_path, monkeypatch):
+    from absa_ensemble import data_loader
+
+    calls = dict()
+    monkeypatch.setattr(data_loader, "get_spacy", lambda profile="parser": FakeNlp(profile, calls))
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "templates/static/data-files").mkdir(parents=True)
+    pd.DataFrame({'reviewText': ["The seat is comfy", "The pedal is loud"]}).to_csv("review_data.csv", index=False)
+
+    data_loader.DataLoader("review_data.csv")
+
+    assert "parser" not in calls
+    assert calls["lemmatizer"] == [["the seat is comfy ", "the pedal is loud "]]
+    assert not (tmp_path / "templates/static/data-files/preprocessed_reviewText_docs.spacy").exists()
+
+
+def test_each_mined_review_is_parsed_once(tmp_path, parse_calls):
+    pipeline = get_pipeline(tmp_path / "cache.db")
+    reviews = pd.Series(["the seat is comfy", "the pedal is loud", "the seat is comfy"])
+    first = pipeline.mine_aspects(reviews)
+    second = pipeline.mine_aspects(reviews)
+
+    assert parse_calls['parse'] == [["the seat is comfy", "the pedal is loud"]] # The second run only hits the cache
+    assert first.to_list() == second.to_list()
+    pipeline.cache.close()
+
+
+def test_mining_without_docs_matches_mining_with_exported_docs():
+    spacy = pytest.importorskip("spacy")
+    from model_registry import get_spacy
+    try:
+        nlp = get_spacy("parser")
+    except OSError:
+        pytest.skip("spacy's en_core_web_sm model is not installed")
+    from absa_ensemble.absa_model1 import ABSAModel1
+
+    reviews = ["the seat be really comfortable but the pedal be loud.", "i love the sturdy frame."]
+    doc_bin = spacy.tokens.DocBin(docs=list(nlp.pipe(reviews)))
+    exported_docs = list(spacy.tokens.DocBin().from_bytes(doc_bin.to_bytes()).get_docs(nlp.vocab))
+    model1 = ABSAModel1()
+
+    assert [model1.mine(review, doc) for review, doc in zip(reviews, exported_docs)] == [model1.mine(review) for review in reviews]
+
+
+class FakePool:
+
+    def __init__(self, chunk_stats: list):
+        self.chunk_stats = chunk_stats
+
+    def imap(self, function, chunks):
+        return (([review.upper() for review in chunk], stats) for chunk, stats in zip(chunks, self.chunk_stats))
+
+
+def test_worker_polarity_scorer_stats_are_added_up(tmp_path):
+    pipeline = get_pipeline(tmp_path / "cache.db")
+    pipeline.n_workers = 2
+    pipeline.engine.chunk_size = 2
+    pipeline.worker_stats = {'hits': 0, 'misses': 0, 'sizes': dict()}
+    pipeline.pool = FakePool([{'worker': 1, 'hits': 3, 'misses': 2, 'size': 2}, {'worker': 2, 'hits': 1, 'misses': 1, 'size': 1}, \
+        {'worker': 1, 'hits': 4, 'misses': 0, 'size': 2}])
+
+    assert pipeline.mine_aspects_in_parallel(["a", "b", "c", "d", "e"]) == ["A", "B", "C", "D", "E"]
+    assert pipeline.get_polarity_scorer_stats() == {'hits': 8, 'misses': 3, 'hitRate': 8 / 11, 'size': 3, 'workers': 2}
+    pipeline.cache.close()
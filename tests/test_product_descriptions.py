@@ -0,0 +1,64 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+sparse = pytest.importorskip("scipy.sparse")
+pytest.importorskip("sklearn")
+pytest.importorskip("nltk")
+pytest.importorskip("textblob")
+
+from sklearn.feature_extraction.text import TfidfTransformer
+
+from report_results.product_descriptions import get_tf_idf_scores
+
+
+FEATURE_NAMES = ["seat", "pedal", "frame", "noise"]
+
+# The distinct rows of attribute counts, and the number of customer reviews each stands for
+WORD_COUNT = np.array([
+    [1, 0, 2, 0],
+    [0, 1, 0, 0],
+    [1, 1, 0, 3],
+    [0, 0, 1, 0]
+])
+ROW_COUNTS = [3, 1, 2, 5]
+
+
+def get_scores_with_loop(word_count, feature_names: list) -> dict:
+    """
+    The total tf-idf score of each attribute, added up one customer review at a time
+    over the dense tf-idf vectors (as calculate_tf_idf used to do).
+    """
+    tf_idf_vectors = TfidfTransformer(use_idf=True, smooth_idf=True).fit_transform(word_count)
+    total_scores = dict()
+    for index in range(tf_idf_vectors.shape[0]):
+        doc_vector = pd.DataFrame(tf_idf_vectors[index].T.todense(), index=feature_names, columns=['TfIdfScore'])
+        for word, row in doc_vector.iterrows():
+            total_scores[word] = total_scores.get(word, 0) + row['TfIdfScore']
+    return total_scores
+
+
+def get_scores(df_tf_idf_scores) -> dict:
+    return dict(zip(df_tf_idf_scores['Word'], df_tf_idf_scores['TfIdfScore']))
+
+
+def test_sparse_column_sums_match_the_review_loop():
+    word_count = sparse.csr_matrix(np.repeat(WORD_COUNT, ROW_COUNTS, axis=0))
+    df_tf_idf_scores = get_tf_idf_scores(word_count, FEATURE_NAMES)
+
+    assert get_scores(df_tf_idf_scores) == pytest.approx(get_scores_with_loop(word_count, FEATURE_NAMES))
+    assert df_tf_idf_scores['TfIdfScore'].is_monotonic_decreasing
+
+
+def test_weighted_rows_match_the_repeated_rows():
+    expanded_scores = get_tf_idf_scores(sparse.csr_matrix(np.repeat(WORD_COUNT, ROW_COUNTS, axis=0)), FEATURE_NAMES)
+    weighted_scores = get_tf_idf_scores(sparse.csr_matrix(WORD_COUNT), FEATURE_NAMES, ROW_COUNTS)
+
+    assert get_scores(weighted_scores) == pytest.approx(get_scores(expanded_scores))
+    assert weighted_scores['Word'].to_list() == expanded_scores['Word'].to_list()
+
+
+def test_rows_standing_for_one_review_match_the_unweighted_scores():
+    word_count = sparse.csr_matrix(WORD_COUNT)
+    assert get_scores(get_tf_idf_scores(word_count, FEATURE_NAMES, [1] * len(ROW_COUNTS))) == \
+        pytest.approx(get_scores(get_tf_idf_scores(word_count, FEATURE_NAMES)))
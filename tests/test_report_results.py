@@ -0,0 +1,70 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+pytest.importorskip("spacy")
+pytest.importorskip("nltk")
+pytest.importorskip("textblob")
+
+from report_results.report_results import ReportResults
+
+
+OUTPUT_FILENAMES = ["top_twenty_attributes.csv", "attribute_ranklist_complete.csv", "attribute_negative_counts.csv", \
+    "product_attribute_descriptions_report.csv"]
+
+
+def get_entries(aspect: str, description: str, polarity: float) -> str:
+    """
+    Returns the mined entries of a customer review with a single entry, as written to mined_data.csv
+    """
+    return repr([{'aspect': aspect, 'description': description, 'polarity': polarity, 'subjectivity': 0.5}])
+
+
+def get_reviews(rows: list):
+    """
+    Takes a list of (productID, productName, aspect, description, polarity) tuples.
+    Returns a pandas DataFrame of mined customer reviews in the format of mined_data.csv
+    """
+    return pd.DataFrame({
+        'productID': [row[0] for row in rows],
+        'productName': [row[1] for row in rows],
+        'reviewHelpfulCount': [index % 3 for index in range(len(rows))],
+        'minedText': [get_entries(*row[2:]) for row in rows],
+        'minedHeader': [get_entries(row[2], "good", 0.4) for row in rows],
+        'ratingByFeatureAttributes': ["{}" for _ in rows]
+    })
+
+
+def read_outputs(directory) -> dict:
+    return {filename: (directory / filename).read_text() for filename in OUTPUT_FILENAMES}
+
+
+def test_incremental_run_matches_full_rebuild(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data_directory = tmp_path / "templates/static/data-files"
+    data_directory.mkdir(parents=True)
+    first_rows = [(1, "Bike A", "seat", "comfortable", 0.6), (1, "Bike A", "pedal", "loud", -0.5), \
+        (2, "Bike B", "seat", "hard", -0.4), (2, "Bike B", "screen", "bright", 0.7)] * 3
+    added_rows = [(2, "Bike B", "pedal", "smooth", 0.5), (3, "Bike C", "frame", "sturdy", 0.8), (3, "Bike C", "seat", "wide", 0.3)]
+    filepath = str(data_directory / "mined_data.csv")
+
+    get_reviews(first_rows).to_csv(filepath)
+    ReportResults(filepath, "exercise bike", incremental=True)
+    get_reviews(first_rows + added_rows).to_csv(filepath)
+    incremental_run = ReportResults(filepath, "exercise bike", incremental=True)
+    assert incremental_run.state is not None # The report state of the first run was reused
+    incremental_outputs = read_outputs(data_directory)
+
+    (data_directory / "report_state.json").unlink()
+    ReportResults(filepath, "exercise bike")
+    assert read_outputs(data_directory) == incremental_outputs
+
+
+def test_helpful_counts_match_the_row_by_row_boost():
+    df_tf_idf_scores = pd.DataFrame({'Word': ["seat", "pedal", "frame"], 'TfIdfScore': [2.0, 1.5, 0.5]})
+    attribute_helpful_counts = {"seat": 40, "frame": 7, "screen": 3}
+    expected_scores = [score + (score * attribute_helpful_counts[word] / 1000) if word in attribute_helpful_counts else score \
+        for word, score in zip(df_tf_idf_scores['Word'], df_tf_idf_scores['TfIdfScore'])]
+
+    df_tf_idf_scores = ReportResults.__new__(ReportResults).add_helpful_count(df_tf_idf_scores, attribute_helpful_counts)
+    assert df_tf_idf_scores['TfIdfScore'].to_list() == pytest.approx(expected_scores)
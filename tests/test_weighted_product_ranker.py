@@ -0,0 +1,65 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from product_ranking import weighted_product_ranker
+from product_ranking.weighted_product_ranker import WeightedProductRanker, load_score_matrix
+
+
+ATTRIBUTES = ["comfort", "noise", "price", "screen"]
+
+
+@pytest.fixture
+def score_matrix(tmp_path, monkeypatch):
+    """
+    Writes a products x attributes score matrix with many tied scores to tmp_path, and
+    makes the WeightedProductRanker load it. Returns the loaded score matrix.
+    """
+    rng = np.random.default_rng(0)
+    n_products = 200
+    presence = rng.random((n_products, len(ATTRIBUTES))) < 0.6
+    scores = np.where(presence, rng.choice([-0.5, 0.0, 0.25, 0.5, 1.0], size=presence.shape), 0.0)
+    filepath = str(tmp_path / "product_attribute_scores.npz")
+    np.savez(filepath, scores=scores, presence=presence.astype('float64'), productIds=np.arange(n_products) + 1000, \
+        productNames=np.array(["Bike {}".format(row) for row in range(n_products)]), attributes=np.array(ATTRIBUTES))
+
+    score_matrix = load_score_matrix(filepath)
+    monkeypatch.setattr(weighted_product_ranker.WeightedProductRanker, "get_score_matrix", lambda self: score_matrix)
+    return score_matrix
+
+
+def get_top_products_with_sort(score_matrix: dict, weights: dict, k: int):
+    """
+    The k highest ranked products, found by sorting the scores of every ranked product
+    (products with the same score in the order of the descriptions report).
+    """
+    columns = [score_matrix['attributePositions'][attribute] for attribute in weights]
+    weight_values = np.array(list(weights.values()), dtype='float64')
+    covered_weights = score_matrix['presence'][:, columns] @ weight_values
+    weighted_scores = score_matrix['scores'][:, columns] @ weight_values
+    ranked = [(-weighted_scores[row] / covered_weights[row], row) for row in range(len(covered_weights)) if covered_weights[row] > 0]
+    rows = [row for _, row in sorted(ranked)[:k]]
+    return pd.DataFrame.from_dict({
+        'productID': score_matrix['productIds'][rows],
+        'productName': score_matrix['productNames'][rows],
+        'score': weighted_scores[rows] / covered_weights[rows],
+        'coverage': covered_weights[rows] / weight_values.sum()
+    })
+
+
+@pytest.mark.parametrize("k", [1, 3, 10, 57, 500])
+@pytest.mark.parametrize("weights", [{"comfort": 1}, {"comfort": 0.5, "noise": 0.3, "price": 0.2}, {"screen": 2, "noise": 1}])
+def test_top_products_match_a_full_sort(score_matrix, weights, k):
+    pd.testing.assert_frame_equal(WeightedProductRanker(weights, k).result, get_top_products_with_sort(score_matrix, weights, k))
+
+
+def test_no_products_are_ranked_for_k_zero(score_matrix):
+    assert WeightedProductRanker({"comfort": 1}, 0).result.empty
+
+
+def test_unknown_attributes_and_weights_are_rejected(score_matrix):
+    with pytest.raises(KeyError):
+        WeightedProductRanker({"colour": 1})
+    with pytest.raises(ValueError):
+        WeightedProductRanker({"comfort": 0})
@@ -1,7 +1,7 @@
 import pandas as pd
 import math
-import spacy
-nlp = spacy.load('en_core_web_sm')
+
+from model_registry import get_spacy
 
 from topic_modelling.topic_modelling_searching_ensemble import TopicModellingSearchingEnsemble
 from topic_modelling.topic_modelling_searching_bertopic import TopicModellingSearchingBERTopic
@@ -30,9 +30,10 @@ class ImprovementExtractor:
     def tag_pos(self, attribute: str) -> str:
         """
         Takes an attribute (string).
-        Returns the Part-of-Speech tag of this word (attribute)
+        Returns the Part-of-Speech tag of this word (attribute), using a spacy
+        model with only the components needed for Part-of-Speech tagging.
         """
-        doc = nlp(attribute)
+        doc = get_spacy("tagger")(attribute)
         return doc[0].pos_
     
     def select_improvement_areas(self, data_df, num_areas: int=10) -> list:
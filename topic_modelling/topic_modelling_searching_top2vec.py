@@ -2,11 +2,8 @@ import pandas as pd
 
 from top2vec import Top2Vec
 
-import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
-nltk.download('stopwords')
-nltk.download('punkt')
 
 import string
 
@@ -16,10 +13,13 @@ matplotlib.use('agg')
 
 import os
 
+from model_registry import require_nltk_data
+
 
 class TopicModellingSearchingTop2Vec:
 
     def __init__(self, filepath: str, speed: str='deep-learn', models_already_trained: bool=True, run_repl: bool=True):
+        require_nltk_data('stopwords', 'punkt')
         # os.environ["TFHUB_CACHE_DIR"] = "/var/folders/cn/dtb98nld0j7g5gfysyrv8y3m0000gp/T/tfhub_modules/063d866c06683311b44b4992fd46003be952409c"
         self.data_df = self.load_data(filepath)
         self.documents = self.generate_document_list(self.data_df)
@@ -12,6 +12,8 @@ from selenium.common.exceptions import StaleElementReferenceException
 
 from selenium.webdriver.common.keys import Keys
 
+from run_telemetry import track_progress
+
 
 class WebScraper:
 
@@ -308,10 +310,12 @@ class WebScraper:
         Calls all the functions that perform the webscraping operations on every product.
         Then calls the write_data function to export the scraped data as a CSV file.
         """
+        progress = track_progress("Scraping products", len(self.urls))
         for url_id in self.urls:
             self.driver.get(self.urls[url_id])
             page_content = self.driver.page_source
             soup = BeautifulSoup(page_content, 'html.parser')
             self.get_data(soup, url_id)
+            progress.update()
         self.write_data()
         
\ No newline at end of file